@@ -0,0 +1,726 @@
+"""
+    API de Prefect en memoria para pruebas de carga sin servidor.
+
+    Implementa, sobre una carga de `workload.Workload`, los endpoints que usan `get_prefect_info`,
+    el reporte periódico, el watchdog y `db_cleanup`: filtros de ejecuciones de flujo y de tarea, flujos,
+    despliegues, lectura, eliminación y cambio de estado y etiquetas por ID, logs, historial de eventos
+    (siempre vacío) y `/admin/settings`. Se conecta al `PrefectClient` real como transporte de httpx
+    (`httpx.MockTransport`), por lo que se prueban la paginación, los reintentos y la concurrencia del cliente
+    sin red ni base de datos.
+
+    `fake_api_session` abre la sesión de `client_session` con ese transporte. Las sesiones y clientes que se abren
+    adentro lo heredan, aunque corran en otro event loop (por ejemplo una función síncrona con `asyncio.run`
+    llamada con `asyncio.to_thread`). Así funcionan contra la API en memoria `get_prefect_info`, la búsqueda
+    y cancelación del watchdog (`scan_flow_runs.fn`, `cancel_flow_runs.fn`) y `db_cleanup.fn`.
+
+    No se cubren:
+    - `get_failed_flow_runs` del reporte periódico: llama a tareas de Prefect y el motor de Prefect registra
+      cada ejecución con su propio cliente, fuera de `client_session`. Se mide con `run_benchmarks.py`.
+    - `watchdog_events`: la suscripción a eventos por websocket no está implementada.
+
+    Se puede agregar latencia por petición y un límite de peticiones por segundo. Las peticiones que superan
+    el límite reciben 429 con `Retry-After`, igual que detrás de un proxy con rate limit, y el cliente
+    de Prefect las reintenta. `stats` registra las peticiones por endpoint, los 429 y el máximo de peticiones
+    simultáneas.
+
+    Los filtros admitidos son los que usa el monitoreo: IDs, tipo y nombre de estado, rangos y nulos de fechas,
+    despliegue, ejecución padre y etiquetas. Un filtro no admitido responde 422 para que la prueba no pase
+    en silencio con resultados incorrectos.
+
+    - `FakePrefectApi(page_limit, latency, latency_jitter, rate_limit, burst)`:
+        API en memoria. Se carga con `FakePrefectApi.from_workload(workload)` o `load(workload)`.
+    - `fake_api_session(api: FakePrefectApi, **client_settings) -> PrefectClient`:
+        Context manager asíncrono que abre el cliente compartido de `client_session` contra la API en memoria.
+
+    Ejemplo:
+        api = FakePrefectApi.from_workload(Workload(WorkloadConfig(flow_runs=100_000)), latency=0.02, rate_limit=50)
+        async with fake_api_session(api):
+            flow_runs = await get_flow_runs_info.fn(start_date, end_date, ["FAILED"])
+        print(api.stats)
+"""
+
+import asyncio
+import json
+import random
+import re
+import time
+from bisect import bisect_left, bisect_right
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from itertools import islice
+from typing import AsyncIterator, Callable, Iterable, Optional
+from uuid import UUID, uuid4
+
+import httpx
+from prefect.client.orchestration import PrefectClient
+from prefect.settings import PREFECT_API_URL, temporary_settings
+
+from dev.MONITOREO_PREFECT.client_session import client_session
+from dev.MONITOREO_PREFECT.server_settings import clear_settings_cache
+from dev.MONITOREO_PREFECT.benchmarks.workload import Workload
+
+FAKE_API_URL = "http://fake-prefect.local/api"
+FAKE_API_VERSION = "0.8.4"
+
+DEFAULT_PAGE_LIMIT = 200
+# Límite máximo de `/events/filter` en el servidor de Prefect, independiente de PREFECT_API_DEFAULT_LIMIT
+EVENTS_MAX_LIMIT = 50
+
+_ID_PATTERN = r"(?P<id>[0-9a-fA-F-]{36})"
+_DATE_FIELDS = ("start_time", "expected_start_time", "end_time")
+
+
+class UnsupportedFilter(ValueError):
+    """El filtro recibido usa campos que la API en memoria no implementa."""
+
+
+@dataclass
+class FakeApiStats:
+    """Peticiones recibidas por endpoint, respuestas 429 y máximo de peticiones simultáneas."""
+    requests: Counter = field(default_factory=Counter)
+    rate_limited: int = 0
+    max_in_flight: int = 0
+    unsupported: Counter = field(default_factory=Counter)
+
+    @property
+    def total_requests(self) -> int:
+        return sum(self.requests.values())
+
+
+class FakePrefectApi:
+    """
+    API de Prefect en memoria con índices ordenados por fecha de inicio y fecha programada.
+    Las consultas paginadas por rango de fechas recorren solo el rango pedido, por lo que una carga
+    de un millón de ejecuciones se pagina completa en segundos.
+    """
+
+    def __init__(
+            self,
+            page_limit: int = DEFAULT_PAGE_LIMIT,
+            latency: float = 0.0,
+            latency_jitter: float = 0.0,
+            rate_limit: Optional[float] = None,
+            burst: Optional[int] = None,
+            seed: int = 0
+        ):
+        """
+        Parámetros:
+        - page_limit (int, opcional): `PREFECT_API_DEFAULT_LIMIT` del servidor. Pedir más responde 422.
+        - latency (float, opcional): Segundos de demora de cada respuesta.
+        - latency_jitter (float, opcional): Demora adicional aleatoria entre 0 y este valor.
+        - rate_limit (float, opcional): Peticiones por segundo admitidas. Por defecto sin límite.
+        - burst (int, opcional): Peticiones que pueden llegar juntas antes de aplicar el límite. Por defecto `rate_limit`.
+        - seed (int, opcional): Semilla de la demora aleatoria.
+        """
+        self.page_limit = page_limit
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.stats = FakeApiStats()
+
+        self.flows: dict[UUID, dict] = {}
+        self.deployments: dict[UUID, dict] = {}
+        self.flow_runs: dict[UUID, dict] = {}
+        self.task_runs: dict[UUID, dict] = {}
+        self.logs: list[dict] = []
+        self._children: defaultdict[UUID, list[UUID]] = defaultdict(list)
+        self._task_runs_by_flow_run: defaultdict[UUID, list[UUID]] = defaultdict(list)
+        self._indexes: dict[str, _DateIndex] = {}
+        self._task_run_indexes: dict[str, _DateIndex] = {}
+
+        self._rate_limiter = _TokenBucket(rate_limit, burst or max(1, int(rate_limit))) if rate_limit else None
+        self._rng = random.Random(seed)
+        self._in_flight = 0
+        self._routes = self._build_routes()
+
+    @classmethod
+    def from_workload(cls, workload: Workload, **kwargs) -> "FakePrefectApi":
+        api = cls(**kwargs)
+        api.load(workload)
+        return api
+
+    def load(self, workload: Workload) -> None:
+        """Carga los flujos, despliegues y ejecuciones de la carga y arma los índices."""
+        self.flows.update((flow["id"], flow) for flow in workload.flows)
+        self.deployments.update((deployment["id"], deployment) for deployment in workload.deployments)
+
+        for _, flow_run, task_run in workload.iter_runs():
+            self.flow_runs[flow_run["id"]] = {**flow_run, "state_id": uuid4(), "parent_flow_run_id": None}
+            if task_run:
+                self.task_runs[task_run["id"]] = {**task_run, "state_id": uuid4()}
+                self.flow_runs[flow_run["id"]]["parent_flow_run_id"] = task_run["flow_run_id"]
+                self._children[task_run["flow_run_id"]].append(flow_run["id"])
+                self._task_runs_by_flow_run[task_run["flow_run_id"]].append(task_run["id"])
+
+        self._indexes = {
+            name: _DateIndex(self.flow_runs.values(), name, _flow_run_field) for name in ("start_time", "expected_start_time")
+        }
+        # Las ejecuciones de tarea solo se ordenan por fecha programada
+        self._task_run_indexes = {"expected_start_time": _DateIndex(self.task_runs.values(), "expected_start_time")}
+
+    @property
+    def transport(self) -> httpx.MockTransport:
+        """Transporte para `httpx.AsyncClient` o `client_session(transport=...)`."""
+        return httpx.MockTransport(self.handle)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        method, path = request.method, request.url.path.removeprefix(httpx.URL(FAKE_API_URL).path)
+        endpoint = f"{method} {re.sub(_ID_PATTERN, '{id}', path)}"
+        self.stats.requests[endpoint] += 1
+
+        if self._rate_limiter is not None:
+            retry_after = self._rate_limiter.acquire()
+            if retry_after > 0:
+                self.stats.rate_limited += 1
+                return httpx.Response(
+                    429, headers={"Retry-After": f"{retry_after:.3f}"}, json={"detail": "Rate limit exceeded."}
+                )
+
+        self._in_flight += 1
+        self.stats.max_in_flight = max(self.stats.max_in_flight, self._in_flight)
+        try:
+            if self.latency or self.latency_jitter:
+                await asyncio.sleep(self.latency + self._rng.uniform(0, self.latency_jitter))
+
+            for route_method, pattern, handler in self._routes:
+                match = pattern.fullmatch(path)
+                if route_method == method and match:
+                    body = json.loads(request.content) if request.content else {}
+                    try:
+                        return handler(body, **match.groupdict())
+                    except UnsupportedFilter as e:
+                        self.stats.unsupported[str(e)] += 1
+                        return httpx.Response(422, json={"detail": str(e)})
+
+            return httpx.Response(404, json={"detail": "Not Found"})
+        finally:
+            self._in_flight -= 1
+
+    def _build_routes(self) -> list[tuple[str, re.Pattern, Callable]]:
+        routes = [
+            ("GET", "/health", lambda body: _json(True)),
+            ("GET", "/admin/version", lambda body: _json(FAKE_API_VERSION)),
+            ("GET", "/admin/settings", lambda body: _json({"PREFECT_API_DEFAULT_LIMIT": self.page_limit})),
+            ("GET", "/csrf-token", lambda body: httpx.Response(422, json={"detail": "CSRF protection is disabled."})),
+            ("POST", "/flow_runs/filter", self._filter_flow_runs),
+            ("GET", f"/flow_runs/{_ID_PATTERN}", self._read_flow_run),
+            ("DELETE", f"/flow_runs/{_ID_PATTERN}", self._delete_flow_run),
+            ("PATCH", f"/flow_runs/{_ID_PATTERN}", self._update_flow_run),
+            ("POST", f"/flow_runs/{_ID_PATTERN}/set_state", self._set_flow_run_state),
+            ("POST", "/task_runs/filter", self._filter_task_runs),
+            ("POST", "/flows/filter", self._filter_flows),
+            ("GET", f"/flows/{_ID_PATTERN}", self._read_flow),
+            ("POST", "/deployments/filter", self._filter_deployments),
+            ("GET", f"/deployments/{_ID_PATTERN}", self._read_deployment),
+            ("POST", "/logs/", self._create_logs),
+            ("POST", "/events/filter", self._filter_events),
+        ]
+        return [(method, re.compile(pattern), handler) for method, pattern, handler in routes]
+
+    # Endpoints
+
+    def _filter_flow_runs(self, body: dict) -> httpx.Response:
+        for name in ("flows", "deployments", "task_runs", "work_pools", "work_pool_queues"):
+            if body.get(name):
+                raise UnsupportedFilter(f"Filtro no admitido: {name}")
+
+        offset, limit = self._page(body)
+        if limit is None:
+            return _limit_error(self.page_limit)
+
+        run_filter = _clean(body.get("flow_runs"))
+        predicate = _flow_run_predicate(run_filter)
+        sort = body.get("sort") or "ID_DESC"
+        candidates, ordered = self._flow_run_candidates(run_filter, sort)
+
+        matches = (flow_run for flow_run in candidates if predicate(flow_run))
+        if ordered:
+            page = list(islice(matches, offset, offset + limit))
+        else:
+            page = sorted(matches, key=_run_sort_key(sort, _flow_run_field))[offset:offset + limit]
+
+        return _json([_flow_run_json(flow_run) for flow_run in page])
+
+    def _read_flow_run(self, body: dict, id: str) -> httpx.Response:  # pylint: disable=redefined-builtin
+        flow_run = self.flow_runs.get(UUID(id))
+        return _json(_flow_run_json(flow_run)) if flow_run else _not_found()
+
+    def _delete_flow_run(self, body: dict, id: str) -> httpx.Response:  # pylint: disable=redefined-builtin
+        flow_run = self.flow_runs.pop(UUID(id), None)
+        return httpx.Response(204) if flow_run else _not_found()
+
+    def _update_flow_run(self, body: dict, id: str) -> httpx.Response:  # pylint: disable=redefined-builtin
+        flow_run = self.flow_runs.get(UUID(id))
+        if flow_run is None:
+            return _not_found()
+        if body.get("tags") is not None:
+            flow_run["tags"] = body["tags"]
+        return httpx.Response(204)
+
+    def _set_flow_run_state(self, body: dict, id: str) -> httpx.Response:  # pylint: disable=redefined-builtin
+        # Se acepta cualquier transición, como el servidor con `force=True`
+        flow_run = self.flow_runs.get(UUID(id))
+        if flow_run is None:
+            return _not_found()
+
+        state = body["state"]
+        flow_run.update(
+            state_id=uuid4(),
+            state_type=state["type"],
+            state_name=state.get("name") or state["type"].title(),
+            state_message=state.get("message"),
+            state_timestamp=datetime.now(timezone.utc),
+        )
+        return _json({"status": "ACCEPT", "state": _state_json(flow_run), "details": {"type": "accept_details"}})
+
+    def _create_logs(self, body: list) -> httpx.Response:
+        self.logs.extend(body)
+        return httpx.Response(201)
+
+    def _filter_task_runs(self, body: dict) -> httpx.Response:
+        for name in ("flows", "flow_runs", "deployments"):
+            if body.get(name):
+                raise UnsupportedFilter(f"Filtro no admitido: {name}")
+
+        offset, limit = self._page(body)
+        if limit is None:
+            return _limit_error(self.page_limit)
+
+        task_filter = _clean(body.get("task_runs"))
+        predicate = _task_run_predicate(task_filter)
+        sort = body.get("sort") or "ID_DESC"
+        candidates, ordered = self._task_run_candidates(task_filter, sort)
+
+        matches = (task_run for task_run in candidates if predicate(task_run))
+        if ordered:
+            page = list(islice(matches, offset, offset + limit))
+        else:
+            page = sorted(matches, key=_run_sort_key(sort))[offset:offset + limit]
+
+        return _json([_task_run_json(task_run) for task_run in page])
+
+    def _filter_flows(self, body: dict) -> httpx.Response:
+        return self._filter_by_id(body, "flows", self.flows, _flow_json)
+
+    def _read_flow(self, body: dict, id: str) -> httpx.Response:  # pylint: disable=redefined-builtin
+        flow = self.flows.get(UUID(id))
+        return _json(_flow_json(flow)) if flow else _not_found()
+
+    def _filter_deployments(self, body: dict) -> httpx.Response:
+        return self._filter_by_id(body, "deployments", self.deployments, _deployment_json)
+
+    def _read_deployment(self, body: dict, id: str) -> httpx.Response:  # pylint: disable=redefined-builtin
+        deployment = self.deployments.get(UUID(id))
+        return _json(_deployment_json(deployment)) if deployment else _not_found()
+
+    def _filter_by_id(self, body: dict, name: str, objects: dict, to_json: Callable) -> httpx.Response:
+        offset, limit = self._page(body)
+        if limit is None:
+            return _limit_error(self.page_limit)
+
+        object_filter = _clean(body.get(name))
+        _check_fields(object_filter, {"id"}, name)
+        ids = _any(object_filter, "id")
+        matches = [objects[object_id] for object_id in ids if object_id in objects] if ids is not None \
+            else list(objects.values())
+
+        return _json([to_json(item) for item in matches[offset:offset + limit]])
+
+    # Consultas
+
+    def _filter_events(self, body: dict) -> httpx.Response:
+        # El historial de eventos no se simula: solo se valida el límite como el servidor
+        if (body.get("limit") or EVENTS_MAX_LIMIT) > EVENTS_MAX_LIMIT:
+            return _limit_error(EVENTS_MAX_LIMIT)
+        return _json({"events": [], "total": 0, "next_page": None})
+
+    def _page(self, body: dict) -> tuple[int, Optional[int]]:
+        limit = body.get("limit")
+        if limit is None:
+            limit = self.page_limit
+        elif limit > self.page_limit:
+            return 0, None
+        return body.get("offset") or 0, limit
+
+    def _flow_run_candidates(self, run_filter: dict, sort: str) -> tuple[Iterable[dict], bool]:
+        """
+        Elige el conjunto más chico de ejecuciones que puede cumplir el filtro.
+        Retorna también si ya está en el orden pedido, para cortar apenas se completa la página.
+        """
+        for name, index in self._indexes.items():
+            if sort == f"{name.upper()}_ASC" and _has_range(run_filter, name):
+                return self._alive(index.between(run_filter[name].get("after_"), run_filter[name].get("before_"))), True
+
+        ids = _any(run_filter, "id")
+        if ids is not None:
+            return self._alive(ids), False
+
+        parent_ids = _any(run_filter, "parent_flow_run_id")
+        if parent_ids is not None:
+            return self._alive(child for parent_id in parent_ids for child in self._children.get(parent_id, ())), False
+
+        for name, index in self._indexes.items():
+            if _has_range(run_filter, name):
+                return self._alive(index.between(run_filter[name].get("after_"), run_filter[name].get("before_"))), False
+
+        return list(self.flow_runs.values()), False
+
+    def _task_run_candidates(self, task_filter: dict, sort: str) -> tuple[Iterable[dict], bool]:
+        """Igual que `_flow_run_candidates` para ejecuciones de tarea."""
+        index = self._task_run_indexes["expected_start_time"]
+        if sort == "EXPECTED_START_TIME_ASC" and _has_range(task_filter, "expected_start_time"):
+            criteria = task_filter["expected_start_time"]
+            return self._task_runs(index.between(criteria.get("after_"), criteria.get("before_"))), True
+
+        ids = _any(task_filter, "id")
+        if ids is not None:
+            return self._task_runs(ids), False
+
+        flow_run_ids = _any(task_filter, "flow_run_id")
+        if flow_run_ids is not None:
+            return self._task_runs(
+                task_run_id for flow_run_id in flow_run_ids for task_run_id in self._task_runs_by_flow_run.get(flow_run_id, ())
+            ), False
+
+        return list(self.task_runs.values()), False
+
+    def _task_runs(self, task_run_ids: Iterable[UUID]) -> Iterable[dict]:
+        for task_run_id in task_run_ids:
+            task_run = self.task_runs.get(task_run_id)
+            if task_run is not None:
+                yield task_run
+
+    def _alive(self, flow_run_ids: Iterable[UUID]) -> Iterable[dict]:
+        # Los índices no se actualizan al eliminar: se saltean las ejecuciones que ya no existen
+        for flow_run_id in flow_run_ids:
+            flow_run = self.flow_runs.get(flow_run_id)
+            if flow_run is not None:
+                yield flow_run
+
+
+class _DateIndex:
+    """IDs de ejecuciones ordenados por un campo de fecha, para recorrer rangos con búsqueda binaria."""
+
+    def __init__(self, runs: Iterable[dict], field_name: str, value: Callable[[dict, str], Optional[datetime]] = None):
+        value = value or _field
+        entries = sorted(
+            (value(run, field_name), str(run["id"]), run["id"])
+            for run in runs if value(run, field_name) is not None
+        )
+        self.keys = [entry[0] for entry in entries]
+        self.ids = [entry[2] for entry in entries]
+
+    def between(self, after: Optional[str], before: Optional[str]) -> Iterable[UUID]:
+        low = bisect_left(self.keys, _parse_datetime(after)) if after else 0
+        high = bisect_right(self.keys, _parse_datetime(before)) if before else len(self.keys)
+        return islice(self.ids, low, high)
+
+
+class _TokenBucket:
+    """Límite de peticiones por segundo con ráfaga. `acquire` devuelve 0 o los segundos a esperar."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def acquire(self) -> float:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+@asynccontextmanager
+async def fake_api_session(api: FakePrefectApi, **client_settings) -> AsyncIterator[PrefectClient]:
+    """
+    Abre `client_session` contra la API en memoria. Las funciones del monitoreo que se llamen dentro del bloque
+    usan este cliente compartido. La configuración del servidor en caché se descarta al entrar y al salir
+    para que el límite de página de la API en memoria no se mezcle con el de un servidor real.
+    """
+    with temporary_settings({PREFECT_API_URL: FAKE_API_URL}):
+        clear_settings_cache()
+        try:
+            async with client_session(transport=api.transport, **client_settings) as client:
+                yield client
+        finally:
+            clear_settings_cache()
+
+
+# Filtros
+
+def _flow_run_predicate(run_filter: dict) -> Callable[[dict], bool]:
+    _check_fields(
+        run_filter,
+        {"id", "name", "state", "deployment_id", "parent_flow_run_id", "parent_task_run_id", "tags", *_DATE_FIELDS},
+        "flow_runs"
+    )
+    checks = []
+
+    for name in ("id", "deployment_id", "parent_flow_run_id", "parent_task_run_id"):
+        criteria = run_filter.get(name)
+        if criteria:
+            checks.append(_uuid_check(name, criteria))
+
+    if run_filter.get("name"):
+        names = run_filter["name"].get("any_")
+        like = run_filter["name"].get("like_")
+        checks.append(lambda flow_run: (names is None or flow_run["name"] in names)
+                      and (like is None or like.lower() in flow_run["name"].lower()))
+
+    checks.extend(_state_checks(run_filter, "flow_runs"))
+    checks.extend(_date_checks(run_filter, _flow_run_field))
+
+    tags = run_filter.get("tags")
+    if tags:
+        all_, is_null = tags.get("all_"), tags.get("is_null_")
+        checks.append(lambda flow_run: (all_ is None or set(all_) <= set(flow_run["tags"]))
+                      and (is_null is None or (not flow_run["tags"]) == is_null))
+
+    return lambda flow_run: all(check(flow_run) for check in checks)
+
+
+def _task_run_predicate(task_filter: dict) -> Callable[[dict], bool]:
+    _check_fields(task_filter, {"id", "flow_run_id", "state", *_DATE_FIELDS}, "task_runs")
+    checks = [_uuid_check(name, task_filter[name]) for name in ("id", "flow_run_id") if task_filter.get(name)]
+    checks.extend(_state_checks(task_filter, "task_runs"))
+    checks.extend(_date_checks(task_filter))
+
+    return lambda task_run: all(check(task_run) for check in checks)
+
+
+def _state_checks(run_filter: dict, name: str) -> list[Callable[[dict], bool]]:
+    state = _clean(run_filter.get("state"))
+    _check_fields(state, {"type", "name"}, f"{name}.state")
+    checks = []
+    for key, field_name in (("state_type", "type"), ("state_name", "name")):
+        criteria = state.get(field_name)
+        if criteria:
+            any_, not_any = criteria.get("any_"), criteria.get("not_any_")
+            checks.append(lambda run, key=key, any_=any_, not_any=not_any: (
+                (any_ is None or _state_value(run[key]) in any_)
+                and (not_any is None or _state_value(run[key]) not in not_any)
+            ))
+    return checks
+
+
+def _date_checks(run_filter: dict, value: Callable[[dict, str], Optional[datetime]] = None) -> list[Callable[[dict], bool]]:
+    return [_date_check(name, run_filter[name], value or _field) for name in _DATE_FIELDS if run_filter.get(name)]
+
+
+def _uuid_check(name: str, criteria: dict) -> Callable[[dict], bool]:
+    any_ = {UUID(value) for value in criteria["any_"]} if criteria.get("any_") is not None else None
+    not_any = {UUID(value) for value in criteria["not_any_"]} if criteria.get("not_any_") is not None else None
+    is_null = criteria.get("is_null_")
+
+    def check(flow_run: dict) -> bool:
+        value = flow_run[name]
+        return ((any_ is None or value in any_)
+                and (not_any is None or value not in not_any)
+                and (is_null is None or (value is None) == is_null))
+
+    return check
+
+
+def _date_check(name: str, criteria: dict, value: Callable[[dict, str], Optional[datetime]]) -> Callable[[dict], bool]:
+    after = _parse_datetime(criteria["after_"]) if criteria.get("after_") else None
+    before = _parse_datetime(criteria["before_"]) if criteria.get("before_") else None
+    is_null = criteria.get("is_null_")
+
+    def check(run: dict) -> bool:
+        if is_null is not None and (run[name] is None) != is_null:
+            return False
+        date = value(run, name)
+        if after is not None and (date is None or date < after):
+            return False
+        if before is not None and (date is None or date > before):
+            return False
+        return True
+
+    return check
+
+
+def _field(run: dict, name: str):
+    return run.get(name)
+
+
+def _flow_run_field(flow_run: dict, name: str):
+    # Como el servidor de Prefect 3: los rangos y el orden por start_time usan la fecha programada si no inició.
+    # `is_null_` sí mira el start_time real
+    if name == "start_time":
+        return flow_run["start_time"] or flow_run["expected_start_time"]
+    return flow_run.get(name)
+
+
+def _check_fields(object_filter: dict, supported: set[str], name: str) -> None:
+    unsupported = set(object_filter) - supported - {"operator"}
+    if unsupported:
+        raise UnsupportedFilter(f"Filtro no admitido: {name}.{sorted(unsupported)[0]}")
+
+
+def _clean(value: Optional[dict]) -> dict:
+    """Quita los campos nulos que el cliente serializa para los filtros que no se usan."""
+    if not value:
+        return {}
+    return {key: _clean(item) if isinstance(item, dict) else item for key, item in value.items() if item is not None}
+
+
+def _any(object_filter: dict, name: str) -> Optional[list[UUID]]:
+    values = (object_filter.get(name) or {}).get("any_")
+    return [UUID(value) for value in values] if values is not None else None
+
+
+def _has_range(run_filter: dict, name: str) -> bool:
+    criteria = run_filter.get(name) or {}
+    return bool(criteria.get("after_") or criteria.get("before_"))
+
+
+def _run_sort_key(sort: str, value: Callable[[dict, str], Optional[datetime]] = None) -> Callable[[dict], tuple]:
+    value = value or _field
+    field_name, _, direction = sort.rpartition("_")
+    field_name = field_name.lower()
+    descending = direction == "DESC"
+
+    if field_name == "id":
+        return lambda flow_run: _descending(str(flow_run["id"])) if descending else str(flow_run["id"])
+
+    def key(run: dict) -> tuple:
+        sort_value = value(run, field_name)
+        # Los nulos van al final en ambos sentidos, como en el servidor
+        if sort_value is None:
+            return (1, 0)
+        if isinstance(sort_value, datetime):
+            sort_value = sort_value.timestamp()
+        return (0, -sort_value if descending else sort_value)
+
+    return key
+
+
+def _descending(value: str) -> tuple:
+    return tuple(-ord(character) for character in value)
+
+
+# Serialización con el formato de la API
+
+def _state_json(run: dict) -> dict:
+    return {
+        "id": str(run["state_id"]),
+        "type": _state_value(run["state_type"]),
+        "name": run["state_name"],
+        "timestamp": _iso(run["state_timestamp"]),
+        "message": run["state_message"],
+        "state_details": {"flow_run_id": str(run["id"])},
+    }
+
+
+def _flow_run_json(flow_run: dict) -> dict:
+    state = _state_json(flow_run)
+    return {
+        "id": str(flow_run["id"]),
+        "created": _iso(flow_run["expected_start_time"]),
+        "updated": _iso(flow_run["state_timestamp"]),
+        "name": flow_run["name"],
+        "flow_id": str(flow_run["flow_id"]),
+        "deployment_id": _str(flow_run["deployment_id"]),
+        "parent_task_run_id": _str(flow_run["parent_task_run_id"]),
+        "state_id": str(flow_run["state_id"]),
+        "state_type": state["type"],
+        "state_name": state["name"],
+        "state": state,
+        "expected_start_time": _iso(flow_run["expected_start_time"]),
+        "start_time": _iso(flow_run["start_time"]),
+        "end_time": _iso(flow_run["end_time"]),
+        "total_run_time": flow_run["total_run_time"].total_seconds(),
+        "estimated_run_time": flow_run["total_run_time"].total_seconds(),
+        "run_count": flow_run["run_count"],
+        "tags": flow_run["tags"],
+        "parameters": flow_run["parameters"],
+        "empirical_policy": {},
+        "context": {},
+    }
+
+
+def _task_run_json(task_run: dict) -> dict:
+    state = {
+        **_state_json(task_run),
+        "state_details": {"flow_run_id": str(task_run["flow_run_id"]), "task_run_id": str(task_run["id"])},
+    }
+    return {
+        "id": str(task_run["id"]),
+        "created": _iso(task_run["expected_start_time"]),
+        "updated": _iso(task_run["state_timestamp"]),
+        "name": task_run["name"],
+        "flow_run_id": str(task_run["flow_run_id"]),
+        "task_key": task_run["task_key"],
+        "dynamic_key": task_run["dynamic_key"],
+        "state_id": str(task_run["state_id"]),
+        "state_type": state["type"],
+        "state_name": state["name"],
+        "state": state,
+        "expected_start_time": _iso(task_run["expected_start_time"]),
+        "start_time": _iso(task_run["start_time"]),
+        "end_time": _iso(task_run["end_time"]),
+        "total_run_time": task_run["total_run_time"].total_seconds(),
+        "estimated_run_time": task_run["total_run_time"].total_seconds(),
+        "run_count": task_run["run_count"],
+        "tags": [],
+        "task_inputs": {},
+        "empirical_policy": {},
+    }
+
+
+def _flow_json(flow: dict) -> dict:
+    return {"id": str(flow["id"]), "name": flow["name"], "tags": flow.get("tags", []), **_timestamps()}
+
+
+def _deployment_json(deployment: dict) -> dict:
+    return {
+        "id": str(deployment["id"]),
+        "name": deployment["name"],
+        "flow_id": str(deployment["flow_id"]),
+        "description": deployment["description"],
+        "entrypoint": deployment["entrypoint"],
+        "tags": [],
+        "parameters": {},
+        "schedules": [],
+        "job_variables": {},
+        **_timestamps(),
+    }
+
+
+def _timestamps() -> dict:
+    # Flujos y despliegues no cambian durante la prueba: fecha fija para que la caché de metadatos no los invalide
+    return {"created": "2024-01-01T00:00:00+00:00", "updated": "2024-01-01T00:00:00+00:00"}
+
+
+def _json(content) -> httpx.Response:
+    return httpx.Response(200, json=content)
+
+
+def _not_found() -> httpx.Response:
+    return httpx.Response(404, json={"detail": "Not Found"})
+
+
+def _limit_error(page_limit: int) -> httpx.Response:
+    return httpx.Response(422, json={"detail": f"limit debe ser menor o igual a {page_limit}"})
+
+
+def _state_value(state_type) -> Optional[str]:
+    return getattr(state_type, "value", state_type)
+
+
+def _parse_datetime(value: str) -> datetime:
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def _str(value) -> Optional[str]:
+    return str(value) if value is not None else None
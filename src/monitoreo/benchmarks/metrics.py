@@ -0,0 +1,165 @@
+"""
+    Métricas de las etapas de los benchmarks.
+
+    Cada etapa registra el tiempo de reloj, la cantidad de llamadas a la API y el pico de memoria (RSS).
+    Las llamadas se cuentan en `httpx.AsyncClient.send` y `httpx.Client.send`, por lo que incluyen las consultas
+    de todos los clientes que abran las funciones medidas (compartidos o no) y también los reintentos.
+
+    El pico de RSS se mide por etapa muestreando la memoria del proceso con psutil. Sin psutil se usa
+    `ru_maxrss`, que es el máximo de toda la vida del proceso y por lo tanto solo crece entre etapas.
+
+    - `StageResult`:
+        Resultado de una etapa, serializable a JSON con `dataclasses.asdict`.
+    - `ApiCallCounter`:
+        Cuenta las peticiones HTTP por método y endpoint mientras está instalado.
+    - `measure_stage(name: str, counter: ApiCallCounter) -> StageResult`:
+        Context manager que mide una etapa y completa su resultado al salir.
+"""
+
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+import httpx
+
+try:
+    import psutil
+except ImportError:  # pragma: no cover - psutil es opcional
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - no existe en Windows
+    resource = None
+
+RSS_SAMPLE_INTERVAL_SECONDS = 0.02
+
+_UUID_PATTERN = re.compile(r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}")
+
+
+@dataclass
+class StageResult:
+    """Métricas de una etapa. `items` es la cantidad de elementos que procesó, si la etapa la informa."""
+    name: str
+    wall_seconds: float = 0.0
+    api_calls: int = 0
+    api_calls_by_endpoint: dict[str, int] = field(default_factory=dict)
+    peak_rss_mb: Optional[float] = None
+    rss_source: Optional[str] = None
+    items: Optional[int] = None
+    error: Optional[str] = None
+
+
+class ApiCallCounter:
+    """
+    Cuenta las peticiones HTTP de todos los clientes httpx del proceso mientras está instalado.
+    Los IDs de los endpoints se reemplazan por `{id}` para agrupar las consultas del mismo tipo.
+    """
+
+    def __init__(self):
+        self._calls: Counter = Counter()
+        self._lock = threading.Lock()
+        self._originals = None
+
+    def __enter__(self) -> "ApiCallCounter":
+        async_send, sync_send = httpx.AsyncClient.send, httpx.Client.send
+        counter = self
+
+        async def counted_async_send(client, request, *args, **kwargs):
+            counter._record(request)
+            return await async_send(client, request, *args, **kwargs)
+
+        def counted_sync_send(client, request, *args, **kwargs):
+            counter._record(request)
+            return sync_send(client, request, *args, **kwargs)
+
+        self._originals = (async_send, sync_send)
+        httpx.AsyncClient.send, httpx.Client.send = counted_async_send, counted_sync_send
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        httpx.AsyncClient.send, httpx.Client.send = self._originals
+        self._originals = None
+
+    def snapshot(self) -> Counter:
+        with self._lock:
+            return Counter(self._calls)
+
+    def _record(self, request: httpx.Request) -> None:
+        endpoint = f"{request.method} {_UUID_PATTERN.sub('{id}', request.url.path)}"
+        with self._lock:
+            self._calls[endpoint] += 1
+
+
+@contextmanager
+def measure_stage(name: str, counter: ApiCallCounter) -> Iterator[StageResult]:
+    """
+    Mide el bloque como una etapa. Si el bloque lanza una excepción se guarda en `error` y se propaga.
+
+    Ejemplo:
+        with measure_stage("get_flow_runs_info", counter) as stage:
+            stage.items = len(asyncio.run(get_flow_runs_info.fn(start_date, end_date)))
+    """
+    result = StageResult(name=name)
+    calls_before = counter.snapshot()
+    sampler = _RssSampler()
+    sampler.start()
+    started_at = time.perf_counter()
+
+    try:
+        yield result
+    except BaseException as e:
+        result.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        result.wall_seconds = round(time.perf_counter() - started_at, 4)
+        result.peak_rss_mb, result.rss_source = sampler.stop()
+
+        calls = counter.snapshot()
+        calls.subtract(calls_before)
+        result.api_calls_by_endpoint = dict(sorted((endpoint, count) for endpoint, count in calls.items() if count))
+        result.api_calls = sum(result.api_calls_by_endpoint.values())
+
+
+class _RssSampler:
+    """Muestrea el RSS del proceso en un hilo mientras dura la etapa."""
+
+    def __init__(self):
+        self._peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        if psutil is None:
+            return
+        process = psutil.Process()
+        self._peak = process.memory_info().rss
+
+        def sample():
+            while not self._stop.wait(RSS_SAMPLE_INTERVAL_SECONDS):
+                self._peak = max(self._peak, process.memory_info().rss)
+
+        self._thread = threading.Thread(target=sample, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> tuple[Optional[float], Optional[str]]:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            return _to_mb(self._peak), "psutil"
+
+        if resource is not None:
+            max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # Linux informa kilobytes y macOS bytes
+            return _to_mb(max_rss if sys.platform == "darwin" else max_rss * 1024), "ru_maxrss"
+
+        return None, None
+
+
+def _to_mb(value: int) -> float:
+    return round(value / (1024 * 1024), 1)
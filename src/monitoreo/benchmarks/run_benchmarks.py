@@ -0,0 +1,237 @@
+"""
+    Benchmarks del monitoreo contra un servidor de Prefect local y efímero.
+
+    Para cada tamaño pedido se levanta un servidor con `prefect_test_harness` (SQLite en un directorio temporal),
+    con un PREFECT_HOME propio para que las cachés y checkpoints del monitoreo empiecen vacíos,
+    se carga una carga sintética de `workload.py` con `seed_data.seed_database` y se miden las etapas:
+        - `get_flow_runs_info`: lectura paginada de ejecuciones fallidas del período.
+        - `get_failed_flow_runs`: armado completo del DataFrame del reporte periódico.
+        - `watchdog_scan`: búsqueda de ejecuciones demoradas y de larga duración del watchdog.
+        - `db_cleanup`: eliminación de todas las ejecuciones del período. Es destructiva, por eso va última.
+
+    De cada etapa se registra el tiempo de reloj, las llamadas a la API por endpoint y el pico de RSS
+    (ver `metrics.py`). Los resultados se guardan en JSON junto con la versión de Python, de Prefect y el commit,
+    para comparar corridas entre cambios.
+
+    Uso:
+        python run_benchmarks.py --sizes 10000 100000 --output benchmark.json
+        python run_benchmarks.py --sizes 1000000 --stages get_flow_runs_info watchdog_scan
+
+    - `run_benchmarks(sizes, output, stages, workload_config) -> dict`:
+        Corre los benchmarks para cada tamaño y guarda el JSON.
+    - `benchmark_stages(start_date, end_date, stages) -> list[dict]`:
+        Flujo que mide las etapas contra el servidor actual.
+"""
+
+import argparse
+import asyncio
+import importlib.util
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+from dataclasses import asdict, replace
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, Sequence
+
+import prefect
+from prefect import flow
+from prefect.settings import PREFECT_HOME, temporary_settings
+from prefect.testing.utilities import prefect_test_harness
+
+from dev.MONITOREO_PREFECT.get_prefect_info import get_flow_runs_info
+from dev.MONITOREO_PREFECT.periodic_report.prefect_periodic_report import get_failed_flow_runs
+from dev.MONITOREO_PREFECT.db_cleanup.db_cleanup import db_cleanup
+from dev.MONITOREO_PREFECT.server_settings import clear_settings_cache
+from dev.MONITOREO_PREFECT.benchmarks.metrics import ApiCallCounter, measure_stage
+from dev.MONITOREO_PREFECT.benchmarks.seed_data import seed_database
+from dev.MONITOREO_PREFECT.benchmarks.workload import WorkloadConfig
+
+STAGES = ("get_flow_runs_info", "get_failed_flow_runs", "watchdog_scan", "db_cleanup")
+
+DEFAULT_SIZES = (10_000,)
+
+REPORT_STATES = ["FAILED", "CRASHED"]
+
+# Umbrales del watchdog en horas, los mismos que usa su despliegue
+WATCHDOG_STALE_HOURS = 12
+WATCHDOG_LONG_RUNNING_HOURS = 1
+
+# El watchdog no es parte del paquete de monitoreo: se carga desde su script
+WATCHDOG_PATH = Path(__file__).resolve().parents[2] / "watchdog" / "watchdog.py"
+
+
+def run_benchmarks(
+        sizes: Sequence[int] = DEFAULT_SIZES,
+        output: Optional[str] = None,
+        stages: Sequence[str] = STAGES,
+        workload_config: Optional[WorkloadConfig] = None
+    ) -> dict:
+    """
+    Corre los benchmarks con un servidor nuevo por cada tamaño.
+
+    Parámetros:
+    - sizes (list[int]): Cantidad de ejecuciones de flujo a cargar en cada corrida.
+    - output (str, opcional): Ruta del JSON de resultados. Si es None no se guarda.
+    - stages (list[str], opcional): Etapas a medir, en el orden de `STAGES`.
+    - workload_config (WorkloadConfig, opcional): Forma de la carga sintética. `flow_runs` se reemplaza por cada tamaño.
+    Retorna:
+    - dict: Resultados con el entorno y, por tamaño, el resumen de la carga y las métricas de cada etapa.
+    """
+    unknown = set(stages) - set(STAGES)
+    if unknown:
+        raise ValueError(f"Etapas desconocidas: {sorted(unknown)}. Las etapas válidas son {STAGES}.")
+    stages = [stage for stage in STAGES if stage in stages]
+    workload_config = workload_config or WorkloadConfig()
+
+    results = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "environment": _environment(),
+        "workload_config": {
+            **asdict(workload_config),
+            "state_weights": {state.value: weight for state, weight in workload_config.state_weights.items()},
+        },
+        "runs": [],
+    }
+
+    for size in sizes:
+        # Cada tamaño usa un PREFECT_HOME temporal: la caché de metadatos, el checkpoint de db_cleanup y la
+        # configuración guardada no se mezclan entre corridas ni con los del usuario
+        with tempfile.TemporaryDirectory(prefix="monitoreo_benchmark_") as home, \
+                temporary_settings({PREFECT_HOME: home}), prefect_test_harness():
+            # La configuración en memoria puede ser la de otro servidor
+            clear_settings_cache()
+            with ApiCallCounter() as counter, measure_stage("seed", counter) as seed_stage:
+                summary = asyncio.run(seed_database(replace(workload_config, flow_runs=size)))
+                seed_stage.items = summary["flow_runs"]
+
+            try:
+                stage_results = benchmark_stages(summary["start_date"], summary["end_date"], stages)
+            finally:
+                clear_settings_cache()
+
+        results["runs"].append({
+            "size": size,
+            "seed": {**summary, "wall_seconds": seed_stage.wall_seconds},
+            "stages": stage_results,
+        })
+        print(format_run(results["runs"][-1]))
+
+    if output:
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+        with open(output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2, default=str)
+
+    return results
+
+
+@flow(name="Benchmark monitoreo")
+def benchmark_stages(start_date: datetime, end_date: datetime, stages: Sequence[str] = STAGES) -> list[dict]:
+    """
+    Mide las etapas contra el servidor configurado. Corre como flujo porque las funciones medidas
+    usan el logger y el contexto de ejecución de Prefect. Se llama a `.fn` de cada tarea para medir
+    la función y no el registro de la ejecución de la tarea.
+    """
+    results = []
+
+    with ApiCallCounter() as counter:
+        for name in stages:
+            with measure_stage(name, counter) as stage:
+                stage.items = _run_stage(name, start_date, end_date)
+            results.append(asdict(stage))
+
+    return results
+
+
+def _run_stage(name: str, start_date: datetime, end_date: datetime) -> Optional[int]:
+    if name == "get_flow_runs_info":
+        return len(asyncio.run(get_flow_runs_info.fn(start_date, end_date, REPORT_STATES)))
+
+    if name == "get_failed_flow_runs":
+        return len(get_failed_flow_runs.fn(start_date, end_date, REPORT_STATES))
+
+    if name == "watchdog_scan":
+        watchdog = _load_watchdog()
+        watchdog.set_current_flow_run()
+        stale, long_running = asyncio.run(
+            watchdog.scan_flow_runs.fn(WATCHDOG_STALE_HOURS, WATCHDOG_LONG_RUNNING_HOURS)
+        )
+        return len(stale) + len(long_running)
+
+    if name == "db_cleanup":
+        asyncio.run(db_cleanup.fn(
+            start_date.replace(tzinfo=None), end_date.replace(tzinfo=None), timezone_str="UTC", resume=False
+        ))
+        return None
+
+    raise ValueError(f"Etapa desconocida: {name}")
+
+
+def _load_watchdog():
+    spec = importlib.util.spec_from_file_location("watchdog_benchmark", WATCHDOG_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def format_run(run: dict) -> str:
+    """Resumen legible de una corrida para la consola."""
+    lines = [f"Tamaño {run['size']}: carga en {run['seed']['wall_seconds']:.1f} s"]
+    for stage in run["stages"]:
+        lines.append(
+            f"  {stage['name']:<22} {stage['wall_seconds']:>9.2f} s {stage['api_calls']:>7} llamadas"
+            f" {stage['peak_rss_mb'] if stage['peak_rss_mb'] is not None else '-':>8} MB"
+            f" {stage['items'] if stage['items'] is not None else '':>8}"
+        )
+    return "\n".join(lines)
+
+
+def _environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, cwd=Path(__file__).parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "python": sys.version.split()[0],
+        "prefect": prefect.__version__,
+        "platform": platform.platform(),
+        "git_commit": commit,
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks del monitoreo contra un servidor de Prefect efímero.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="Cantidad de ejecuciones de flujo a cargar en cada corrida.")
+    parser.add_argument("--stages", nargs="+", default=list(STAGES), choices=STAGES, help="Etapas a medir.")
+    parser.add_argument("--output", default=f"benchmark_{datetime.now():%Y%m%d_%H%M%S}.json",
+                        help="Ruta del JSON de resultados.")
+    parser.add_argument("--days", type=float, default=WorkloadConfig.days, help="Días en los que se reparten las ejecuciones.")
+    parser.add_argument("--subflow-ratio", type=float, default=WorkloadConfig.subflow_ratio)
+    parser.add_argument("--max-subflow-depth", type=int, default=WorkloadConfig.max_subflow_depth)
+    parser.add_argument("--collision-ratio", type=float, default=WorkloadConfig.collision_ratio,
+                        help="Fracción de ejecuciones en ráfagas con la misma fecha.")
+    parser.add_argument("--seed", type=int, default=WorkloadConfig.seed)
+    args = parser.parse_args(argv)
+
+    run_benchmarks(
+        args.sizes,
+        args.output,
+        args.stages,
+        WorkloadConfig(
+            days=args.days,
+            subflow_ratio=args.subflow_ratio,
+            max_subflow_depth=args.max_subflow_depth,
+            collision_ratio=args.collision_ratio,
+            seed=args.seed,
+        ),
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+    Carga de datos sintéticos en la base de datos de un servidor de Prefect de prueba.
+
+    Crear cientos de miles de ejecuciones por la API lleva horas y además la API no permite fijar
+    `start_time` ni `end_time`, que los asigna el orquestador. Por eso las filas se insertan por lotes
+    directamente en la base del servidor (SQLite en el directorio temporal de `prefect_test_harness`)
+    con los modelos del servidor de Prefect. Solo debe usarse contra un servidor de prueba.
+
+    Los datos los genera `workload.Workload`: flujos, despliegues con metadatos YAML, ejecuciones terminadas,
+    en curso y demoradas, árboles de subflujos con su tarea padre y ráfagas de ejecuciones con la misma fecha.
+
+    - `seed_database(config: WorkloadConfig, end_date: datetime = None, batch_size: int) -> dict`:
+        Inserta la carga y devuelve un resumen con las cantidades y el rango de fechas generado.
+"""
+
+from datetime import datetime, timezone
+from typing import Iterator, Optional
+from uuid import uuid4
+
+import sqlalchemy as sa
+from prefect.server.database.dependencies import provide_database_interface
+
+from dev.MONITOREO_PREFECT.benchmarks.workload import Workload, WorkloadConfig
+
+DEFAULT_BATCH_SIZE = 5_000
+
+# Campos de la ejecución que se guardan en su estado y no en la tabla de ejecuciones
+_STATE_FIELDS = ("state_message",)
+
+
+async def seed_database(
+        config: WorkloadConfig,
+        end_date: Optional[datetime] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE
+    ) -> dict:
+    """
+    Inserta la carga sintética en la base del servidor configurado en los settings actuales.
+
+    Parámetros:
+    - config (WorkloadConfig): Forma y tamaño de la carga.
+    - end_date (datetime, opcional): Fin del período generado. Por defecto ahora.
+    - batch_size (int, opcional): Filas por transacción.
+    Retorna:
+    - dict: Cantidad de flujos, despliegues, ejecuciones y subflujos insertados y el rango de fechas
+      (`start_date`, `end_date`) en el que se programaron las ejecuciones terminadas.
+    """
+    workload = Workload(config, end_date)
+    db = provide_database_interface()
+
+    async with db.session_context(begin_transaction=True) as session:
+        await session.execute(sa.insert(db.Flow), workload.flows)
+        await session.execute(sa.insert(db.Deployment), workload.deployments)
+
+    summary = {"flows": len(workload.flows), "deployments": len(workload.deployments), "flow_runs": 0, "subflow_runs": 0}
+    for batch in _batches(workload.iter_runs(), batch_size):
+        states = [_state_row(flow_run, "flow_run_id") for _, flow_run, _ in batch]
+        task_states = [_state_row(task_run, "task_run_id") for _, _, task_run in batch if task_run]
+        # `updated` va explícito: si no, SQLAlchemy agrega el `onupdate` del modelo, que en SQLite
+        # es una expresión que no admite actualizaciones por lotes (executemany)
+        updated = datetime.now(timezone.utc)
+        current_states = [
+            {"id": state["flow_run_id"], "state_id": state["id"], "updated": updated} for state in states
+        ]
+        current_task_states = [
+            {"id": state["task_run_id"], "state_id": state["id"], "updated": updated} for state in task_states
+        ]
+
+        async with db.session_context(begin_transaction=True) as session:
+            # Orden de las claves foráneas: ejecución padre -> tarea padre -> subflujo, nivel por nivel.
+            # Ejecución y estado se referencian mutuamente, así que `state_id` se asigna al final como hace el servidor
+            for depth in sorted({depth for depth, _, _ in batch}):
+                level = [(flow_run, task_run) for run_depth, flow_run, task_run in batch if run_depth == depth]
+                task_runs = [_run_row(task_run) for _, task_run in level if task_run]
+                if task_runs:
+                    await session.execute(sa.insert(db.TaskRun), task_runs)
+                await session.execute(sa.insert(db.FlowRun), [_run_row(flow_run) for flow_run, _ in level])
+
+            await session.execute(sa.insert(db.FlowRunState), states)
+            await session.execute(sa.update(db.FlowRun), current_states)
+            if task_states:
+                await session.execute(sa.insert(db.TaskRunState), task_states)
+                await session.execute(sa.update(db.TaskRun), current_task_states)
+
+        summary["flow_runs"] += len(batch)
+        summary["subflow_runs"] += sum(1 for depth, _, _ in batch if depth)
+
+    summary["start_date"] = workload.start_date
+    summary["end_date"] = workload.end_date
+
+    return summary
+
+
+def _run_row(run: dict) -> dict:
+    return {key: value for key, value in run.items() if key not in _STATE_FIELDS}
+
+
+def _state_row(run: dict, run_id_field: str) -> dict:
+    return {
+        "id": uuid4(),
+        run_id_field: run["id"],
+        "type": run["state_type"],
+        "name": run["state_name"],
+        "timestamp": run["state_timestamp"],
+        "message": run["state_message"],
+    }
+
+
+def _batches(rows: Iterator, size: int) -> Iterator[list]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
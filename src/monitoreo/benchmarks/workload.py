@@ -0,0 +1,261 @@
+"""
+    Generador de cargas sintéticas de ejecuciones de flujo para pruebas de carga.
+
+    Genera historiales con la forma de los de producción: flujos, despliegues con metadatos YAML en la descripción
+    (en el formato que espera `extract_metadata`), ejecuciones terminadas con tasas de falla configurables,
+    árboles de subflujos de profundidad configurable, ejecuciones en curso y demoradas para el watchdog
+    y ráfagas de ejecuciones con exactamente la misma fecha, más grandes que una página de la API,
+    para probar la paginación keyset en los bordes de página.
+
+    Las ejecuciones se generan de a una con un generador, por lo que la memoria no depende del tamaño de la carga.
+    La misma configuración y semilla generan siempre los mismos datos.
+    La carga la consumen `seed_data.seed_database` (servidor de prueba) y `fake_api.FakePrefectApi` (API en memoria).
+
+    - `WorkloadConfig`:
+        Tamaño y forma de la carga.
+    - `Workload(config: WorkloadConfig, end_date: datetime = None)`:
+        Carga generada: `flows`, `deployments`, el rango de fechas y `iter_runs()` para recorrer las ejecuciones.
+    - `deployment_description(index: int, responsable: str, area: str) -> str`:
+        Descripción de despliegue con el bloque de metadatos YAML.
+"""
+
+import random
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, Optional
+from uuid import UUID
+
+from prefect.client.schemas.objects import StateType
+
+STATE_NAMES = {
+    StateType.COMPLETED: "Completed",
+    StateType.FAILED: "Failed",
+    StateType.CRASHED: "Crashed",
+    StateType.CANCELLED: "Cancelled",
+    StateType.RUNNING: "Running",
+    StateType.SCHEDULED: "Late",
+}
+
+FAILURE_MESSAGES = (
+    "Flow run encountered an exception: ConnectionError: No se pudo conectar con la base de datos.",
+    "Flow run encountered an exception: KeyError: 'fecha'.",
+    "Flow run encountered an exception: TimeoutError: La consulta superó el tiempo máximo.",
+    "Crash detected! Execution was interrupted by an unexpected exception.",
+)
+
+RESPONSABLES = ("LD", "FM", "JP", "AG", "MR")
+AREAS = ("Monitoreo", "Compras", "Finanzas", "Operaciones", "Comercial")
+
+# Campos que la tarea padre copia de su subflujo
+_TASK_RUN_FIELDS = (
+    "state_type", "state_name", "state_timestamp", "state_message",
+    "start_time", "end_time", "total_run_time", "run_count",
+)
+
+
+@dataclass
+class WorkloadConfig:
+    """
+    Parámetros de la carga sintética.
+
+    - flow_runs: ejecuciones de flujo raíz a generar. Los subflujos se agregan aparte.
+    - flows, deployments: cantidad de flujos y despliegues entre los que se reparten las ejecuciones.
+    - days: días hacia atrás desde `end_date` en los que se reparten las fechas programadas.
+    - state_weights: peso relativo de cada estado terminal. Por defecto 5% Failed, 1% Crashed y 1% Cancelled.
+    - subflow_ratio: probabilidad de que una ejecución lance un subflujo, en cada nivel del árbol.
+    - max_subflow_depth: niveles máximos de subflujos bajo una ejecución raíz. 0 desactiva los subflujos.
+    - collision_ratio: fracción de ejecuciones raíz que pertenecen a una ráfaga con la misma fecha.
+    - collision_size: ejecuciones por ráfaga. Por defecto mayor que el límite de página por defecto (200).
+    - running, late: ejecuciones en curso y demoradas, más viejas que los umbrales del watchdog.
+    - metadata_ratio: fracción de despliegues con bloque de metadatos en la descripción.
+    - invalid_metadata_ratio: fracción de despliegues con un bloque YAML inválido.
+    - seed: semilla del generador.
+    """
+    flow_runs: int = 10_000
+    flows: int = 50
+    deployments: int = 100
+    days: float = 30
+    state_weights: dict = field(default_factory=lambda: {
+        StateType.FAILED: 0.05,
+        StateType.CRASHED: 0.01,
+        StateType.CANCELLED: 0.01,
+        StateType.COMPLETED: 0.93,
+    })
+    subflow_ratio: float = 0.1
+    max_subflow_depth: int = 1
+    collision_ratio: float = 0.01
+    collision_size: int = 250
+    running: int = 50
+    late: int = 50
+    metadata_ratio: float = 0.9
+    invalid_metadata_ratio: float = 0.02
+    seed: int = 0
+
+
+class Workload:
+    """
+    Carga sintética generada a partir de una configuración.
+
+    `flows` y `deployments` son listas de diccionarios. `iter_runs()` recorre las ejecuciones como tuplas
+    (profundidad, ejecución, tarea padre). Cada ejecución es un diccionario con sus campos y los del estado actual
+    (`state_type`, `state_name`, `state_timestamp`, `state_message`); la tarea padre es el diccionario de la tarea
+    que lanzó el subflujo o None, con el mismo estado y las mismas fechas que el subflujo.
+    Los padres siempre se generan antes que sus subflujos.
+    """
+
+    def __init__(self, config: WorkloadConfig, end_date: Optional[datetime] = None):
+        self.config = config
+        self.end_date = end_date or datetime.now(timezone.utc)
+        self.start_date = self.end_date - timedelta(days=config.days)
+
+        rng = self._rng("metadata")
+        self.flows = [
+            {"id": _uuid(rng), "name": f"bench-flow-{i}", "tags": []}
+            for i in range(config.flows)
+        ]
+        self.deployments = []
+        for i in range(config.deployments):
+            roll = rng.random()
+            if roll < config.invalid_metadata_ratio:
+                description = f"Despliegue sintético {i}.\n\n---\nmetadata:\n  responsable: [sin cerrar\n"
+            elif roll < config.metadata_ratio:
+                description = deployment_description(i, rng.choice(RESPONSABLES), rng.choice(AREAS))
+            else:
+                description = f"Despliegue sintético {i} sin metadatos."
+            self.deployments.append({
+                "id": _uuid(rng),
+                "name": f"bench-deployment-{i}",
+                "flow_id": self.flows[i % len(self.flows)]["id"],
+                "entrypoint": f"flows/bench_{i}.py:main",
+                "description": description,
+            })
+
+    def iter_runs(self) -> Iterator[tuple[int, dict, Optional[dict]]]:
+        """Recorre las ejecuciones de la carga. Cada llamada genera la misma secuencia."""
+        config = self.config
+        rng = self._rng("runs")
+        span_seconds = (self.end_date - self.start_date).total_seconds()
+        states, weights = zip(*config.state_weights.items())
+
+        burst_instant, burst_left = None, 0
+        collision_probability = config.collision_ratio / max(config.collision_size, 1)
+
+        for i in range(config.flow_runs):
+            # Las ráfagas comparten la fecha programada y la de inicio hasta el microsegundo
+            if burst_left == 0 and rng.random() < collision_probability:
+                burst_instant = self.start_date + timedelta(seconds=int(rng.uniform(0, span_seconds)))
+                burst_left = config.collision_size
+            if burst_left:
+                expected, jitter = burst_instant, False
+                burst_left -= 1
+            else:
+                expected, jitter = self.start_date + timedelta(seconds=rng.uniform(0, span_seconds)), True
+
+            state_type = rng.choices(states, weights)[0]
+            deployment = self.deployments[rng.randrange(len(self.deployments))]
+            root = self._run(rng, f"bench-run-{i}", deployment, state_type, expected, jitter=jitter)
+            yield 0, root, None
+            yield from self._subflows(rng, root, 1, f"{i}")
+
+        # Ejecuciones para el watchdog: en curso desde hace horas y programadas hace horas sin iniciar
+        for i in range(config.running):
+            deployment = self.deployments[rng.randrange(len(self.deployments))]
+            started = self.end_date - timedelta(hours=rng.uniform(2, 48))
+            yield 0, self._run(rng, f"bench-running-{i}", deployment, StateType.RUNNING, started), None
+
+        for i in range(config.late):
+            deployment = self.deployments[rng.randrange(len(self.deployments))]
+            expected = self.end_date - timedelta(hours=rng.uniform(13, 72))
+            yield 0, self._run(rng, f"bench-late-{i}", deployment, StateType.SCHEDULED, expected), None
+
+    def _subflows(
+            self,
+            rng: random.Random,
+            parent: dict,
+            depth: int,
+            path: str
+        ) -> Iterator[tuple[int, dict, Optional[dict]]]:
+        if depth > self.config.max_subflow_depth or rng.random() >= self.config.subflow_ratio:
+            return
+
+        task_run_id = _uuid(rng)
+        # Los subflujos no tienen despliegue y terminan en el mismo estado que el padre,
+        # como cuando la falla del hijo hace fallar al padre
+        child = self._run(
+            rng, f"bench-subrun-{path}", None, parent["state_type"], parent["start_time"],
+            parent_task_run_id=task_run_id
+        )
+        # La tarea que lanza el subflujo empieza, termina y queda en el mismo estado que él
+        task_run = {
+            "id": task_run_id,
+            "flow_run_id": parent["id"],
+            "name": f"bench-subflow-task-{path}",
+            "task_key": "bench-subflow-task",
+            "dynamic_key": path,
+            "expected_start_time": parent["start_time"],
+            **{key: child[key] for key in _TASK_RUN_FIELDS},
+        }
+        yield depth, child, task_run
+        yield from self._subflows(rng, child, depth + 1, f"{path}.{depth}")
+
+    def _run(
+            self,
+            rng: random.Random,
+            name: str,
+            deployment: Optional[dict],
+            state_type: StateType,
+            expected: datetime,
+            jitter: bool = True,
+            parent_task_run_id: Optional[UUID] = None
+        ) -> dict:
+        start_time = end_time = None
+        total_run_time = timedelta(0)
+        state_timestamp = expected
+
+        if state_type != StateType.SCHEDULED:
+            start_time = expected + timedelta(seconds=rng.uniform(0, 5)) if jitter else expected
+            state_timestamp = start_time
+            if state_type != StateType.RUNNING:
+                total_run_time = timedelta(seconds=round(rng.expovariate(1 / 120), 6))
+                end_time = state_timestamp = start_time + total_run_time
+
+        failed = state_type in (StateType.FAILED, StateType.CRASHED)
+        return {
+            "id": _uuid(rng),
+            "name": name,
+            "flow_id": deployment["flow_id"] if deployment else self.flows[rng.randrange(len(self.flows))]["id"],
+            "deployment_id": deployment["id"] if deployment else None,
+            "state_type": state_type,
+            "state_name": STATE_NAMES[state_type],
+            "state_timestamp": state_timestamp,
+            "state_message": rng.choice(FAILURE_MESSAGES) if failed else None,
+            "expected_start_time": expected,
+            "start_time": start_time,
+            "end_time": end_time,
+            "total_run_time": total_run_time,
+            "run_count": 0 if start_time is None else 1,
+            "parent_task_run_id": parent_task_run_id,
+            "tags": ["bench"],
+            "parameters": {},
+        }
+
+    def _rng(self, stream: str) -> random.Random:
+        # Un generador por flujo de datos para que cambiar la cantidad de despliegues no cambie las ejecuciones
+        return random.Random(f"{self.config.seed}:{stream}")
+
+
+def deployment_description(index: int, responsable: str, area: str) -> str:
+    """Descripción de un despliegue con el bloque de metadatos YAML que lee `extract_metadata`."""
+    return (
+        f"Despliegue sintético {index} para pruebas de carga.\n\n"
+        "---\n"
+        "metadata:\n"
+        f"    responsable: {responsable}\n"
+        f"    area: {area}\n"
+        "    otros_detalles_lista:\n"
+        "        - Generado por benchmarks/workload.py\n"
+    )
+
+
+def _uuid(rng: random.Random) -> UUID:
+    return UUID(int=rng.getrandbits(128), version=4)
@@ -0,0 +1,116 @@
+"""
+    Sesión compartida del cliente de Prefect.
+
+    Abrir un `get_client()` por cada página o por cada ID implica un handshake HTTP/TLS nuevo por consulta.
+    Este módulo permite abrir un único `PrefectClient` con un pool de conexiones persistentes y reutilizarlo
+    durante todo un reporte o una ejecución del watchdog.
+
+    - `client_session(max_connections, max_keepalive_connections, keepalive_expiry, **httpx_settings)`:
+        Context manager asíncrono que abre el cliente compartido y lo deja disponible para las funciones internas.
+        Las sesiones abiertas dentro de otra heredan su transporte de httpx, también desde otro event loop.
+    - `use_client(client: PrefectClient = None)`:
+        Context manager que devuelve el cliente indicado, el cliente compartido o, si no hay ninguno, uno nuevo.
+    - `get_shared_client() -> PrefectClient | None`:
+        Devuelve el cliente compartido si puede usarse desde el event loop actual.
+
+    Ejemplo:
+        async with client_session(max_connections=32):
+            flow_runs = await get_flow_runs_info(start_date, end_date)
+            flows = await get_flow_info(flow_id)
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Optional
+
+import httpx
+from prefect import get_client
+from prefect.client.orchestration import PrefectClient
+
+DEFAULT_MAX_CONNECTIONS = 16
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 16
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+
+_shared_client: ContextVar[Optional[PrefectClient]] = ContextVar("prefect_shared_client", default=None)
+
+# Transporte indicado al abrir la sesión exterior. Se hereda en las sesiones anidadas, incluso las que abre
+# una función síncrona con `asyncio.run` en otro loop, porque las ContextVar se copian al nuevo loop
+_session_transport: ContextVar[Optional[httpx.AsyncBaseTransport]] = ContextVar("prefect_session_transport", default=None)
+
+
+@asynccontextmanager
+async def client_session(
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        max_keepalive_connections: int = DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: Optional[float] = DEFAULT_KEEPALIVE_EXPIRY,
+        **httpx_settings
+    ) -> AsyncIterator[PrefectClient]:
+    """
+    Abre un `PrefectClient` con pool de conexiones y lo comparte con todas las consultas
+    que se hagan dentro del bloque `async with`.
+
+    Parámetros:
+    - max_connections (int): Cantidad máxima de conexiones simultáneas contra el servidor.
+    - max_keepalive_connections (int): Cantidad de conexiones que se mantienen abiertas para reutilizar.
+    - keepalive_expiry (float, opcional): Segundos que una conexión ociosa se mantiene abierta.
+    - **httpx_settings: Otros parámetros que se pasan al cliente httpx (timeouts, transport, event_hooks, etc).
+      Si no se indica `transport` se usa el de la sesión exterior, si la hay. Un transporte heredado debe poder
+      usarse desde cualquier event loop, como `httpx.MockTransport` (ver `benchmarks/fake_api.py`).
+    Retorna:
+    - PrefectClient: Cliente abierto y compartido.
+    """
+    httpx_settings.setdefault("limits", httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+    ))
+    if httpx_settings.get("transport") is None and _session_transport.get() is not None:
+        httpx_settings["transport"] = _session_transport.get()
+
+    async with get_client(httpx_settings=httpx_settings) as client:
+        token = _shared_client.set(client)
+        transport_token = _session_transport.set(httpx_settings.get("transport"))
+        try:
+            yield client
+        finally:
+            _session_transport.reset(transport_token)
+            _shared_client.reset(token)
+
+
+def get_shared_client() -> Optional[PrefectClient]:
+    """
+    Devuelve el cliente abierto por `client_session` si existe y pertenece al event loop actual.
+    El pool de httpx queda atado al loop en el que se abrió, por lo que desde otro loop
+    (por ejemplo una tarea mapeada en otro hilo) no puede reutilizarse.
+    """
+    client = _shared_client.get()
+    if client is None:
+        return None
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+    if getattr(client, "_loop", loop) is not loop:
+        return None
+
+    return client
+
+
+@asynccontextmanager
+async def use_client(client: Optional[PrefectClient] = None) -> AsyncIterator[PrefectClient]:
+    """
+    Obtiene un cliente para realizar consultas. En orden de prioridad utiliza:
+    el cliente recibido por parámetro, el cliente compartido de `client_session` o un cliente nuevo.
+    El cliente nuevo usa el transporte de la sesión abierta, si la hay, y es el único que se cierra al salir del bloque.
+    """
+    client = client or get_shared_client()
+    if client is not None:
+        yield client
+        return
+
+    transport = _session_transport.get()
+    async with get_client(httpx_settings={"transport": transport} if transport is not None else None) as new_client:
+        yield new_client
@@ -1,22 +1,114 @@
+"""
+    Limpieza de ejecuciones de flujo antiguas de la base de datos de Prefect.
+
+    Las ejecuciones se recorren página por página y de cada página solo se conservan los IDs, por lo que la memoria
+    usada no depende del tamaño del rango. Como en `get_prefect_info`, el rango se divide en ventanas de tiempo que
+    se leen en paralelo mientras se eliminan las páginas anteriores; las páginas se procesan en orden de fecha.
+    Cada página se elimina en paralelo con un límite de concurrencia y opcionalmente un límite de eliminaciones
+    por segundo para no saturar el servidor.
+
+    Las ejecuciones eliminadas también se quitan del almacén local de los reportes incrementales (`RunStore`),
+    si existe, porque su sincronización no ve las ejecuciones que ya no están en el servidor.
+
+    El avance se guarda en un checkpoint en disco después de cada página, con un archivo por rango de fechas.
+    Si la limpieza se interrumpe, al volver a ejecutarla con el mismo rango continúa desde la última página completada,
+    aunque mientras tanto se hayan limpiado otros rangos.
+
+    - `db_cleanup(fecha_inicio, fecha_fin, timezone_str, max_concurrency, max_deletes_per_second, resume, window_hours)`:
+        Flujo que elimina las ejecuciones de flujo del rango indicado.
+    - `RateLimiter(rate: float)`:
+        Limita la cantidad de operaciones por segundo entre tareas concurrentes.
+"""
+
 import pytz
-from datetime import datetime
+from datetime import datetime, timedelta
+from functools import partial
+from hashlib import sha256
+from operator import attrgetter
+from pathlib import Path
+from typing import Optional
+from uuid import UUID
 import asyncio
+import json
+import time
 
 from prefect import flow
-from prefect import get_client
+from prefect import exceptions
+from prefect.client.orchestration import PrefectClient
+from prefect.server.schemas.filters import FlowRunFilter
+from prefect.settings import PREFECT_HOME
 
 from lucasdp.log_tools import PrefectLogger
 
-from dev.MONITOREO_PREFECT.get_prefect_info import get_flow_runs_info, get_task_runs_info
+from dev.MONITOREO_PREFECT.client_session import client_session
+from dev.MONITOREO_PREFECT.server_settings import get_api_limit
+from dev.MONITOREO_PREFECT.pagination import (
+    keyset_pages,
+    concurrent_pages,
+    batched_pages,
+    disjoint_time_windows,
+    CURSOR_RESOLUTION,
+)
+from dev.MONITOREO_PREFECT.get_prefect_info import (
+    runs_page_reader,
+    SORT_BY_FIELD,
+    DEFAULT_WINDOW_HOURS,
+    DEFAULT_MAX_CONCURRENCY as DEFAULT_READ_CONCURRENCY,
+)
+from dev.MONITOREO_PREFECT.run_store import RunStore, default_store_path
 
 logger_global = PrefectLogger(__file__)
 
+DEFAULT_MAX_CONCURRENCY = 16
+
+
+class RateLimiter:
+    """
+    Limita la cantidad de operaciones por segundo entre tareas concurrentes.
+    Las operaciones se espacian de forma uniforme cada `1 / rate` segundos.
+    """
+
+    def __init__(self, rate: float):
+        if rate <= 0:
+            raise ValueError("El límite de operaciones por segundo debe ser positivo.")
+        self.interval = 1 / rate
+        self._next_slot = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            now = time.monotonic()
+            wait = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
 @flow
 async def db_cleanup(
         fecha_inicio: datetime,
         fecha_fin: datetime,
-        timezone_str: str = 'America/Argentina/Buenos_Aires'
+        timezone_str: str = 'America/Argentina/Buenos_Aires',
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        max_deletes_per_second: Optional[float] = None,
+        resume: bool = True,
+        window_hours: float = DEFAULT_WINDOW_HOURS
     ) -> None:
+    """
+    Elimina las ejecuciones de flujo con fecha de inicio (o fecha programada si no iniciaron) dentro del rango.
+
+    Args:
+        fecha_inicio (datetime): Fecha inicial del rango.
+        fecha_fin (datetime): Fecha final del rango.
+        timezone_str (str, optional): Zona horaria de las fechas. Defaults to 'America/Argentina/Buenos_Aires'.
+        max_concurrency (int, optional): Eliminaciones simultáneas. Defaults to DEFAULT_MAX_CONCURRENCY.
+        max_deletes_per_second (float, optional): Límite de eliminaciones por segundo. Defaults to None (sin límite).
+        resume (bool, optional): Si se continúa desde el checkpoint de una limpieza interrumpida del mismo rango.
+            Defaults to True.
+        window_hours (float, optional): Horas de cada ventana de tiempo que se lee en paralelo.
+            Defaults to DEFAULT_WINDOW_HOURS.
+    """
 
     logger = logger_global.obtener_logger_prefect()
 
@@ -29,35 +121,160 @@ async def db_cleanup(
     if fecha_fin < fecha_inicio:
         raise ValueError("La fecha final debe ser mayor o igual a la fecha inicial.")
 
-    # Obtener los flujos en el rango de fechas especificado
+    checkpoint = load_checkpoint(fecha_inicio, fecha_fin) if resume else None
+    if checkpoint:
+        logger.info("Se retomara la limpieza desde el checkpoint: %s", checkpoint["cursors"])
+    else:
+        checkpoint = new_checkpoint(fecha_inicio, fecha_fin)
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+    # Solo se abre el almacén de los reportes si ya fue creado
+    run_store = RunStore() if default_store_path().exists() else None
+    rate_limiter = RateLimiter(max_deletes_per_second) if max_deletes_per_second else None
+    started_at = time.monotonic()
+
+    logger.info("Se eliminaran los flujos desde %s hasta %s.", fecha_inicio, fecha_fin)
+
     try:
-        logger.info("Se obtendran los flujos desde %s hasta %s.", fecha_inicio, fecha_fin)
-        flow_runs = await get_flow_runs_info(fecha_inicio, fecha_fin)
-        logger.info("Se obtuvieron %s flujos.", len(flow_runs))
-        # failed_flow_runs = pd.DataFrame()
+        async with client_session(max_connections=max_concurrency, max_keepalive_connections=max_concurrency) as client:
+            api_limit = await get_api_limit(client)
+
+            def window_pages(without_start_time: bool, key_field: str, window_start: datetime, window_end: datetime):
+                read_page = runs_page_reader(
+                    client.read_flow_runs, FlowRunFilter, 'flow_run_filter', None,
+                    window_start, window_end, without_start_time, key_field
+                )
+                return keyset_pages(
+                    read_page, attrgetter(key_field), window_start, window_end, api_limit, sort=SORT_BY_FIELD[key_field]
+                )
+
+            # Ejecuciones con start_time y ejecuciones que nunca iniciaron (por expected_start_time)
+            for without_start_time in (False, True):
+                key_field = 'expected_start_time' if without_start_time else 'start_time'
+                cursor = datetime.fromisoformat(checkpoint["cursors"].get(key_field, fecha_inicio.isoformat()))
+
+                # Las ventanas siguientes se leen mientras se eliminan las anteriores. Las páginas llegan en orden
+                # de fecha, así el cursor del checkpoint sigue marcando hasta dónde se eliminó todo.
+                # Las páginas de ventanas chicas se juntan para eliminar con toda la concurrencia disponible
+                windows = disjoint_time_windows(cursor, fecha_fin, timedelta(hours=window_hours)) \
+                    if cursor <= fecha_fin else []
+                sources = [partial(window_pages, without_start_time, key_field, *window) for window in windows]
+
+                async for page in batched_pages(concurrent_pages(sources, DEFAULT_READ_CONCURRENCY), api_limit):
+                    # De cada página solo se conservan los IDs y la fecha del cursor
+                    flow_run_ids = [flow_run.id for flow_run in page]
+                    page_cursor = max(getattr(flow_run, key_field) for flow_run in page)
+                    del page
+
+                    deleted, not_found = await delete_flow_runs(
+                        client, flow_run_ids, semaphore, rate_limiter)
+                    # Las que ya no existían también se quitan del almacén
+                    if run_store:
+                        run_store.delete(flow_run_ids)
+
+                    checkpoint["deleted"] += deleted
+                    checkpoint["not_found"] += not_found
+                    checkpoint["cursors"][key_field] = (page_cursor + CURSOR_RESOLUTION).isoformat()
+                    save_checkpoint(checkpoint)
+
+                    elapsed = time.monotonic() - started_at
+                    logger.info(
+                        "Eliminados %s flujos (%.1f flujos/s). Avance por %s hasta %s.",
+                        checkpoint["deleted"], checkpoint["deleted"] / elapsed if elapsed else 0.0,
+                        key_field, page_cursor
+                    )
     except Exception as e:
-        logger.error("Error en obtencion de datos: %s", e)
+        logger.error("Error en eliminacion de flujos: %s. Se podra retomar desde el checkpoint.", e)
         raise e
 
-    if len(flow_runs) != 0:
-        flow_runs.sort(key=lambda x: x['start_time'])
-
-        # Eliminar los flujos obtenidos
-        try:
-            logger.info("Se eliminaran los flujos obtenidos.")
-            async with get_client() as client:
-                for flow_run in flow_runs:
-                    await client.delete_flow_run(flow_run['id'])
-                    logger.info("Flujo %s eliminado.", flow_run['id'])
-        except Exception as e:
-            logger.error("Error en eliminacion de flujos: %s", e)
-            raise e
-
-        logger.info("Flujos eliminados.")
-    else:
-        logger.info("No hay flujos para eliminar.")
+    elapsed = time.monotonic() - started_at
+    logger.info(
+        "Flujos eliminados: %s (%s ya no existian) en %s (%.1f flujos/s).",
+        checkpoint["deleted"], checkpoint["not_found"], timedelta(seconds=round(elapsed)),
+        checkpoint["deleted"] / elapsed if elapsed else 0.0
+    )
+
+    clear_checkpoint(fecha_inicio, fecha_fin)
 
     logger.info("Ejecución finalizada.")
 
+
+async def delete_flow_runs(
+        client: PrefectClient,
+        flow_run_ids: list[UUID],
+        semaphore: asyncio.Semaphore,
+        rate_limiter: Optional[RateLimiter] = None
+    ) -> tuple[int, int]:
+    """
+    Elimina ejecuciones de flujo en paralelo, limitado por el semáforo y opcionalmente por el limitador de tasa.
+
+    Retorna:
+    - tuple[int, int]: Cantidad de ejecuciones eliminadas y de ejecuciones que ya no existían.
+    """
+    async def delete(flow_run_id: UUID) -> bool:
+        async with semaphore:
+            if rate_limiter:
+                await rate_limiter.acquire()
+            try:
+                await client.delete_flow_run(flow_run_id)
+            except exceptions.ObjectNotFound:
+                return False
+            return True
+
+    results = await asyncio.gather(*(delete(flow_run_id) for flow_run_id in flow_run_ids))
+    deleted = sum(results)
+
+    return deleted, len(results) - deleted
+
+
+def new_checkpoint(fecha_inicio: datetime, fecha_fin: datetime) -> dict:
+    return {
+        "fecha_inicio": fecha_inicio.isoformat(),
+        "fecha_fin": fecha_fin.isoformat(),
+        "cursors": {},
+        "deleted": 0,
+        "not_found": 0,
+    }
+
+
+def checkpoint_path(fecha_inicio: datetime, fecha_fin: datetime) -> Path:
+    """
+    Ruta del checkpoint del rango, identificado por un hash de sus fechas.
+    Se resuelve en cada uso para respetar el PREFECT_HOME vigente.
+    """
+    range_hash = sha256(f"{fecha_inicio.isoformat()}|{fecha_fin.isoformat()}".encode()).hexdigest()[:16]
+    return Path(PREFECT_HOME.value()) / "monitoreo" / f"db_cleanup_checkpoint_{range_hash}.json"
+
+
+def load_checkpoint(fecha_inicio: datetime, fecha_fin: datetime) -> Optional[dict]:
+    """Devuelve el checkpoint guardado si corresponde al mismo rango de fechas."""
+    try:
+        with open(checkpoint_path(fecha_inicio, fecha_fin), 'r', encoding='utf-8') as file:
+            checkpoint = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    if (checkpoint.get("fecha_inicio"), checkpoint.get("fecha_fin")) != (fecha_inicio.isoformat(), fecha_fin.isoformat()):
+        return None
+
+    return checkpoint
+
+
+def save_checkpoint(checkpoint: dict) -> None:
+    path = checkpoint_path(
+        datetime.fromisoformat(checkpoint["fecha_inicio"]), datetime.fromisoformat(checkpoint["fecha_fin"])
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_suffix(".tmp")
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(checkpoint, file)
+    temp_path.replace(path)
+
+
+def clear_checkpoint(fecha_inicio: datetime, fecha_fin: datetime) -> None:
+    """Elimina el checkpoint del rango, sin tocar los de otros rangos."""
+    checkpoint_path(fecha_inicio, fecha_fin).unlink(missing_ok=True)
+
+
 if __name__ == '__main__':
     asyncio.run(db_cleanup(datetime(2024, 10, 15), datetime(2024, 10, 16)))
@@ -0,0 +1,227 @@
+"""
+    Eventos del servidor de Prefect usados por el monitoreo.
+
+    El servidor de Prefect emite un evento `prefect.flow-run.<Estado>` por cada transición de estado.
+    Este módulo abre la suscripción por websocket (ver `troubleshooting/test_events_connections.py` para probar
+    la conexión) y convierte cada evento en un `FlowRunStateEvent` con los datos que usan el watchdog y los índices.
+
+    También lee del historial de eventos las modificaciones y eliminaciones de despliegues
+    (`prefect.deployment.updated` y `prefect.deployment.deleted`), que invalidan la caché de metadatos.
+
+    - `subscribe_flow_run_events(subscribed: asyncio.Event = None) -> AsyncIterator[FlowRunStateEvent]`:
+        Devuelve los cambios de estado de ejecuciones de flujo a medida que ocurren.
+    - `flow_run_event_stream() -> FlowRunEventStream`:
+        Context manager asíncrono que abre la suscripción en segundo plano y entra al bloque una vez conectada.
+        `FlowRunEventStream.next_batch(timeout)` devuelve los eventos acumulados desde la llamada anterior.
+    - `parse_flow_run_event(event: Event) -> FlowRunStateEvent | None`:
+        Extrae ID de ejecución, tipo de estado y fecha de un evento. Devuelve None si no es un cambio de estado.
+    - `read_deployment_updates(since: datetime, client: PrefectClient = None, until: datetime = None) -> dict[UUID, datetime]`:
+        Devuelve la fecha de la última modificación o eliminación de cada despliegue entre `since` y `until`.
+        Lanza `NotImplementedError` si el cliente no puede leer el historial de eventos.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+from uuid import UUID
+
+from prefect.client.orchestration import PrefectClient
+from prefect.client.schemas.objects import StateType
+from prefect.events import Event
+from prefect.events.clients import get_events_subscriber
+from prefect.events.filters import EventFilter, EventNameFilter, EventOccurredFilter
+
+from dev.MONITOREO_PREFECT.client_session import use_client
+
+FLOW_RUN_EVENT_PREFIX = "prefect.flow-run."
+FLOW_RUN_RESOURCE_PREFIX = "prefect.flow-run."
+
+# Los eventos de estado del despliegue (ready, not-ready) no cambian sus metadatos y no se leen
+DEPLOYMENT_CHANGE_EVENTS = ("prefect.deployment.updated", "prefect.deployment.deleted")
+DEPLOYMENT_RESOURCE_PREFIX = "prefect.deployment."
+# El servidor de Prefect rechaza con 422 páginas de eventos de más de 50
+EVENTS_PAGE_SIZE = 50
+
+
+@dataclass(slots=True)
+class FlowRunStateEvent:
+    """Cambio de estado de una ejecución de flujo."""
+    flow_run_id: UUID
+    state_type: Optional[StateType]
+    state_name: str
+    occurred: datetime
+    flow_run_name: Optional[str] = None
+    # Recursos relacionados por rol: "flow", "deployment", "tag" (lista) y "flow-run" (ejecución padre)
+    related: dict = field(default_factory=dict)
+
+
+def parse_flow_run_event(event: Event) -> Optional[FlowRunStateEvent]:
+    """Convierte un evento del servidor en un `FlowRunStateEvent`. Devuelve None si no es un cambio de estado."""
+    resource_id = event.resource.id
+    if not event.event.startswith(FLOW_RUN_EVENT_PREFIX) or not resource_id.startswith(FLOW_RUN_RESOURCE_PREFIX):
+        return None
+
+    try:
+        flow_run_id = UUID(resource_id[len(FLOW_RUN_RESOURCE_PREFIX):])
+    except ValueError:
+        return None
+
+    validated_state = (event.payload or {}).get("validated_state") or {}
+    try:
+        state_type = StateType(validated_state["type"]) if validated_state.get("type") else None
+    except ValueError:
+        state_type = None
+
+    related = {}
+    for resource in event.related:
+        role = resource.get("prefect.resource.role")
+        related_id = resource.id.split(".", 2)[-1]
+        if role == "tag":
+            related.setdefault("tag", []).append(related_id)
+        elif role:
+            related[role] = related_id
+
+    return FlowRunStateEvent(
+        flow_run_id=flow_run_id,
+        state_type=state_type,
+        state_name=event.event[len(FLOW_RUN_EVENT_PREFIX):],
+        occurred=event.occurred,
+        flow_run_name=event.resource.get("prefect.resource.name"),
+        related=related,
+    )
+
+
+async def subscribe_flow_run_events(subscribed: Optional[asyncio.Event] = None) -> AsyncIterator[FlowRunStateEvent]:
+    """
+    Devuelve los cambios de estado de ejecuciones de flujo a medida que el servidor los emite.
+    El suscriptor de Prefect se reconecta solo si se corta el websocket.
+    Si se pasa `subscribed`, se marca en cuanto la conexión está abierta: los eventos posteriores no se pierden.
+    """
+    event_filter = EventFilter(event=EventNameFilter(prefix=[FLOW_RUN_EVENT_PREFIX]))
+
+    async with get_events_subscriber(filter=event_filter) as subscriber:
+        if subscribed is not None:
+            subscribed.set()
+        async for event in subscriber:
+            state_event = parse_flow_run_event(event)
+            if state_event is not None:
+                yield state_event
+
+
+class FlowRunEventStream:
+    """Eventos de cambio de estado recibidos por una suscripción activa, pendientes de procesar."""
+
+    def __init__(self, queue: asyncio.Queue, consumer: asyncio.Task):
+        self._queue = queue
+        self._consumer = consumer
+
+    def check_subscription(self) -> None:
+        """Propaga el error de la suscripción si la tarea que recibe los eventos terminó."""
+        if self._consumer.done():
+            self._consumer.result()
+            raise RuntimeError("La suscripción a eventos terminó inesperadamente.")
+
+    def _drain(self, batch: list[FlowRunStateEvent]) -> list[FlowRunStateEvent]:
+        while not self._queue.empty():
+            batch.append(self._queue.get_nowait())
+        return batch
+
+    async def next_batch(self, timeout: Optional[float] = None) -> list[FlowRunStateEvent]:
+        """
+        Espera hasta `timeout` segundos al próximo evento y devuelve todos los acumulados hasta el momento.
+        Devuelve una lista vacía si no llegó ninguno. Si la suscripción termina, propaga su error.
+        """
+        if not self._queue.empty():
+            return self._drain([])
+        self.check_subscription()
+
+        getter = asyncio.ensure_future(self._queue.get())
+        try:
+            await asyncio.wait({getter, self._consumer}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            if not getter.done():
+                getter.cancel()
+
+        if getter.done() and not getter.cancelled():
+            return self._drain([getter.result()])
+        self.check_subscription()
+        return []
+
+
+@asynccontextmanager
+async def flow_run_event_stream() -> AsyncIterator[FlowRunEventStream]:
+    """
+    Abre la suscripción a los cambios de estado en segundo plano y entra al bloque una vez conectada,
+    así lo que se lea de la API dentro del bloque no pierde cambios ocurridos durante la lectura.
+    Si la conexión falla, el error se propaga al entrar al bloque. La suscripción se cierra al salir.
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    subscribed = asyncio.Event()
+
+    async def forward_events():
+        async for event in subscribe_flow_run_events(subscribed):
+            queue.put_nowait(event)
+
+    consumer = asyncio.create_task(forward_events())
+    connected = asyncio.create_task(subscribed.wait())
+    try:
+        await asyncio.wait({consumer, connected}, return_when=asyncio.FIRST_COMPLETED)
+        stream = FlowRunEventStream(queue, consumer)
+        stream.check_subscription()
+        yield stream
+    finally:
+        connected.cancel()
+        consumer.cancel()
+
+
+def parse_deployment_event(event: Event) -> Optional[tuple[UUID, datetime]]:
+    """Devuelve el ID del despliegue y la fecha de un evento de modificación o eliminación, o None si no lo es."""
+    resource_id = event.resource.id
+    if event.event not in DEPLOYMENT_CHANGE_EVENTS or not resource_id.startswith(DEPLOYMENT_RESOURCE_PREFIX):
+        return None
+
+    try:
+        return UUID(resource_id[len(DEPLOYMENT_RESOURCE_PREFIX):]), event.occurred
+    except ValueError:
+        return None
+
+
+async def read_deployment_updates(
+        since: datetime,
+        client: Optional[PrefectClient] = None,
+        until: Optional[datetime] = None) -> dict[UUID, datetime]:
+    """
+    Lee del historial de eventos del servidor las modificaciones y eliminaciones de despliegues ocurridas desde `since`.
+
+    Parámetros:
+    - since (datetime): Fecha desde la que se leen los eventos (inclusiva).
+    - client (PrefectClient, opcional): Cliente a utilizar. Por defecto el cliente compartido o uno nuevo.
+    - until (datetime, opcional): Fecha hasta la que se leen los eventos (inclusiva). Por defecto ahora.
+    Retorna:
+    - dict[UUID, datetime]: Fecha del último evento de cada despliegue modificado o eliminado.
+    Lanza:
+    - NotImplementedError: Si el cliente no tiene `read_events` (versiones de Prefect sin historial de eventos).
+    """
+    event_filter = EventFilter(
+        occurred=EventOccurredFilter(since=since, until=until or datetime.now(timezone.utc)),
+        event=EventNameFilter(name=list(DEPLOYMENT_CHANGE_EVENTS)),
+    )
+
+    updates: dict[UUID, datetime] = {}
+    async with use_client(client) as client:
+        if not hasattr(client, "read_events"):
+            raise NotImplementedError("El cliente de Prefect no permite leer el historial de eventos.")
+        page = await client.read_events(filter=event_filter, limit=EVENTS_PAGE_SIZE)
+        while True:
+            for event in page.events:
+                parsed = parse_deployment_event(event)
+                if parsed is not None:
+                    deployment_id, occurred = parsed
+                    updates[deployment_id] = max(occurred, updates.get(deployment_id, occurred))
+            if not page.events or not page.next_page:
+                break
+            page = await client.read_events_page(page.next_page)
+
+    return updates
@@ -3,26 +3,39 @@
 
     - `get_flow_runs_info(start_date: datetime, end_date: datetime, states: list[str]) -> dict`: 
         Esta tarea obtiene información de los flujos que se ejecutaron en un rango de fechas y estados específicos.
+    - `iter_flow_runs(...)` y `iter_task_runs(...) -> AsyncIterator[dict]`: 
+        Versiones en streaming de `get_flow_runs_info` y `get_task_runs_info`, con las mismas ventanas de tiempo
+        consultadas en paralelo, memoria acotada y proyección opcional de campos.
     - `get_subflow_info(parent_flow_run_id: UUID, states: list[str]) -> dict`: 
         Esta tarea obtiene información de los subflujos de un flujo padre específico utilizando su ID.
+    - `get_subflow_runs_by_parent(parent_flow_run_ids: list[UUID], states: list[str]) -> dict`: 
+        Esta tarea obtiene los subflujos de muchos flujos padre con consultas por lotes.
     - `get_flow_info(flow_id: UUID) -> dict`: 
         Esta tarea obtiene información de un flujo específico utilizando su ID.
     - `get_deployment_info(deployment_id: UUID) -> dict`: 
         Esta tarea obtiene información de un deployment específico utilizando su ID.
+    - `get_flows_info(flow_ids: list[UUID]) -> dict` y `get_deployments_info(deployment_ids: list[UUID]) -> dict`: 
+        Estas tareas obtienen información de muchos flujos o deployments con consultas por lotes.
+    - `schedule_executions(executions: dict[UUID, list[datetime]]) -> dict`: 
+        Esta tarea programa en paralelo las ejecuciones faltantes de muchos despliegues y devuelve el resultado de cada una.
+
+    Todas las tareas aceptan un parámetro opcional `client`. Si no se indica, reutilizan el cliente abierto
+    con `client_session` (ver `client_session.py`) y solo como último recurso abren un cliente nuevo.
     
 """
 
-import requests
-from datetime import timezone
-from urllib.parse import urljoin
+from datetime import timezone, timedelta
 import asyncio
-from typing import Union, Sequence
+from typing import AsyncIterator, Union, Sequence, Optional
 from datetime import datetime
 from urllib.parse import urlparse, urlunparse
+from functools import partial
+from operator import attrgetter
 from uuid import UUID
 
 from prefect import runtime, task, get_client
 from prefect.cli import config as cli_config
+from prefect.client.orchestration import PrefectClient
 from prefect.client.schemas.objects import StateType, StateDetails
 from prefect.states import State
 from prefect import exceptions
@@ -31,36 +44,98 @@ from prefect import exceptions
 # ya que se puede hacer con diccionarios y leyendo la documentación de prefect en {url de prefect}/docs
 from prefect.server.schemas.filters import (
     FlowRunFilter,
-    TaskRunFilter
+    TaskRunFilter,
+    FlowFilter,
+    DeploymentFilter,
     # FlowRunFilterState,
     # FlowRunFilterStateType,
     # FlowRunFilterStartTime,
 )
 
+from dev.MONITOREO_PREFECT.client_session import use_client
+from dev.MONITOREO_PREFECT.server_settings import get_api_limit
+from dev.MONITOREO_PREFECT.metadata_cache import MetadataCache, FLOWS, DEPLOYMENTS
+from dev.MONITOREO_PREFECT.pagination import (
+    split_time_windows,
+    disjoint_time_windows,
+    fetch_time_windows,
+    concurrent_pages,
+    unique_by_id,
+    keyset_pages,
+    keyset_paginate,
+    offset_paginate,
+    chunked,
+)
 
-def get_prefect_server_settings():
-    """Get Prefect API settings including limits."""
-    base_url = get_prefect_url()  # Base URL from your function
-    endpoint = "/api/admin/settings"  # Endpoint path
+# Tamaño de las ventanas de tiempo que se consultan en paralelo y cantidad máxima de consultas simultáneas
+DEFAULT_WINDOW_HOURS = 6
+DEFAULT_MAX_CONCURRENCY = 8
+
+# Cantidad de IDs por consulta `any_` en las búsquedas por lotes
+DEFAULT_CHUNK_SIZE = 100
+
+# Inicio del cursor cuando la ventana se filtra por un campo distinto al del cursor
+KEYSET_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Orden ascendente de la API para cada campo usado como cursor de paginación
+SORT_BY_FIELD = {
+    'start_time': "START_TIME_ASC",
+    'expected_start_time': "EXPECTED_START_TIME_ASC",
+}
+
+
+def runs_page_reader(
+        read_runs,
+        filter_class: type,
+        filter_name: str,
+        states: Union[Sequence[str], Sequence[StateType], None],
+        window_start: datetime,
+        window_end: datetime,
+        without_start_time: bool,
+        key_field: str
+    ):
+    """
+    Construye la función de lectura de páginas que usa `keyset_paginate` para ejecuciones de flujo o de tarea.
 
-    # Use urljoin to safely concatenate base URL and endpoint
-    url = urljoin(base_url.rstrip('/'), endpoint.lstrip('/'))
+    Parámetros:
+    - read_runs: Método del cliente que lee las ejecuciones (`client.read_flow_runs` o `client.read_task_runs`).
+    - filter_class (type): Clase de filtro de la API (`FlowRunFilter` o `TaskRunFilter`).
+    - filter_name (str): Nombre del parámetro del filtro en `read_runs`.
+    - states (list[str], opcional): Lista de estados de ejecución a filtrar.
+    - window_start, window_end (datetime): Ventana de tiempo consultada.
+    - without_start_time (bool): Si se buscan ejecuciones sin start_time (filtradas por expected_start_time).
+    - key_field (str): Campo de fecha usado como cursor.
+    """
+    async def read_page(after_: datetime, before_: datetime, sort: str, limit: int, offset: int) -> list:
+        filters = {
+            'state': {'type': {'any_': states} if states else None},
+            'start_time': {'is_null_': True} if without_start_time else {'after_': window_start, 'before_': window_end},
+        }
+        # The cursor range replaces the window range when it is on the same field
+        filters[key_field] = {'after_': after_, 'before_': before_}
+        if not without_start_time:
+            # Prefect 3 compara start_time con coalesce(start_time, expected_start_time): sin esto también
+            # devuelve las ejecuciones que nunca iniciaron, que ya lee la pasada sin start_time
+            filters['start_time']['is_null_'] = False
+
+        return await read_runs(
+            **{filter_name: filter_class(**filters)},
+            sort=sort,
+            limit=limit,
+            offset=offset
+        )
 
-    try:
-        response = requests.get(url, headers={'accept': 'application/json'}, timeout=10)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise Exception(f"Failed to get API settings: {response.status_code}")
-    except Exception as e:
-        raise Exception(f"Error fetching API settings: {str(e)}")
+    return read_page
 
 
 @task
 async def get_flow_runs_info(
         start_date: datetime,
         end_date: datetime,
-        states: Union[Sequence[str], Sequence[StateType], None] = None
+        states: Union[Sequence[str], Sequence[StateType], None] = None,
+        client: Optional[PrefectClient] = None,
+        window_hours: float = DEFAULT_WINDOW_HOURS,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY
     ) -> list[dict]:
     """
     Obtiene información de ejecuciones de flujo dentro de un rango de fechas y estados específicos.
@@ -70,6 +145,9 @@ async def get_flow_runs_info(
     - start_date (datetime): Fecha de inicio del rango de fechas.
     - end_date (datetime): Fecha de fin del rango de fechas.
     - states (list[str], opcional): Lista de estados de ejecución a filtrar. Por defecto es None.
+    - client (PrefectClient, opcional): Cliente a utilizar. Por defecto el cliente compartido o uno nuevo.
+    - window_hours (float, opcional): Horas de cada ventana de tiempo que se consulta en paralelo.
+    - max_concurrency (int, opcional): Cantidad máxima de ventanas consultadas a la vez.
     Retorna:
     - list[dict]: Lista de diccionarios con información de las ejecuciones de flujo.
     """
@@ -80,94 +158,73 @@ async def get_flow_runs_info(
     if end_date.tzinfo is None:
         end_date = end_date.replace(tzinfo=timezone.utc)
 
-    settings = get_prefect_server_settings()
-    api_limit = settings.get('PREFECT_API_DEFAULT_LIMIT', 200)
-
-    async def fetch_paginated_data(start_date, end_date, without_start_time=False):
-        """Fetch data from API with pagination."""
-        results = []
-        current_start_date = start_date
-
-        while current_start_date < end_date:
-            # Update the filter dynamically based on whether we are handling without start time
-            if without_start_time:
-                flow_run_filter = FlowRunFilter(
-                    state={
-                        'type': {'any_': states} if states else None,
-                    },
-                    expected_start_time={
-                        'after_': current_start_date,
-                        'before_': end_date
-                    },
-                    start_time={
-                        'is_null_': True
-                    }
-                )
-            else:
-                flow_run_filter = FlowRunFilter(
-                    state={
-                        'type': {'any_': states} if states else None,
-                    },
-                    start_time={
-                        'after_': current_start_date,
-                        'before_': end_date
-                    }
-                )
+    async def fetch_paginated_data(window_start, window_end, without_start_time=False):
+        """Fetch data from API with keyset pagination."""
+        # Runs with start time are paged by start_time, the rest by expected_start_time
+        key_field = 'expected_start_time' if without_start_time else 'start_time'
+        read_page = runs_page_reader(
+            client.read_flow_runs, FlowRunFilter, 'flow_run_filter', states,
+            window_start, window_end, without_start_time, key_field
+        )
+        return await keyset_paginate(
+            read_page, attrgetter(key_field), window_start, window_end, api_limit, sort=SORT_BY_FIELD[key_field]
+        )
 
-            async with get_client() as client:
-                flow_runs = await client.read_flow_runs(
-                    flow_run_filter=flow_run_filter,
-                    sort="START_TIME_ASC",
-                    limit=api_limit
-                )
+    # Fetch data for flow runs with and without start time.
+    # Each pass is split in time windows and every window of both passes runs concurrently
+    windows = split_time_windows(start_date, end_date, timedelta(hours=window_hours))
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async with use_client(client) as client:
+        # Page size comes from the server settings, cached once per process
+        api_limit = await get_api_limit(client)
+
+        flow_runs, flow_runs_without_start_time = await asyncio.gather(
+            fetch_time_windows(
+                lambda window_start, window_end: fetch_paginated_data(window_start, window_end, without_start_time=False),
+                windows, semaphore
+            ),
+            fetch_time_windows(
+                lambda window_start, window_end: fetch_paginated_data(window_start, window_end, without_start_time=True),
+                windows, semaphore
+            ),
+        )
 
-            results.extend(flow_runs)
-
-            if len(flow_runs) < api_limit:
-                break
-
-            # Update start date for next page
-            flow_runs.sort(key=lambda x: x.start_time or x.expected_start_time)
-            last_retrieved_time = flow_runs[-1].start_time or flow_runs[-1].expected_start_time
-            current_start_date = last_retrieved_time
-
-        return results
-
-    # Fetch data for flow runs with and without start time
-    flow_runs = await fetch_paginated_data(start_date, end_date, without_start_time=False)
-    flow_runs_without_start_time = await fetch_paginated_data(start_date, end_date, without_start_time=True)
-
-    # Combine and process data
-    combined_flow_runs = flow_runs + flow_runs_without_start_time
-    flow_runs_info = []
-
-    for flow_run in combined_flow_runs:
-        flow_run_dict = {
-            "id": flow_run.id,
-            "flow_run_name": flow_run.name,
-            "state": {
-                "message": flow_run.state.message,
-                "type": flow_run.state.type
-            },
-            "start_time": flow_run.start_time if flow_run.start_time else flow_run.expected_start_time,
-            "end_time": flow_run.end_time,
-            "total_duration": flow_run.total_run_time,
-            "parameters": flow_run.parameters,
-            "flow_id": flow_run.flow_id,
-            "deployment_id": flow_run.deployment_id
-        }
-        flow_runs_info.append(flow_run_dict)
+    # Combine and process data. Adjacent windows share their limits so duplicates are dropped
+    combined_flow_runs = unique_by_id(flow_runs + flow_runs_without_start_time)
+    flow_runs_info = [flow_run_to_dict(flow_run) for flow_run in combined_flow_runs]
 
     flow_runs_info.sort(key=lambda x: x['start_time'], reverse=True)
 
     return flow_runs_info
 
 
+def flow_run_to_dict(flow_run) -> dict:
+    """Convierte una ejecución de flujo en el diccionario usado por los reportes."""
+    return {
+        "id": flow_run.id,
+        "flow_run_name": flow_run.name,
+        "state": {
+            "message": flow_run.state.message,
+            "type": flow_run.state.type
+        },
+        "start_time": flow_run.start_time if flow_run.start_time else flow_run.expected_start_time,
+        "end_time": flow_run.end_time,
+        "total_duration": flow_run.total_run_time,
+        "parameters": flow_run.parameters,
+        "flow_id": flow_run.flow_id,
+        "deployment_id": flow_run.deployment_id
+    }
+
+
 @task
 async def get_task_runs_info(
             start_date: datetime,
         end_date: datetime,
-        states: Union[Sequence[str], Sequence[StateType], None] = None
+        states: Union[Sequence[str], Sequence[StateType], None] = None,
+        client: Optional[PrefectClient] = None,
+        window_hours: float = DEFAULT_WINDOW_HOURS,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY
     ) -> list[dict]:
     """
     Obtiene información de ejecuciones de tarea dentro de un rango de fechas y estados específicos.
@@ -177,6 +234,9 @@ async def get_task_runs_info(
     - start_date (datetime): Fecha de inicio del rango de fechas.
     - end_date (datetime): Fecha de fin del rango de fechas.
     - states (list[str], opcional): Lista de estados de ejecución a filtrar. Por defecto es None.
+    - client (PrefectClient, opcional): Cliente a utilizar. Por defecto el cliente compartido o uno nuevo.
+    - window_hours (float, opcional): Horas de cada ventana de tiempo que se consulta en paralelo.
+    - max_concurrency (int, opcional): Cantidad máxima de ventanas consultadas a la vez.
     Retorna:
     - list[dict]: Lista de diccionarios con información de las ejecuciones de tarea.
     """
@@ -187,93 +247,193 @@ async def get_task_runs_info(
     if end_date.tzinfo is None:
         end_date = end_date.replace(tzinfo=timezone.utc)
 
-    settings = get_prefect_server_settings()
-    api_limit = settings.get('PREFECT_API_DEFAULT_LIMIT', 200)
-
-    async def fetch_paginated_data(start_date, end_date, without_start_time=False):
-        """Fetch data from API with pagination."""
-        results = []
-        current_start_date = start_date
-
-        while current_start_date < end_date:
-            # Update the filter dynamically based on whether we are handling without start time
-            if without_start_time:
-                task_run_filter = TaskRunFilter(
-                    state={
-                        'type': {'any_': states} if states else None,
-                    },
-                    expected_start_time={
-                        'after_': current_start_date,
-                        'before_': end_date
-                    },
-                    start_time={
-                        'is_null_': True
-                    }
-                )
-            else:
-                task_run_filter = TaskRunFilter(
-                    state={
-                        'type': {'any_': states} if states else None,
-                    },
-                    start_time={
-                        'after_': current_start_date,
-                        'before_': end_date
-                    }
-                )
+    async def fetch_paginated_data(window_start, window_end, without_start_time=False):
+        """Fetch data from API with keyset pagination."""
+        # Task runs can only be sorted by expected_start_time, so that is the cursor for both passes.
+        # When filtering by start_time the expected time may fall before the window, so the cursor starts at epoch
+        read_page = runs_page_reader(
+            client.read_task_runs, TaskRunFilter, 'task_run_filter', states,
+            window_start, window_end, without_start_time, 'expected_start_time'
+        )
+        return await keyset_paginate(
+            read_page, attrgetter('expected_start_time'),
+            window_start if without_start_time else KEYSET_EPOCH, window_end, api_limit,
+            sort=SORT_BY_FIELD['expected_start_time']
+        )
 
-            async with get_client() as client:
-                task_runs = await client.read_task_runs(
-                    task_run_filter=task_run_filter,
-                    sort="EXPECTED_START_TIME_ASC",
-                    limit=api_limit
-                )
+    # Fetch data for task runs with and without start time.
+    # Each pass is split in time windows and every window of both passes runs concurrently
+    windows = split_time_windows(start_date, end_date, timedelta(hours=window_hours))
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async with use_client(client) as client:
+        # Page size comes from the server settings, cached once per process
+        api_limit = await get_api_limit(client)
+
+        task_runs, task_runs_without_start_time = await asyncio.gather(
+            fetch_time_windows(
+                lambda window_start, window_end: fetch_paginated_data(window_start, window_end, without_start_time=False),
+                windows, semaphore
+            ),
+            fetch_time_windows(
+                lambda window_start, window_end: fetch_paginated_data(window_start, window_end, without_start_time=True),
+                windows, semaphore
+            ),
+        )
 
-            results.extend(task_runs)
-
-            if len(task_runs) < api_limit:
-                break
-
-            # Update start date for next page
-            task_runs.sort(key=lambda x: x.start_time or x.expected_start_time)
-            last_retrieved_time = task_runs[-1].start_time or task_runs[-1].expected_start_time
-            current_start_date = last_retrieved_time
-
-        return results
-
-    # Fetch data for task runs with and without start time
-    task_runs = await fetch_paginated_data(start_date, end_date, without_start_time=False)
-    task_runs_without_start_time = await fetch_paginated_data(start_date, end_date, without_start_time=True)
-
-    # Combine and process data
-    combined_flow_runs = task_runs + task_runs_without_start_time
-    task_runs_info = []
-
-    for task_run in combined_flow_runs:
-        task_run_dict = {
-            "id": task_run.id,
-            "flow_run_name": task_run.name,
-            "state": {
-                "message": task_run.state.message,
-                "type": task_run.state.type
-            },
-            "start_time": task_run.start_time if task_run.start_time else task_run.expected_start_time,
-            "end_time": task_run.end_time,
-            "total_duration": task_run.total_run_time,
-            "parameters": task_run.parameters,
-            "flow_id": task_run.flow_id,
-            "deployment_id": task_run.deployment_id
-        }
-        task_runs_info.append(task_run_dict)
+    # Combine and process data. Adjacent windows share their limits so duplicates are dropped
+    combined_task_runs = unique_by_id(task_runs + task_runs_without_start_time)
+    task_runs_info = [task_run_to_dict(task_run) for task_run in combined_task_runs]
 
     task_runs_info.sort(key=lambda x: x['start_time'], reverse=True)
 
     return task_runs_info
 
 
+def task_run_to_dict(task_run) -> dict:
+    """Convierte una ejecución de tarea en el diccionario usado por los reportes."""
+    return {
+        "id": task_run.id,
+        "flow_run_name": task_run.name,
+        "state": {
+            "message": task_run.state.message,
+            "type": task_run.state.type
+        },
+        "start_time": task_run.start_time if task_run.start_time else task_run.expected_start_time,
+        "end_time": task_run.end_time,
+        "total_duration": task_run.total_run_time,
+        "flow_run_id": task_run.flow_run_id
+    }
+
+
+async def iter_flow_runs(
+        start_date: datetime,
+        end_date: datetime,
+        states: Union[Sequence[str], Sequence[StateType], None] = None,
+        client: Optional[PrefectClient] = None,
+        fields: Optional[Sequence[str]] = None,
+        by_page: bool = False,
+        window_hours: float = DEFAULT_WINDOW_HOURS,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+    ) -> AsyncIterator[Union[dict, list[dict]]]:
+    """
+    Versión en streaming de `get_flow_runs_info`: devuelve las ejecuciones de flujo a medida que llegan de la API.
+
+    El rango se divide en ventanas de tiempo que se leen en paralelo, como en `get_flow_runs_info`, pero cada
+    ventana solo adelanta unas pocas páginas: en memoria hay a lo sumo `max_concurrency` ventanas de unas
+    páginas cada una, sin importar el tamaño del rango. Las ventanas no comparten extremos, por lo que
+    no hay ejecuciones repetidas.
+
+    Primero se recorren las ejecuciones con start_time, ordenadas por start_time ascendente,
+    y luego las que no iniciaron, ordenadas por expected_start_time ascendente. Ambos grupos no se solapan.
+
+    Parámetros:
+    - start_date (datetime): Fecha de inicio del rango de fechas.
+    - end_date (datetime): Fecha de fin del rango de fechas.
+    - states (list[str], opcional): Lista de estados de ejecución a filtrar. Por defecto es None.
+    - client (PrefectClient, opcional): Cliente a utilizar. Por defecto el cliente compartido o uno nuevo.
+    - fields (list[str], opcional): Claves del diccionario a conservar, por ejemplo ("id", "start_time").
+      Por defecto todas.
+    - by_page (bool, opcional): Si se devuelven páginas (listas de diccionarios) en lugar de diccionarios sueltos.
+    - window_hours (float, opcional): Horas de cada ventana de tiempo que se consulta en paralelo.
+    - max_concurrency (int, opcional): Cantidad máxima de ventanas consultadas a la vez.
+    Retorna:
+    - AsyncIterator: Diccionarios con el formato de `get_flow_runs_info`, o páginas de ellos.
+    """
+    async for page in _iter_run_pages(
+            'read_flow_runs', FlowRunFilter, 'flow_run_filter', start_date, end_date, states, client,
+            key_fields=('start_time', 'expected_start_time'),
+            window_hours=window_hours, max_concurrency=max_concurrency
+        ):
+        records = [project(flow_run_to_dict(flow_run), fields) for flow_run in page]
+        if by_page:
+            yield records
+        else:
+            for record in records:
+                yield record
+
+
+async def iter_task_runs(
+        start_date: datetime,
+        end_date: datetime,
+        states: Union[Sequence[str], Sequence[StateType], None] = None,
+        client: Optional[PrefectClient] = None,
+        fields: Optional[Sequence[str]] = None,
+        by_page: bool = False,
+        window_hours: float = DEFAULT_WINDOW_HOURS,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+    ) -> AsyncIterator[Union[dict, list[dict]]]:
+    """
+    Versión en streaming de `get_task_runs_info`. Los parámetros son los mismos que en `iter_flow_runs`.
+    Las ejecuciones de tarea solo pueden ordenarse por expected_start_time, que se usa como cursor en ambos grupos.
+    """
+    async for page in _iter_run_pages(
+            'read_task_runs', TaskRunFilter, 'task_run_filter', start_date, end_date, states, client,
+            key_fields=('expected_start_time', 'expected_start_time'),
+            window_hours=window_hours, max_concurrency=max_concurrency
+        ):
+        records = [project(task_run_to_dict(task_run), fields) for task_run in page]
+        if by_page:
+            yield records
+        else:
+            for record in records:
+                yield record
+
+
+async def _iter_run_pages(
+        read_method: str,
+        filter_class: type,
+        filter_name: str,
+        start_date: datetime,
+        end_date: datetime,
+        states: Union[Sequence[str], Sequence[StateType], None],
+        client: Optional[PrefectClient],
+        key_fields: tuple[str, str],
+        window_hours: float = DEFAULT_WINDOW_HOURS,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+    ) -> AsyncIterator[list]:
+    """Recorre por ventanas en paralelo las ejecuciones con start_time y luego las que no iniciaron."""
+    if start_date.tzinfo is None:
+        start_date = start_date.replace(tzinfo=timezone.utc)
+    if end_date.tzinfo is None:
+        end_date = end_date.replace(tzinfo=timezone.utc)
+
+    windows = disjoint_time_windows(start_date, end_date, timedelta(hours=window_hours))
+
+    async with use_client(client) as client:
+        api_limit = await get_api_limit(client)
+
+        def window_pages(without_start_time: bool, key_field: str, window_start: datetime, window_end: datetime):
+            read_page = runs_page_reader(
+                getattr(client, read_method), filter_class, filter_name, states,
+                window_start, window_end, without_start_time, key_field
+            )
+            # Si el cursor no es el campo filtrado por la ventana, puede ser anterior a ella
+            cursor_start = window_start if without_start_time or key_field == 'start_time' else KEYSET_EPOCH
+            return keyset_pages(
+                read_page, attrgetter(key_field), cursor_start, window_end, api_limit, sort=SORT_BY_FIELD[key_field]
+            )
+
+        sources = [
+            partial(window_pages, without_start_time, key_field, *window)
+            for without_start_time, key_field in zip((False, True), key_fields)
+            for window in windows
+        ]
+        async for page in concurrent_pages(sources, max_concurrency):
+            yield page
+
+
+def project(record: dict, fields: Optional[Sequence[str]]) -> dict:
+    """Conserva solo las claves indicadas del diccionario. Si `fields` es None lo devuelve completo."""
+    if fields is None:
+        return record
+    return {field: record[field] for field in fields}
+
+
 @task
-async def get_flow_run_info(flow_run_id: UUID) -> dict:
+async def get_flow_run_info(flow_run_id: UUID, client: Optional[PrefectClient] = None) -> dict:
     try:
-        async with get_client() as client:
+        async with use_client(client) as client:
             flow_run_info = await client.read_flow_run(flow_run_id)
     except exceptions.ObjectNotFound:
         return {
@@ -285,54 +445,208 @@ async def get_flow_run_info(flow_run_id: UUID) -> dict:
 
 
 @task
-async def get_flow_info(flow_id: UUID) -> dict:
+async def get_flow_info(
+        flow_id: UUID,
+        client: Optional[PrefectClient] = None,
+        cache: Optional[MetadataCache] = None
+    ) -> dict:
+    if cache and (cached := cache.get_many(FLOWS, [flow_id])):
+        return cached[flow_id]
+
     try:
-        async with get_client() as client:
+        async with use_client(client) as client:
             flow_info = await client.read_flow(flow_id)
-        flow_dict = {
-            "id": flow_info.id,
-            "name": flow_info.name,
-        }
     except exceptions.ObjectNotFound:
-        return {
-            "id": flow_id,
-            "name": "Flow not found"
-        }
+        return flow_not_found(flow_id)
+
+    flow_dict = flow_to_dict(flow_info)
+    if cache:
+        cache.put_many(FLOWS, [(flow_dict, flow_info.updated)])
 
     return flow_dict
 
 
 @task
-async def get_deployment_info(deployment_id: UUID) -> dict:
+async def get_deployment_info(
+        deployment_id: UUID,
+        client: Optional[PrefectClient] = None,
+        cache: Optional[MetadataCache] = None
+    ) -> dict:
+    if cache and (cached := cache.get_many(DEPLOYMENTS, [deployment_id])):
+        return cached[deployment_id]
+
     try:
-        async with get_client() as client:
+        async with use_client(client) as client:
             deployment_info = await client.read_deployment(deployment_id) # pylint: disable=no-member
-
-        deployment_dict = {
-            "id": deployment_info.id,
-            "name": deployment_info.name,
-            "entrypoint": deployment_info.entrypoint,
-            "source": deployment_info.pull_steps[0].get('prefect.deployments.steps.git_clone', {}),
-            "description": deployment_info.description,
-        }
     except exceptions.ObjectNotFound:
-        deployment_dict = {
-            "id": deployment_id,
-            "name": "Deployment not found",
-            "entrypoint": "Deployment not found",
-            "description": "Deployment not found"
-        }
+        return deployment_not_found(deployment_id)
+
+    deployment_dict = deployment_to_dict(deployment_info)
+    if cache:
+        cache.put_many(DEPLOYMENTS, [(deployment_dict, deployment_info.updated)])
 
     return deployment_dict
 
 
+@task
+async def get_flows_info(
+        flow_ids: Sequence[UUID],
+        client: Optional[PrefectClient] = None,
+        cache: Optional[MetadataCache] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+    ) -> dict[UUID, dict]:
+    """
+    Obtiene información de muchos flujos con consultas `id any_` por lotes.
+
+    Parámetros:
+    - flow_ids (list[UUID]): IDs de los flujos.
+    - client (PrefectClient, opcional): Cliente a utilizar. Por defecto el cliente compartido o uno nuevo.
+    - cache (MetadataCache, opcional): Caché local de metadatos. Solo se consultan a la API los IDs que no están en ella.
+    - chunk_size (int, opcional): Cantidad de IDs por consulta.
+    - max_concurrency (int, opcional): Cantidad máxima de lotes consultados a la vez.
+    Retorna:
+    - dict[UUID, dict]: Información de cada flujo por ID. Los no encontrados tienen la entrada "Flow not found".
+    """
+    flows_info = {flow_id: flow_not_found(flow_id) for flow_id in flow_ids}
+    cached = cache.get_many(FLOWS, flow_ids) if cache else {}
+    flows_info.update(cached)
+
+    async with use_client(client) as client:
+        flows = await read_by_id_chunks(
+            [flow_id for flow_id in flow_ids if flow_id not in cached],
+            lambda chunk, limit: client.read_flows(flow_filter=FlowFilter(id={'any_': chunk}), limit=limit),
+            client, chunk_size, max_concurrency
+        )
+
+    fetched = [(flow_to_dict(flow), flow.updated) for flow in flows]
+    flows_info.update({flow_dict['id']: flow_dict for flow_dict, _ in fetched})
+    if cache:
+        cache.put_many(FLOWS, fetched)
+
+    return flows_info
+
+
+@task
+async def get_deployments_info(
+        deployment_ids: Sequence[UUID],
+        client: Optional[PrefectClient] = None,
+        cache: Optional[MetadataCache] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+    ) -> dict[UUID, dict]:
+    """
+    Obtiene información de muchos despliegues con consultas `id any_` por lotes.
+
+    Parámetros:
+    - deployment_ids (list[UUID]): IDs de los despliegues.
+    - client (PrefectClient, opcional): Cliente a utilizar. Por defecto el cliente compartido o uno nuevo.
+    - cache (MetadataCache, opcional): Caché local de metadatos. Solo se consultan a la API los IDs que no están en ella.
+    - chunk_size (int, opcional): Cantidad de IDs por consulta.
+    - max_concurrency (int, opcional): Cantidad máxima de lotes consultados a la vez.
+    Retorna:
+    - dict[UUID, dict]: Información de cada despliegue por ID. Los no encontrados tienen la entrada "Deployment not found".
+    """
+    deployments_info = {deployment_id: deployment_not_found(deployment_id) for deployment_id in deployment_ids}
+    cached = cache.get_many(DEPLOYMENTS, deployment_ids) if cache else {}
+    deployments_info.update(cached)
+
+    async with use_client(client) as client:
+        deployments = await read_by_id_chunks(
+            [deployment_id for deployment_id in deployment_ids if deployment_id not in cached],
+            lambda chunk, limit: client.read_deployments(
+                deployment_filter=DeploymentFilter(id={'any_': chunk}), limit=limit
+            ),
+            client, chunk_size, max_concurrency
+        )
+
+    fetched = [(deployment_to_dict(deployment), deployment.updated) for deployment in deployments]
+    deployments_info.update({deployment_dict['id']: deployment_dict for deployment_dict, _ in fetched})
+    if cache:
+        cache.put_many(DEPLOYMENTS, fetched)
+
+    return deployments_info
+
+
+async def read_by_id_chunks(
+        ids: Sequence[UUID],
+        read_chunk,
+        client: PrefectClient,
+        chunk_size: int,
+        max_concurrency: int
+    ) -> list:
+    """
+    Lee objetos por ID en lotes concurrentes.
+    El tamaño del lote se limita al límite de la API para que cada lote entre en una sola página.
+
+    Parámetros:
+    - ids (list[UUID]): IDs a consultar. Se quitan duplicados y valores vacíos.
+    - read_chunk (Callable): read_chunk(ids_del_lote, limit) lee los objetos de un lote.
+    - client (PrefectClient): Cliente usado para obtener el límite de la API.
+    - chunk_size (int): Cantidad de IDs por consulta.
+    - max_concurrency (int): Cantidad máxima de lotes consultados a la vez.
+    """
+    ids = [object_id for object_id in dict.fromkeys(ids) if object_id]
+    if not ids:
+        return []
+
+    api_limit = await get_api_limit(client)
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def read_limited(chunk: list[UUID]) -> list:
+        async with semaphore:
+            return await read_chunk(chunk, len(chunk))
+
+    pages = await asyncio.gather(*(read_limited(chunk) for chunk in chunked(ids, min(chunk_size, api_limit))))
+
+    return [item for page in pages for item in page]
+
+
+def flow_to_dict(flow) -> dict:
+    """Convierte un flujo en el diccionario usado por los reportes."""
+    return {
+        "id": flow.id,
+        "name": flow.name,
+    }
+
+
+def flow_not_found(flow_id: UUID) -> dict:
+    """Entrada usada cuando un flujo no existe en el servidor."""
+    return {
+        "id": flow_id,
+        "name": "Flow not found"
+    }
+
+
+def deployment_to_dict(deployment) -> dict:
+    """Convierte un despliegue en el diccionario usado por los reportes."""
+    return {
+        "id": deployment.id,
+        "name": deployment.name,
+        "entrypoint": deployment.entrypoint,
+        "source": (deployment.pull_steps or [{}])[0].get('prefect.deployments.steps.git_clone', {}),
+        "description": deployment.description,
+    }
+
+
+def deployment_not_found(deployment_id: UUID) -> dict:
+    """Entrada usada cuando un despliegue no existe en el servidor."""
+    return {
+        "id": deployment_id,
+        "name": "Deployment not found",
+        "entrypoint": "Deployment not found",
+        "description": "Deployment not found"
+    }
+
+
 @task
 async def get_subflow_runs_info(
         parent_flow_run_id: UUID,
-        states: Union[Sequence[str], Sequence[StateType], None] = None
+        states: Union[Sequence[str], Sequence[StateType], None] = None,
+        client: Optional[PrefectClient] = None
     ) -> list[dict]:
     try:
-        async with get_client() as client:
+        async with use_client(client) as client:
             subflow_info = await client.read_flow_runs(
                 flow_run_filter=FlowRunFilter(
                     parent_flow_run_id={'any_': [parent_flow_run_id]} if parent_flow_run_id else None,
@@ -342,24 +656,93 @@ async def get_subflow_runs_info(
     except exceptions.ObjectNotFound:
         return []
 
-    subflow_info_list = []
-    for subflow in subflow_info:
-        subflow_dict = {
-            "id": subflow.id,
-            "parent_flow_run_id": parent_flow_run_id,
-            "state": {
-                "message": subflow.state.message,
-                "type": subflow.state.type
-            },
-            "start_time": subflow.start_time,
-            "end_time": subflow.end_time,
-            "total_duration": subflow.total_run_time,
-            "parameters": subflow.parameters
-        }
+    return [subflow_to_dict(subflow, parent_flow_run_id) for subflow in subflow_info]
+
+
+@task
+async def get_subflow_runs_by_parent(
+        parent_flow_run_ids: Sequence[UUID],
+        states: Union[Sequence[str], Sequence[StateType], None] = None,
+        client: Optional[PrefectClient] = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+    ) -> dict[UUID, list[dict]]:
+    """
+    Obtiene los subflujos de muchos flujos padre con consultas `parent_flow_run_id any_` por lotes,
+    en lugar de una tarea y una consulta por cada flujo padre.
 
-        subflow_info_list.append(subflow_dict)
+    Parámetros:
+    - parent_flow_run_ids (list[UUID]): IDs de las ejecuciones de flujo padre.
+    - states (list[str], opcional): Lista de estados de ejecución de los subflujos a filtrar. Por defecto es None.
+    - client (PrefectClient, opcional): Cliente a utilizar. Por defecto el cliente compartido o uno nuevo.
+    - chunk_size (int, opcional): Cantidad de IDs padre por consulta.
+    - max_concurrency (int, opcional): Cantidad máxima de lotes consultados a la vez.
+    Retorna:
+    - dict[UUID, list[dict]]: Subflujos de cada flujo padre. Los padres sin subflujos tienen una lista vacía.
+    """
+    parent_flow_run_ids = list(dict.fromkeys(parent_flow_run_ids))
+    subflows_by_parent = {parent_id: [] for parent_id in parent_flow_run_ids}
+    if not parent_flow_run_ids:
+        return subflows_by_parent
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def fetch_chunk(chunk: list[UUID]) -> list[tuple[UUID, object]]:
+        async with semaphore:
+            subflows = await offset_paginate(
+                lambda offset: client.read_flow_runs(
+                    flow_run_filter=FlowRunFilter(
+                        parent_flow_run_id={'any_': chunk},
+                        state={'type': {'any_': states}} if states else None,
+                    ),
+                    sort="ID_DESC",
+                    limit=api_limit,
+                    offset=offset
+                ),
+                api_limit
+            )
 
-    return subflow_info_list
+            # Los subflujos solo conocen la tarea que los lanzó, de ella se obtiene el flujo padre
+            parent_task_run_ids = list({subflow.parent_task_run_id for subflow in subflows if subflow.parent_task_run_id})
+            parent_task_runs = await offset_paginate(
+                lambda offset: client.read_task_runs(
+                    task_run_filter=TaskRunFilter(id={'any_': parent_task_run_ids}),
+                    sort="ID_DESC",
+                    limit=api_limit,
+                    offset=offset
+                ),
+                api_limit
+            ) if parent_task_run_ids else []
+
+        parent_by_task_run = {task_run.id: task_run.flow_run_id for task_run in parent_task_runs}
+        return [(parent_by_task_run.get(subflow.parent_task_run_id), subflow) for subflow in subflows]
+
+    async with use_client(client) as client:
+        api_limit = await get_api_limit(client)
+        results = await asyncio.gather(*(fetch_chunk(chunk) for chunk in chunked(parent_flow_run_ids, chunk_size)))
+
+    for chunk_result in results:
+        for parent_id, subflow in chunk_result:
+            if parent_id in subflows_by_parent:
+                subflows_by_parent[parent_id].append(subflow_to_dict(subflow, parent_id))
+
+    return subflows_by_parent
+
+
+def subflow_to_dict(subflow, parent_flow_run_id: UUID) -> dict:
+    """Convierte una ejecución de subflujo en el diccionario usado por los reportes."""
+    return {
+        "id": subflow.id,
+        "parent_flow_run_id": parent_flow_run_id,
+        "state": {
+            "message": subflow.state.message,
+            "type": subflow.state.type
+        },
+        "start_time": subflow.start_time,
+        "end_time": subflow.end_time,
+        "total_duration": subflow.total_run_time,
+        "parameters": subflow.parameters
+    }
 
 
 def get_prefect_url():
@@ -384,47 +767,128 @@ def get_prefect_url():
         return default
 
 @task
-async def schedule_executions_for_deploy(deploy_id: UUID, list_executions: list[datetime]) -> dict:
-    try:
-        async with get_client() as client:
-            scheduled_flow_runs = await client.get_scheduled_flow_runs_for_deployments([deploy_id])
-
-            # Convert pydantic datetime to regular datetime
-            scheduled_times = [
-                run.expected_start_time.replace(tzinfo=None)
-                for run in scheduled_flow_runs
-            ]
-
-            # Convert input datetimes to same format
-            list_executions = [
-                dt.replace(tzinfo=None)
-                for dt in list_executions
-            ]
-
-            if all(dt in scheduled_times for dt in list_executions):
-                return {
-                    "id": deploy_id,
-                    "message": "All executions are already scheduled"
-                }
-
-            for dt in list_executions:
-                flow_run_info = await client.create_flow_run_from_deployment(
-                    deployment_id=deploy_id,
-                    state=State(
-                        type=StateType.SCHEDULED,
-                        state_details=StateDetails(
-                            scheduled_time=dt
-                        )
+async def schedule_executions(
+        executions: dict[UUID, Sequence[datetime]],
+        client: Optional[PrefectClient] = None,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        tags: Sequence[str] = ("Programado por script",)
+    ) -> dict[tuple[UUID, datetime], dict]:
+    """
+    Programa ejecuciones para muchos despliegues y fechas, creando solo las que todavía no existen.
+
+    Las ejecuciones ya programadas se leen con una consulta paginada por lote de despliegues y se comparan como
+    conjunto de pares (despliegue, fecha). Las faltantes se crean en paralelo con un límite de concurrencia.
+    Las fechas sin zona horaria se interpretan en UTC.
+
+    Parámetros:
+    - executions (dict[UUID, list[datetime]]): Fechas a programar por ID de despliegue.
+    - client (PrefectClient, opcional): Cliente a utilizar. Por defecto el cliente compartido o uno nuevo.
+    - max_concurrency (int, opcional): Cantidad máxima de ejecuciones creadas a la vez.
+    - tags (list[str], opcional): Tags de las ejecuciones creadas.
+    Retorna:
+    - dict[tuple[UUID, datetime], dict]: Resultado por par (despliegue, fecha en UTC sin zona horaria), con "status"
+      "created" (y "flow_run_id"), "already_scheduled", "deployment_not_found" o "error" (y "message").
+    """
+    requested = {
+        (deployment_id, to_utc_naive(execution_time))
+        for deployment_id, execution_times in executions.items()
+        for execution_time in execution_times
+    }
+    if not requested:
+        return {}
+
+    deployment_ids = list({deployment_id for deployment_id, _ in requested})
+    earliest = min(execution_time for _, execution_time in requested).replace(tzinfo=timezone.utc)
+    latest = max(execution_time for _, execution_time in requested).replace(tzinfo=timezone.utc)
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async with use_client(client) as client:
+        api_limit = await get_api_limit(client)
+
+        async def read_scheduled(chunk: list[UUID]) -> list:
+            async def read_page(after_: datetime, before_: datetime, sort: str, limit: int, offset: int) -> list:
+                return await client.read_flow_runs(
+                    flow_run_filter=FlowRunFilter(
+                        deployment_id={'any_': chunk},
+                        state={'type': {'any_': [StateType.SCHEDULED]}},
+                        expected_start_time={'after_': after_, 'before_': before_},
                     ),
-                    tags=["Programado por script"]
+                    sort=sort,
+                    limit=limit,
+                    offset=offset
                 )
-    except exceptions.ObjectNotFound:
-        return {
-            "id": deploy_id,
-            "name": "Deployment not found"
+
+            async with semaphore:
+                return await keyset_paginate(
+                    read_page, attrgetter('expected_start_time'), earliest, latest, api_limit,
+                    sort=SORT_BY_FIELD['expected_start_time']
+                )
+
+        scheduled_pages = await asyncio.gather(
+            *(read_scheduled(chunk) for chunk in chunked(deployment_ids, DEFAULT_CHUNK_SIZE))
+        )
+        already_scheduled = {
+            (flow_run.deployment_id, to_utc_naive(flow_run.expected_start_time))
+            for page in scheduled_pages
+            for flow_run in page
         }
 
-    return flow_run_info
+        async def create(deployment_id: UUID, execution_time: datetime) -> dict:
+            async with semaphore:
+                try:
+                    flow_run = await client.create_flow_run_from_deployment(
+                        deployment_id=deployment_id,
+                        state=State(
+                            type=StateType.SCHEDULED,
+                            state_details=StateDetails(
+                                scheduled_time=execution_time.replace(tzinfo=timezone.utc)
+                            )
+                        ),
+                        tags=list(tags)
+                    )
+                except exceptions.ObjectNotFound:
+                    return {"status": "deployment_not_found"}
+                except Exception as e:  # pylint: disable=broad-exception-caught
+                    return {"status": "error", "message": str(e)}
+
+                return {"status": "created", "flow_run_id": flow_run.id}
+
+        # Solo se crean los pares que faltan
+        missing = sorted(requested - already_scheduled, key=lambda pair: (str(pair[0]), pair[1]))
+        created = await asyncio.gather(*(create(*pair) for pair in missing))
+
+    results = {pair: {"status": "already_scheduled"} for pair in requested & already_scheduled}
+    results.update(zip(missing, created))
+
+    return results
+
+
+@task
+async def schedule_executions_for_deploy(
+        deploy_id: UUID,
+        list_executions: list[datetime],
+        client: Optional[PrefectClient] = None
+    ) -> dict:
+    """
+    Programa ejecuciones para un despliegue específico. Ver `schedule_executions` para muchos despliegues.
+
+    Retorna:
+    - dict: ID del despliegue y resultado por fecha (UTC sin zona horaria).
+    """
+    results = await schedule_executions.fn({deploy_id: list_executions}, client=client)
+
+    return {
+        "id": deploy_id,
+        "results": {execution_time: result for (_, execution_time), result in results.items()}
+    }
+
+
+def to_utc_naive(value: datetime) -> datetime:
+    """Convierte una fecha a UTC sin zona horaria. Las fechas sin zona horaria se interpretan en UTC."""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
 
 
 if __name__ == "__main__":
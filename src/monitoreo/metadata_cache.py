@@ -0,0 +1,268 @@
+"""
+    Caché local en disco de metadatos de flujos y despliegues.
+
+    Los nombres de flujos y los nombres, entrypoints y descripciones de despliegues casi nunca cambian,
+    pero cada reporte diario, semanal y mensual los volvía a consultar. Esta caché los guarda en SQLite
+    para que los reportes repetidos los resuelvan localmente sin llamadas a la API.
+
+    Cada entrada guarda el campo `updated` del objeto en el servidor. Las entradas vencen por TTL y
+    además se invalidan cuando se conoce una versión más nueva del objeto (ver `invalidate_if_updated`).
+    Antes de usar la caché, `sync_deployment_events` lee del historial de eventos del servidor los despliegues
+    modificados o eliminados desde la última lectura y descarta sus entradas, así un cambio en la descripción
+    (y en los metadatos de responsable y área) se ve en el siguiente reporte y no recién al vencer el TTL.
+
+    - `MetadataCache(path: str, ttl_seconds: float)`:
+        Caché con métodos `get_many`, `put_many`, `invalidate`, `invalidate_if_updated` y `clear`.
+        Los atributos `hits` y `misses` cuentan los aciertos y fallos de las búsquedas.
+    - `sync_deployment_events(cache: MetadataCache, client: PrefectClient = None) -> int`:
+        Invalida los despliegues modificados o eliminados según los eventos del servidor.
+
+    Ejemplo:
+        cache = MetadataCache()
+        await sync_deployment_events(cache)
+        deployments = await get_deployments_info(deployment_ids, cache=cache)
+        logger.info("Caché de metadatos: %s", cache.stats())
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Union
+from uuid import UUID
+
+import httpx
+from prefect.client.orchestration import PrefectClient
+from prefect.settings import PREFECT_HOME
+
+from dev.MONITOREO_PREFECT.flow_run_events import read_deployment_updates
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+FLOWS = "flows"
+DEPLOYMENTS = "deployments"
+KINDS = (FLOWS, DEPLOYMENTS)
+
+# Clave del último evento de despliegue aplicado, para no volver a aplicar eventos ya leídos
+EVENTS_CHECKPOINT_KEY = "deployment_events_until"
+
+# Las lecturas sin eventos avanzan la marca hasta un poco antes del reloj local, por si difiere del servidor
+EVENTS_CLOCK_MARGIN = timedelta(minutes=5)
+
+logger = logging.getLogger(__name__)
+
+
+def default_cache_path() -> Path:
+    """Ruta por defecto de la caché. Se resuelve al crearla, así respeta el PREFECT_HOME vigente en ese momento."""
+    return Path(PREFECT_HOME.value()) / "monitoreo" / "metadata_cache.sqlite"
+
+
+class MetadataCache:
+    """
+    Caché en SQLite de diccionarios de metadatos indexados por ID y tipo de objeto (flows o deployments).
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.path = Path(path) if path is not None else default_cache_path()
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            for kind in KINDS:
+                connection.execute(
+                    f"CREATE TABLE IF NOT EXISTS {kind} ("
+                    "id TEXT PRIMARY KEY, data TEXT NOT NULL, updated TEXT, cached_at REAL NOT NULL)"
+                )
+            connection.execute("CREATE TABLE IF NOT EXISTS checkpoints (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+    def get_many(self, kind: str, ids: Iterable[UUID]) -> dict[UUID, dict]:
+        """
+        Devuelve las entradas vigentes de los IDs pedidos. Los IDs ausentes o vencidos cuentan como fallo.
+
+        Parámetros:
+        - kind (str): Tipo de objeto, `FLOWS` o `DEPLOYMENTS`.
+        - ids (list[UUID]): IDs a buscar.
+        Retorna:
+        - dict[UUID, dict]: Metadatos encontrados por ID.
+        """
+        ids = [object_id for object_id in dict.fromkeys(ids) if object_id]
+        if not ids:
+            return {}
+
+        min_cached_at = time.time() - self.ttl_seconds
+        found = {}
+        with self._connect() as connection:
+            # SQLite limita la cantidad de parámetros por consulta
+            for i in range(0, len(ids), 500):
+                chunk = [str(object_id) for object_id in ids[i:i + 500]]
+                rows = connection.execute(
+                    f"SELECT id, data FROM {_table(kind)} "
+                    f"WHERE cached_at >= ? AND id IN ({','.join('?' * len(chunk))})",
+                    [min_cached_at, *chunk]
+                )
+                for object_id, data in rows:
+                    found[UUID(object_id)] = _loads(data)
+
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(ids) - len(found)
+
+        return found
+
+    def put_many(self, kind: str, entries: Iterable[tuple[dict, Optional[datetime]]]) -> None:
+        """
+        Guarda o reemplaza entradas. Una entrada no reemplaza a otra guardada con un `updated` más nuevo.
+
+        Parámetros:
+        - kind (str): Tipo de objeto, `FLOWS` o `DEPLOYMENTS`.
+        - entries (list[tuple[dict, datetime]]): Pares (metadatos con clave "id", campo `updated` del servidor).
+        """
+        now = time.time()
+        rows = [
+            (str(data["id"]), _dumps(data), _timestamp(updated), now)
+            for data, updated in entries
+        ]
+        if not rows:
+            return
+
+        with self._connect() as connection:
+            connection.executemany(
+                f"INSERT INTO {_table(kind)} (id, data, updated, cached_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET data = excluded.data, updated = excluded.updated, "
+                "cached_at = excluded.cached_at "
+                "WHERE updated IS NULL OR excluded.updated IS NULL OR excluded.updated >= updated",
+                rows
+            )
+
+    def invalidate(self, kind: str, ids: Iterable[UUID]) -> None:
+        """Elimina de la caché las entradas de los IDs indicados."""
+        ids = [(str(object_id),) for object_id in ids]
+        with self._connect() as connection:
+            connection.executemany(f"DELETE FROM {_table(kind)} WHERE id = ?", ids)
+
+    def invalidate_if_updated(self, kind: str, updates: dict[UUID, datetime]) -> None:
+        """
+        Elimina las entradas cuyo `updated` guardado es anterior al `updated` conocido del servidor,
+        por ejemplo a partir de un evento de actualización de un despliegue.
+
+        Parámetros:
+        - kind (str): Tipo de objeto, `FLOWS` o `DEPLOYMENTS`.
+        - updates (dict[UUID, datetime]): Último `updated` conocido de cada ID.
+        """
+        rows = [(str(object_id), _timestamp(updated)) for object_id, updated in updates.items()]
+        with self._connect() as connection:
+            connection.executemany(
+                f"DELETE FROM {_table(kind)} WHERE id = ? AND (updated IS NULL OR updated < ?)",
+                rows
+            )
+
+    def clear(self, kinds: Iterable[str] = KINDS) -> None:
+        """Elimina todas las entradas de los tipos indicados, por defecto todos, y reinicia los contadores."""
+        with self._connect() as connection:
+            for kind in kinds:
+                connection.execute(f"DELETE FROM {_table(kind)}")
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def get_checkpoint(self, key: str) -> Optional[datetime]:
+        with self._connect() as connection:
+            row = connection.execute("SELECT value FROM checkpoints WHERE key = ?", (key,)).fetchone()
+        return datetime.fromisoformat(row[0]) if row else None
+
+    def set_checkpoint(self, key: str, value: datetime) -> None:
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO checkpoints (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                (key, _timestamp(value))
+            )
+
+    def stats(self) -> dict:
+        """Devuelve los contadores de aciertos y fallos de la caché."""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        # Una conexión por operación para poder usar la caché desde varios hilos de tareas
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+
+async def sync_deployment_events(cache: MetadataCache, client: Optional[PrefectClient] = None) -> int:
+    """
+    Invalida las entradas de despliegues modificados o eliminados en el servidor desde la última sincronización.
+
+    Los eventos se leen desde el último evento aplicado, o en la primera sincronización desde el inicio del TTL,
+    que es lo más viejo que puede tener la caché. Tras cada lectura se guarda la fecha del último evento leído
+    (reloj del servidor) o, si es posterior, el fin de la lectura menos `EVENTS_CLOCK_MARGIN`.
+    Si el historial de eventos no se puede leer se registra una advertencia y la caché queda como está:
+    el TTL y `invalidate_if_updated` siguen acotando qué tan viejas pueden ser las entradas.
+
+    Parámetros:
+    - cache (MetadataCache): Caché a sincronizar.
+    - client (PrefectClient, opcional): Cliente a utilizar. Por defecto el cliente compartido o uno nuevo.
+    Retorna:
+    - int: Cantidad de despliegues con eventos de modificación o eliminación.
+    """
+    checkpoint = cache.get_checkpoint(EVENTS_CHECKPOINT_KEY)
+    # El filtro de eventos es inclusivo: se empieza justo después del último evento aplicado
+    since = checkpoint + timedelta(microseconds=1) if checkpoint \
+        else datetime.now(timezone.utc) - timedelta(seconds=cache.ttl_seconds)
+
+    until = datetime.now(timezone.utc)
+
+    try:
+        updates = await read_deployment_updates(since, client, until=until)
+    except (NotImplementedError, httpx.HTTPError) as e:
+        logger.warning("No se pudo leer el historial de eventos de despliegues, la caché no se sincroniza: %s", e)
+        return 0
+
+    if updates:
+        cache.invalidate_if_updated(DEPLOYMENTS, updates)
+    new_checkpoint = max([*updates.values(), until - EVENTS_CLOCK_MARGIN])
+    if checkpoint is None or new_checkpoint > checkpoint:
+        cache.set_checkpoint(EVENTS_CHECKPOINT_KEY, new_checkpoint)
+
+    return len(updates)
+
+
+def _table(kind: str) -> str:
+    if kind not in KINDS:
+        raise ValueError(f"Tipo de metadatos '{kind}' no reconocido.")
+    return kind
+
+
+def _timestamp(updated: Optional[datetime]) -> Optional[str]:
+    # ISO 8601 en UTC para que la comparación de strings en SQLite respete el orden temporal
+    if updated is None:
+        return None
+    if updated.tzinfo is None:
+        updated = updated.replace(tzinfo=timezone.utc)
+    return updated.astimezone(timezone.utc).isoformat()
+
+
+def _dumps(data: dict) -> str:
+    return json.dumps(data, default=str)
+
+
+def _loads(data: str) -> dict:
+    metadata = json.loads(data)
+    metadata["id"] = UUID(metadata["id"])
+    return metadata
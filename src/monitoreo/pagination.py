@@ -0,0 +1,300 @@
+"""
+    Utilidades de paginación para las consultas a la API de Prefect.
+
+    Las consultas de ejecuciones de un rango grande de fechas son casi todo espera de red. Para aprovecharla
+    el rango se divide en ventanas de tiempo adyacentes que se consultan en paralelo con un límite de concurrencia.
+    Dentro de cada ventana las páginas se recorren con un cursor keyset sobre (fecha, id).
+
+    - `split_time_windows(start_date: datetime, end_date: datetime, window: timedelta) -> list[tuple]`:
+        Divide un rango de fechas en ventanas adyacentes.
+    - `disjoint_time_windows(start_date: datetime, end_date: datetime, window: timedelta) -> list[tuple]`:
+        Igual que `split_time_windows` pero sin extremos compartidos, para recorrer sin deduplicar.
+    - `fetch_time_windows(fetch_window, windows, semaphore) -> list`:
+        Consulta todas las ventanas en paralelo, limitado por un semáforo, y une los resultados.
+    - `unique_by_id(items) -> list`:
+        Elimina elementos con ID repetido conservando el primero.
+    - `chunked(items, size) -> list[list]`:
+        Divide una lista en lotes de tamaño fijo, por ejemplo para consultas `any_`.
+    - `keyset_pages(read_page, key, start_date, end_date, limit, sort) -> AsyncIterator[list]`:
+        Recorre un rango de fechas página por página sin repetir ni saltear elementos.
+    - `keyset_paginate(read_page, key, start_date, end_date, limit, sort) -> list`:
+        Igual que `keyset_pages` pero devuelve todos los elementos en una lista.
+    - `offset_paginate(read_page, limit) -> list`:
+        Recorre con offset una consulta de resultado fijo ordenada de forma determinística (por ejemplo por ID).
+    - `concurrent_pages(sources, max_concurrency, prefetch) -> AsyncIterator[list]`:
+        Lee varias secuencias de páginas (por ejemplo una por ventana) en paralelo y las devuelve en orden,
+        con memoria acotada.
+    - `batched_pages(pages, size) -> AsyncIterator[list]`:
+        Une páginas chicas consecutivas en lotes de al menos `size` elementos.
+"""
+
+import asyncio
+from collections import deque
+from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Sequence
+
+# Resolución de las fechas en la base de datos de Prefect. El cursor avanza esta cantidad
+# por encima del último instante leído para que el filtro inclusivo `after_` no lo vuelva a traer
+CURSOR_RESOLUTION = timedelta(microseconds=1)
+
+# Función que lee una página: read_page(after_, before_, sort, limit, offset) -> list
+PageReader = Callable[[datetime, datetime, str, int, int], Awaitable[list]]
+
+# Páginas que cada fuente de `concurrent_pages` puede leer por adelantado
+DEFAULT_PREFETCH_PAGES = 2
+
+_END_OF_PAGES = object()
+
+
+def split_time_windows(
+        start_date: datetime,
+        end_date: datetime,
+        window: timedelta
+    ) -> list[tuple[datetime, datetime]]:
+    """
+    Divide el rango [start_date, end_date] en ventanas adyacentes de tamaño `window`.
+    Los extremos de ventanas contiguas coinciden, por lo que los resultados deben deduplicarse.
+
+    Parámetros:
+    - start_date (datetime): Fecha de inicio del rango.
+    - end_date (datetime): Fecha de fin del rango.
+    - window (timedelta): Tamaño de cada ventana. La última puede ser más corta.
+    Retorna:
+    - list[tuple[datetime, datetime]]: Lista de ventanas (inicio, fin) ordenadas.
+    """
+    if window <= timedelta(0):
+        raise ValueError("El tamaño de la ventana debe ser positivo.")
+
+    windows = []
+    window_start = start_date
+    while window_start < end_date:
+        window_end = min(window_start + window, end_date)
+        windows.append((window_start, window_end))
+        window_start = window_end
+
+    return windows or [(start_date, end_date)]
+
+
+def disjoint_time_windows(
+        start_date: datetime,
+        end_date: datetime,
+        window: timedelta
+    ) -> list[tuple[datetime, datetime]]:
+    """
+    Divide el rango [start_date, end_date] como `split_time_windows`, pero cada ventana termina
+    `CURSOR_RESOLUTION` antes de que empiece la siguiente. Con filtros inclusivos cada fecha cae en una sola
+    ventana, así los resultados de todas las ventanas se pueden recorrer en streaming sin deduplicar.
+    """
+    windows = split_time_windows(start_date, end_date, window)
+    return [(window_start, window_end - CURSOR_RESOLUTION) for window_start, window_end in windows[:-1]] + windows[-1:]
+
+
+async def fetch_time_windows(
+        fetch_window: Callable[[datetime, datetime], Awaitable[list]],
+        windows: Sequence[tuple[datetime, datetime]],
+        semaphore: asyncio.Semaphore
+    ) -> list:
+    """
+    Ejecuta `fetch_window(inicio, fin)` para cada ventana en paralelo.
+    El semáforo limita cuántas ventanas se consultan a la vez y puede compartirse entre varias llamadas.
+
+    Retorna:
+    - list: Resultados de todas las ventanas, en el orden de las ventanas.
+    """
+    async def fetch_limited(window_start: datetime, window_end: datetime) -> list:
+        async with semaphore:
+            return await fetch_window(window_start, window_end)
+
+    pages = await asyncio.gather(*(fetch_limited(*window) for window in windows))
+
+    return [item for page in pages for item in page]
+
+
+def unique_by_id(items: Iterable[Any]) -> list:
+    """Elimina elementos con `id` repetido, conservando la primera aparición."""
+    seen = set()
+    unique_items = []
+    for item in items:
+        if item.id in seen:
+            continue
+        seen.add(item.id)
+        unique_items.append(item)
+
+    return unique_items
+
+
+def chunked(items: Sequence[Any], size: int) -> list[list]:
+    """Divide `items` en lotes consecutivos de hasta `size` elementos."""
+    if size <= 0:
+        raise ValueError("El tamaño del lote debe ser positivo.")
+    items = list(items)
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+async def keyset_pages(
+        read_page: PageReader,
+        key: Callable[[Any], datetime],
+        start_date: datetime,
+        end_date: datetime,
+        limit: int,
+        sort: str,
+        tie_sort: str = "ID_DESC"
+    ) -> AsyncIterator[list]:
+    """
+    Recorre el rango [start_date, end_date] con un cursor keyset sobre (fecha, id).
+
+    Cada página se pide ordenada por fecha ascendente. Los elementos anteriores al último instante de la página
+    están completos; los que comparten ese último instante pueden continuar en la página siguiente, por lo que
+    ese instante se lee entero ordenado por ID con offset. Luego el cursor avanza estrictamente por encima de él.
+    Así no hay elementos repetidos ni salteados aunque muchas ejecuciones compartan la misma fecha,
+    y el recorrido siempre termina porque el cursor crece en cada página.
+
+    Parámetros:
+    - read_page (PageReader): Lee una página con fecha entre `after_` y `before_` (ambos inclusivos).
+    - key (Callable): Devuelve la fecha por la que se ordena y filtra cada elemento.
+    - start_date (datetime): Fecha de inicio del rango.
+    - end_date (datetime): Fecha de fin del rango.
+    - limit (int): Tamaño de página.
+    - sort (str): Orden ascendente por la fecha de `key`, por ejemplo "START_TIME_ASC".
+    - tie_sort (str, opcional): Orden determinístico para leer un mismo instante. Por defecto "ID_DESC".
+    Retorna:
+    - AsyncIterator[list]: Páginas de elementos, sin repetidos entre ellas.
+    """
+    cursor = start_date
+    while cursor <= end_date:
+        page = await read_page(cursor, end_date, sort, limit, 0)
+
+        if len(page) < limit:
+            if page:
+                yield page
+            return
+
+        boundary = max(key(item) for item in page)
+        boundary_items = await _read_instant(read_page, boundary, limit, tie_sort)
+
+        yield [item for item in page if key(item) < boundary] + boundary_items
+
+        cursor = boundary + CURSOR_RESOLUTION
+
+
+async def keyset_paginate(
+        read_page: PageReader,
+        key: Callable[[Any], datetime],
+        start_date: datetime,
+        end_date: datetime,
+        limit: int,
+        sort: str,
+        tie_sort: str = "ID_DESC"
+    ) -> list:
+    """Recorre el rango con `keyset_pages` y devuelve todos los elementos en una lista."""
+    results = []
+    async for page in keyset_pages(read_page, key, start_date, end_date, limit, sort, tie_sort):
+        results.extend(page)
+
+    return results
+
+
+async def offset_paginate(read_page: Callable[[int], Awaitable[list]], limit: int) -> list:
+    """
+    Lee todas las páginas de una consulta paginando con offset.
+    Solo es correcto si la consulta está ordenada de forma determinística, por ejemplo por ID.
+
+    Parámetros:
+    - read_page (Callable): Lee la página que comienza en el offset recibido.
+    - limit (int): Tamaño de página usado por `read_page`.
+    Retorna:
+    - list: Todos los elementos de la consulta.
+    """
+    results = []
+    offset = 0
+    while True:
+        page = await read_page(offset)
+        results.extend(page)
+
+        if len(page) < limit:
+            return results
+
+        offset += len(page)
+
+
+async def concurrent_pages(
+        sources: Sequence[Callable[[], AsyncIterator[list]]],
+        max_concurrency: int,
+        prefetch: int = DEFAULT_PREFETCH_PAGES
+    ) -> AsyncIterator[list]:
+    """
+    Recorre varias secuencias de páginas con hasta `max_concurrency` de ellas leyendo a la vez
+    y devuelve las páginas en el orden de `sources`, como si se recorrieran una tras otra.
+
+    Cada fuente adelanta hasta `prefetch` páginas mientras se consumen las anteriores, por lo que en memoria
+    hay a lo sumo `max_concurrency * (prefetch + 1)` páginas sin importar cuántas fuentes haya.
+    Si una fuente falla, el error se propaga al llegar a ella. Al cerrar el iterador se cancelan las lecturas.
+
+    Parámetros:
+    - sources (list[Callable]): Funciones sin argumentos que devuelven un iterador asíncrono de páginas,
+      por ejemplo `keyset_pages` de cada ventana de tiempo.
+    - max_concurrency (int): Cantidad máxima de fuentes leyendo a la vez.
+    - prefetch (int, opcional): Páginas que cada fuente puede leer por adelantado.
+    Retorna:
+    - AsyncIterator[list]: Páginas de todas las fuentes, en orden.
+    """
+    if max_concurrency <= 0 or prefetch <= 0:
+        raise ValueError("La concurrencia máxima y las páginas adelantadas deben ser positivas.")
+
+    async def produce(source: Callable[[], AsyncIterator[list]], queue: asyncio.Queue) -> None:
+        try:
+            async for page in source():
+                await queue.put(page)
+        except Exception as e:  # pylint: disable=broad-exception-caught
+            await queue.put(e)
+            return
+        await queue.put(_END_OF_PAGES)
+
+    pending_sources = iter(sources)
+    running: deque[tuple[asyncio.Task, asyncio.Queue]] = deque()
+
+    def start_next() -> None:
+        source = next(pending_sources, None)
+        if source is not None:
+            queue = asyncio.Queue(maxsize=prefetch)
+            running.append((asyncio.create_task(produce(source, queue)), queue))
+
+    for _ in range(max_concurrency):
+        start_next()
+
+    try:
+        while running:
+            _, queue = running[0]
+            while (page := await queue.get()) is not _END_OF_PAGES:
+                if isinstance(page, Exception):
+                    raise page
+                yield page
+            running.popleft()
+            start_next()
+    finally:
+        for producer, _ in running:
+            producer.cancel()
+
+
+async def batched_pages(pages: AsyncIterator[list], size: int) -> AsyncIterator[list]:
+    """
+    Une páginas consecutivas hasta juntar al menos `size` elementos, conservando el orden.
+    Las ventanas de tiempo chicas devuelven páginas de pocos elementos; así quien procesa por lote
+    (por ejemplo eliminaciones en paralelo) sigue trabajando con lotes del tamaño de una página de la API.
+    """
+    batch = []
+    async for page in pages:
+        batch.extend(page)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _read_instant(read_page: PageReader, instant: datetime, limit: int, sort: str) -> list:
+    """Lee todos los elementos de un instante exacto paginando con offset sobre un orden determinístico."""
+    return await offset_paginate(
+        lambda offset: read_page(instant, instant, sort, limit, offset),
+        limit
+    )
@@ -0,0 +1,121 @@
+"""
+    Exportación a Excel de los flujos fallidos obtenidos por `get_failed_flow_runs`.
+
+    El libro se escribe en el modo write-only de openpyxl: las filas se vuelcan al archivo a medida que se agregan,
+    sin mantener la hoja en memoria. Los formatos se registran una vez como estilos con nombre y solo las celdas
+    que los necesitan (encabezado y fechas) referencian el nombre. El resto se escribe como valores simples,
+    que es varias veces más rápido que crear una celda con estilo por valor.
+
+    - `export_failed_flow_runs_xlsx(failed_flow_runs: pd.DataFrame, path: str) -> str`:
+        Escribe el XLSX con una fila por ejecución y devuelve su ruta.
+    - `EXCEL_COLUMNS`:
+        Columnas exportadas y su título en la hoja.
+"""
+
+from typing import Iterator
+
+import pandas as pd
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.utils import get_column_letter
+
+# Columna del DataFrame, título y ancho en la hoja
+EXCEL_COLUMNS = [
+    ('id', 'ID de ejecución', 38),
+    ('flow_name', 'Flujo', 30),
+    ('flow_run_name', 'Ejecución', 30),
+    ('deployment_name', 'Despliegue', 30),
+    ('deployment_entrypoint', 'Entrypoint', 40),
+    ('state_type', 'Estado', 12),
+    ('state_message', 'Mensaje de estado', 60),
+    ('start_time', 'Fecha de inicio (UTC)', 20),
+    ('end_time', 'Fecha de fin (UTC)', 20),
+    ('parent_flow_run_id', 'ID de ejecución padre', 38),
+    ('ui_url', 'Detalles', 60),
+]
+
+DATETIME_COLUMNS = {'start_time', 'end_time'}
+
+HEADER_STYLE = 'reporte_encabezado'
+DATETIME_STYLE = 'reporte_fecha'
+
+_border = Border(*(Side(style='thin'),) * 4)
+
+
+def _named_styles() -> list[NamedStyle]:
+    return [
+        NamedStyle(
+            name=HEADER_STYLE,
+            font=Font(bold=True),
+            fill=PatternFill('solid', fgColor='6DBF6E'),
+            alignment=Alignment(horizontal='center', vertical='center'),
+            border=_border,
+        ),
+        NamedStyle(
+            name=DATETIME_STYLE,
+            alignment=Alignment(horizontal='center', vertical='center'),
+            border=_border,
+            number_format='DD/MM/YYYY HH:MM:SS',
+        ),
+    ]
+
+
+def export_failed_flow_runs_xlsx(failed_flow_runs: pd.DataFrame, path: str, sheet_title: str = 'Flujos fallidos') -> str:
+    """
+    Escribe los flujos fallidos en un archivo XLSX en modo streaming.
+
+    Parámetros:
+    - failed_flow_runs (pd.DataFrame): Resultado de `get_failed_flow_runs`. Las columnas ausentes se omiten.
+    - path (str): Ruta del archivo a crear.
+    - sheet_title (str, opcional): Nombre de la hoja.
+    Retorna:
+    - str: Ruta del archivo creado.
+    """
+    columns = [column for column in EXCEL_COLUMNS if column[0] in failed_flow_runs.columns]
+
+    workbook = Workbook(write_only=True)
+    for style in _named_styles():
+        workbook.add_named_style(style)
+
+    sheet = workbook.create_sheet(title=sheet_title)
+    sheet.freeze_panes = 'A2'
+    for index, (_, _, width) in enumerate(columns, start=1):
+        sheet.column_dimensions[get_column_letter(index)].width = width
+
+    sheet.append([_styled_cell(sheet, title, HEADER_STYLE) for _, title, _ in columns])
+
+    datetime_positions = [index for index, (name, _, _) in enumerate(columns) if name in DATETIME_COLUMNS]
+    for row in _rows(failed_flow_runs, [name for name, _, _ in columns]):
+        row = list(row)
+        for index in datetime_positions:
+            if row[index] is not None:
+                row[index] = _styled_cell(sheet, row[index], DATETIME_STYLE)
+        sheet.append(row)
+
+    workbook.save(path)
+
+    return path
+
+
+def _rows(failed_flow_runs: pd.DataFrame, columns: list[str]) -> Iterator[tuple]:
+    """Recorre las filas con valores que Excel admite, convirtiendo las columnas completas de una vez."""
+    frame = failed_flow_runs[columns].copy()
+
+    for column in columns:
+        if column in DATETIME_COLUMNS:
+            # Excel no admite zonas horarias: las fechas se exportan en UTC sin zona
+            frame[column] = pd.to_datetime(frame[column], utc=True).dt.tz_localize(None)
+        elif frame[column].dtype == object or isinstance(frame[column].dtype, pd.CategoricalDtype):
+            frame[column] = frame[column].map(lambda value: None if value is None else str(value), na_action='ignore')
+
+    frame = frame.astype(object).where(frame.notna(), None)
+
+    return frame.itertuples(index=False, name=None)
+
+
+def _styled_cell(sheet, value, style: str) -> WriteOnlyCell:
+    cell = WriteOnlyCell(sheet, value=value)
+    cell.style = style
+    return cell
+
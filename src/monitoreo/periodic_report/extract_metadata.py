@@ -3,6 +3,11 @@
 """
 
 import re
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Iterable
+
 import yaml
 
 from prefect import task
@@ -11,31 +16,87 @@ from consulterscommons.log_tools import PrefectLogger
 
 logger_global = PrefectLogger(__file__)
 
+# Busca el bloque de YAML tras tres guiones seguidos de un salto de línea
+METADATA_PATTERN = re.compile(r"---\n(.*)", re.DOTALL)
+
+# Loader en C de PyYAML si está disponible, mucho más rápido que el de Python puro
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# Cantidad de descripciones distintas cuyos metadatos se mantienen en memoria
+METADATA_CACHE_SIZE = 1024
+
+_parsed_metadata: "OrderedDict[str, dict]" = OrderedDict()
+_parsed_metadata_lock = threading.Lock()
+
+
+def parse_metadata(docstring: str) -> dict:
+    """
+    Extrae metadatos de un docstring en formato YAML.
+    Los resultados se guardan en una caché LRU indexada por un hash del docstring,
+    por lo que cada descripción distinta se parsea una sola vez.
+    Si los metadatos son un dict devuelve una copia, para que quien la use pueda modificarla sin alterar la caché.
+    Otros valores (por ejemplo `metadata: texto`) se devuelven tal como se parsearon.
+    """
+    if not isinstance(docstring, str):
+        return {}
+
+    key = hashlib.blake2b(docstring.encode('utf-8'), digest_size=16).hexdigest()
+
+    with _parsed_metadata_lock:
+        metadata = _parsed_metadata.get(key)
+        if metadata is not None:
+            _parsed_metadata.move_to_end(key)
+            return _copy_metadata(metadata)
+
+    metadata = _parse_docstring(docstring)
+
+    with _parsed_metadata_lock:
+        _parsed_metadata[key] = metadata
+        if len(_parsed_metadata) > METADATA_CACHE_SIZE:
+            _parsed_metadata.popitem(last=False)
+
+    return _copy_metadata(metadata)
+
+
+def _copy_metadata(metadata):
+    return dict(metadata) if isinstance(metadata, dict) else metadata
+
+
+def parse_metadata_batch(docstrings: Iterable[str]) -> dict[str, dict]:
+    """
+    Extrae los metadatos de muchos docstrings parseando cada docstring distinto una sola vez.
+
+    Retorna:
+    - dict[str, dict]: Metadatos de cada docstring distinto. Los valores que no son str se ignoran.
+    """
+    return {
+        docstring: parse_metadata(docstring)
+        for docstring in dict.fromkeys(docstrings)
+        if isinstance(docstring, str)
+    }
+
 
 @task
 def extract_metadata(docstring: str) -> dict:
     """
     Extrae metadatos de un docstring en formato YAML.
     """
-    logger = logger_global.obtener_logger_prefect()
+    return parse_metadata(docstring)
 
-    # Verificar si el docstring es None o no es un string
-    if not isinstance(docstring, str):
-        logger.debug("El docstring proporcionado es None o no es de tipo str.")
-        return {}
 
-    pattern = r"---\n(.*)"  # Busca el bloque de YAML tras tres guiones seguidos de un salto de línea
+def _parse_docstring(docstring: str) -> dict:
+    logger = logger_global.obtener_logger_prefect()
 
     # Intentar extraer el bloque YAML
-    yaml_block = re.search(pattern, docstring, re.DOTALL)
+    yaml_block = METADATA_PATTERN.search(docstring)
 
     if yaml_block:
         try:
             # Intentar parsear el bloque YAML encontrado
-            metadata = yaml.safe_load(yaml_block.group(1))
+            metadata = yaml.load(yaml_block.group(1), Loader=YAML_LOADER)
             if isinstance(metadata, dict) and 'metadata' in metadata:
                 logger.debug("Metadatos extraídos con éxito.")
-                return metadata.get('metadata', {})
+                return metadata.get('metadata', {}) or {}
             else:
                 logger.warning("El bloque YAML no contiene el campo 'metadata'.")
                 return {}
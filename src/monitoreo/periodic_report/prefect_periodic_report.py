@@ -9,6 +9,7 @@ Para que el script funcione correctamente, se debe configurar la URL de la API d
 
 El script consta de las siguientes funciones y tareas:
     - `get_failed_flow_runs(start_date: datetime, end_date: datetime) -> list[dict]`: Esta tarea obtiene los flujos fallidos en el rango de fechas especificado y realiza mapeos de información adicional.
+        Con `incremental=True` las ejecuciones se leen de un almacén local que solo sincroniza lo nuevo desde la API.
     - `send_report_failed_flows(failed_flow_runs, destinatarios, fecha_ejecucion, exec_type: str)`: Esta tarea envía un informe por correo electrónico con los flujos fallidos y otra información relevante.
     - `generar_reporte_prefect(destinatarios: str, tipo_ejecucion: str = "semanal", fecha_ejecucion: datetime = None)`: Esta función de flujo principal genera el informe periódico de flujos fallidos en Prefect.
 
@@ -26,26 +27,46 @@ import asyncio
 import pytz
 import pandas as pd
 
-from prefect import flow, task, unmapped
+from prefect import flow, task
 from prefect.variables import Variable
 from prefect.client.schemas.objects import StateType
 
 from consulterscommons.log_tools import PrefectLogger
 
 from dev.MONITOREO_PREFECT.periodic_report.tipo_ejecucion import TipoEjecucion
-from dev.MONITOREO_PREFECT.periodic_report.extract_metadata import extract_metadata
-from dev.MONITOREO_PREFECT.periodic_report.send_report_failed_flows import send_report_failed_flows
-from dev.MONITOREO_PREFECT.get_prefect_info import get_flow_runs_info, get_prefect_url, get_subflow_runs_info, get_flow_info, get_deployment_info
+from dev.MONITOREO_PREFECT.periodic_report.extract_metadata import parse_metadata_batch
+from dev.MONITOREO_PREFECT.periodic_report.export_excel import export_failed_flow_runs_xlsx
+from dev.MONITOREO_PREFECT.periodic_report.send_report_failed_flows import (
+    send_report_failed_flows,
+    DEFAULT_MAX_BODY_BYTES,
+)
+from dev.MONITOREO_PREFECT.get_prefect_info import (
+    iter_flow_runs,
+    get_prefect_url,
+    get_subflow_runs_by_parent,
+    get_flows_info,
+    get_deployments_info,
+)
+from dev.MONITOREO_PREFECT.client_session import client_session
+from dev.MONITOREO_PREFECT.metadata_cache import MetadataCache, sync_deployment_events
+from dev.MONITOREO_PREFECT.run_records import RunRecord, RECORD_DICT_FIELDS, build_runs_frame
+from dev.MONITOREO_PREFECT.run_store import RunStore, sync_run_store, TERMINAL_STATES
 
 logger_global = PrefectLogger(__file__)
 
 
+def none_if_missing(values: pd.Series) -> pd.Series:
+    """Reemplaza los NaN que deja un join sin coincidencia por None, como espera el resto del reporte."""
+    return values.astype(object).where(values.notna(), None)
+
+
 # Convertir a funcion generica para diferentes estados
 @task
 def get_failed_flow_runs(
         start_date: datetime,
         end_date: datetime,
-        states_to_check: Union[Sequence[str], Sequence[StateType]]
+        states_to_check: Union[Sequence[str], Sequence[StateType]],
+        incremental: bool = False
     ) -> pd.DataFrame:
     logger = logger_global.obtener_logger_prefect()
 
@@ -54,73 +75,110 @@ def get_failed_flow_runs(
 
     logger.info("Obteniendo flujos fallidos desde %s hasta %s.", start_date, end_date)
 
-    failed_flow_runs = asyncio.run(get_flow_runs_info(start_date, end_date, states_to_check))
-
-    logger.info("Se obtuvieron %s flujos fallidos.", len(failed_flow_runs))
-    logger.debug(failed_flow_runs)
+    # Caché local de nombres de flujos y despliegues compartida entre ejecuciones del reporte
+    metadata_cache = MetadataCache()
+
+    # El almacén local solo guarda estados terminales, el resto se consulta siempre a la API
+    state_names = {getattr(state, 'value', state) for state in states_to_check}
+    use_run_store = incremental and state_names <= set(TERMINAL_STATES)
+    if incremental and not use_run_store:
+        logger.warning("El modo incremental solo admite los estados %s. Se consultará la API.", TERMINAL_STATES)
+
+    async def fetch_failed_flow_runs() -> tuple[list[RunRecord], dict, dict, dict]:
+        # Una sola sesión con pool de conexiones para todas las consultas
+        async with client_session() as client:
+            if use_run_store:
+                run_store = RunStore()
+                synced = await sync_run_store(run_store, start_date, client=client)
+                logger.info("Almacén local sincronizado con %s ejecuciones nuevas o actualizadas.", synced)
+                records = [RunRecord.from_dict(flow_run) for flow_run in run_store.query(start_date, end_date, states_to_check)]
+            else:
+                # Se lee página por página y de cada ejecución solo se conserva el registro compacto:
+                # en memoria queda una página de la API más los registros del reporte, sin importar el rango
+                records = [
+                    RunRecord.from_dict(flow_run)
+                    async for flow_run in iter_flow_runs(
+                        start_date, end_date, states_to_check, client=client, fields=RECORD_DICT_FIELDS)
+                ]
+            if not records:
+                return records, {}, {}, {}
+
+            # Obtengo información adicional de los flujos y despliegues sin duplicados
+            flow_run_ids = [record.id for record in records]
+            flow_ids = list({record.flow_id for record in records})
+            deployment_ids = list({record.deployment_id for record in records if record.deployment_id})
+
+            # Descarta de la caché los despliegues modificados desde el último reporte
+            updated_deployments = await sync_deployment_events(metadata_cache, client)
+            logger.debug("Despliegues modificados desde la última sincronización: %s", updated_deployments)
+
+            # Subflujos, flujos y despliegues se resuelven en paralelo con consultas por lotes de IDs
+            subflows_by_parent, flows_info, deployments_info = await asyncio.gather(
+                get_subflow_runs_by_parent(flow_run_ids, states_to_check, client=client),
+                get_flows_info(flow_ids, client=client, cache=metadata_cache),
+                get_deployments_info(deployment_ids, client=client, cache=metadata_cache),
+            )
+            return records, subflows_by_parent, flows_info, deployments_info
 
-    if not failed_flow_runs:
-        return pd.DataFrame()
+    failed_records, subflows_by_parent, flows_info, deployments_info = asyncio.run(fetch_failed_flow_runs())
 
-    logger.debug("Obteniendo información adicional de los flujos fallidos.")
+    logger.info("Se obtuvieron %s flujos fallidos.", len(failed_records))
+    logger.debug("Caché de metadatos: %s", metadata_cache.stats())
 
-    # Obtengo información adicional de los flujos y despliegues
-    flow_run_ids = [flow_run['id'] for flow_run in failed_flow_runs]
-    flow_ids = [flow_run['flow_id'] for flow_run in failed_flow_runs]
-    deployment_ids = [flow_run['deployment_id'] for flow_run in failed_flow_runs if flow_run['deployment_id']]
+    if not failed_records:
+        return pd.DataFrame()
 
-    # Quito duplicados
-    flow_ids = list(set(flow_ids))
-    deployment_ids = list(set(deployment_ids))
+    logger.debug("Agregando información adicional de los flujos fallidos.")
 
-    failed_flow_runs_df = pd.DataFrame(failed_flow_runs)
+    # DataFrame columnar compacto: estado como categoría, fechas como int64 y sin parámetros, que el reporte no usa
+    failed_flow_runs_df = build_runs_frame(failed_records)
+    del failed_records
 
     # ------------------------------------------------
-    # Obtengo información de los subflujos
-    subflow_info_future = get_subflow_runs_info.map(flow_run_ids, unmapped(states_to_check))
-    subflow_info_lists = subflow_info_future.result()
-
-    # Aplano la lista de listas de subflujos
+    # Información de los subflujos, obtenida por lotes junto con los flujos fallidos
+    # Aplano el diccionario de listas de subflujos
     subflow_info_list = [
         subflow
-        for subflows in subflow_info_lists
+        for subflows in subflows_by_parent.values()
         for subflow in subflows
     ]
 
     logger.debug(subflow_info_list)
 
-    # Se lee asi:
-    # Por cada id de flujo fallido realizo una función
-    # En la función busco en la lista de subflujos el id que coincida con el id del flujo fallido
-    # De esa manera agrego a la fila del flujo fallido el parent_flow_run_id.
-    # next() devuelve el primer valor que cumple la condición, si no encuentra nada devuelve None
-    # Basicamente acá se esta haciendo un left join entre failed_flow_runs_df y subflow_info_list
-    failed_flow_runs_df['parent_flow_run_id'] = failed_flow_runs_df['id'].map(
-        lambda flow_id: next((subflow['parent_flow_run_id'] for subflow in subflow_info_list if subflow['id'] == flow_id), None)
-    )
+    # Left join por hash entre failed_flow_runs_df y subflow_info_list:
+    # se indexan los subflujos por su id y cada fila se resuelve en O(1) con Series.map.
+    # Las filas que no son subflujos quedan con parent_flow_run_id en None.
+    parent_by_subflow_id = {subflow['id']: subflow['parent_flow_run_id'] for subflow in subflow_info_list}
+    failed_flow_runs_df['parent_flow_run_id'] = none_if_missing(failed_flow_runs_df['id'].map(parent_by_subflow_id))
 
     logger.info("Se obtuvo información de subflujos.")
 
     # ------------------------------------------------
-    # Obtengo información de los flujos
-    flows_info_future = get_flow_info.map(flow_ids)
-    flow_info_list = flows_info_future.result()
+    # Información de los flujos
+    flow_names = {flow_id: info['name'] for flow_id, info in flows_info.items()}
 
-    flow_info_dict = {info['id']: info for info in flow_info_list}
-
-    failed_flow_runs_df['flow_name'] = failed_flow_runs_df['flow_id'].map(lambda id: flow_info_dict[id]['name'])
+    failed_flow_runs_df['flow_name'] = failed_flow_runs_df['flow_id'].map(flow_names)
 
     # ------------------------------------------------
-    # Obtengo información de los despliegues
-    deploys_info_future = get_deployment_info.map(deployment_ids)
-    deploys_info_list = deploys_info_future.result()
-
-    deployment_info_dict = {info['id']: info for info in deploys_info_list}
+    # Información de los despliegues
+    deploys_info_list = list(deployments_info.values())
+
+    # Left join vectorizado por deployment_id con las columnas del despliegue
+    deployment_columns = {
+        'id': 'deployment_id',
+        'name': 'deployment_name',
+        'entrypoint': 'deployment_entrypoint',
+        'description': 'deployment_description',
+    }
+    deployments_df = (
+        pd.DataFrame(deploys_info_list, columns=list(deployment_columns))
+        .rename(columns=deployment_columns)
+        .drop_duplicates(subset='deployment_id')
+    )
+    failed_flow_runs_df = failed_flow_runs_df.merge(deployments_df, on='deployment_id', how='left')
 
-    deployment_info = failed_flow_runs_df['deployment_id'].map(deployment_info_dict.get)
-    failed_flow_runs_df['deployment_name'] = deployment_info.map(lambda x: x['name'] if x else None)
-    failed_flow_runs_df['deployment_entrypoint'] = deployment_info.map(lambda x: x['entrypoint'] if x else None)
-    failed_flow_runs_df['deployment_description'] = deployment_info.map(lambda x: x['description'] if x else None)
+    for column in ['deployment_name', 'deployment_entrypoint', 'deployment_description']:
+        failed_flow_runs_df[column] = none_if_missing(failed_flow_runs_df[column])
 
     logger.info("Se obtuvo información de despliegues.")
 
@@ -138,8 +196,9 @@ def get_failed_flow_runs(
     # ------------------------------------------------
     # Extrae y parsea metadatos YAML de cada descripción
 
-    # Aplica la función de parsing a cada descripción y almacena los metadatos en una columna
-    failed_flow_runs_df['deployment_metadata'] = failed_flow_runs_df['deployment_description'].apply(lambda x: extract_metadata(x) if x and x != 'None' else {})
+    # Cada descripción distinta se parsea una sola vez y luego se asigna a todas sus filas
+    descriptions = failed_flow_runs_df['deployment_description']
+    metadata_by_description = parse_metadata_batch(descriptions.dropna().unique())
 
     logger.info("Se obtuvo información de metadatos desde YAML en la descripción.")
 
@@ -152,13 +211,20 @@ def get_failed_flow_runs(
             return metadata
 
         # Get responsable ID and replace with full info if exists
-        if (responsable_id := metadata.get('responsable')):
-            if (responsable_info := dict_devs.get(responsable_id)):
-                metadata['responsable'] = responsable_info
+        responsable_id = metadata.get('responsable')
+        if isinstance(responsable_id, str) and (responsable_info := dict_devs.get(responsable_id)):
+            return {**metadata, 'responsable': responsable_info}
 
         return metadata
 
-    failed_flow_runs_df['deployment_metadata'] = failed_flow_runs_df['deployment_metadata'].apply(lambda x: update_responsable_metadata(x) if x else {})
+    metadata_by_description = {
+        description: update_responsable_metadata(metadata)
+        for description, metadata in metadata_by_description.items()
+    }
+
+    failed_flow_runs_df['deployment_metadata'] = descriptions.map(
+        lambda description: metadata_by_description.get(description) or {}
+    )
 
     logger.debug("Metadatos actualizados con información de responsables.")
 
@@ -201,7 +267,12 @@ def prefect_periodic_report(
         fecha_ejecucion: Optional[datetime] = None,
         fecha_final: Optional[datetime] = None,
         timezone_str: str = "America/Argentina/Buenos_Aires",
-        states_to_check: Sequence[StateType] = ("FAILED", "CRASHED")
+        states_to_check: Sequence[StateType] = ("FAILED", "CRASHED"),
+        incremental: bool = False,
+        max_body_bytes: int = DEFAULT_MAX_BODY_BYTES,
+        oversize_mode: str = 'split',
+        attachment_format: str = 'csv',
+        excel_path: Optional[str] = None
     ) -> None:
     """Genera un reporte periódico de flujos fallidos en Prefect.
 
@@ -219,6 +290,16 @@ def prefect_periodic_report(
             Defaults to "America/Argentina/Buenos_Aires".
         states_to_check (Sequence[StateType], optional): Estados de flujo a considerar.
             Defaults to ("FAILED", "CRASHED").
+        incremental (bool, optional): Si las ejecuciones se leen de un almacén local que solo sincroniza
+            desde la API lo nuevo desde el último reporte. Solo admite estados terminales.
+            Defaults to False.
+        max_body_bytes (int, optional): Tamaño máximo en bytes del cuerpo HTML de cada mail.
+            Defaults to DEFAULT_MAX_BODY_BYTES.
+        oversize_mode (str, optional): Si el reporte supera ese tamaño, "split" envía el detalle restante en mails
+            adicionales y "attachment" lo adjunta en un archivo. Defaults to "split".
+        attachment_format (str, optional): Formato del adjunto, "csv" (comprimido) o "xlsx". Defaults to "csv".
+        excel_path (str, optional): Si se indica, se exportan los flujos fallidos a un XLSX en esa ruta.
+            Defaults to None.
 
     Raises:
         ValueError: Si el tipo de ejecución no es reconocido o las fechas son inválidas.
@@ -271,7 +352,7 @@ def prefect_periodic_report(
     # Obtener los flujos fallidos en el rango de fechas especificado
     try:
         logger.info("Se obtendra el reporte de flujos fallidos desde %s hasta %s.", fecha_inicial, fecha_final)
-        failed_flow_runs = get_failed_flow_runs(fecha_inicial, fecha_final, states_to_check)
+        failed_flow_runs = get_failed_flow_runs(fecha_inicial, fecha_final, states_to_check, incremental=incremental)
         # failed_flow_runs = pd.DataFrame()
     except Exception as e:
         logger.error("Error en obtencion de datos: %s", e)
@@ -299,10 +380,16 @@ def prefect_periodic_report(
         logger.error("Error en loggeo de datos: %s", e)
         raise e
 
+    # Exportación opcional a Excel
+    if excel_path:
+        export_failed_flow_runs_xlsx(failed_flow_runs, excel_path)
+        logger.info("Se exportaron los flujos fallidos a %s.", excel_path)
+
     # Envío de email con el reporte de flujos fallidos
     try:
         email_status = send_report_failed_flows(
-            failed_flow_runs, destinatarios, fecha_inicial, fecha_final=fecha_final, exec_type=tipo_ejecucion)
+            failed_flow_runs, destinatarios, fecha_inicial, fecha_final=fecha_final, exec_type=tipo_ejecucion,
+            max_body_bytes=max_body_bytes, oversize_mode=oversize_mode, attachment_format=attachment_format)
         logger.info(email_status)
         logger.info("Para mas informacion visita el mail enviado a %s.", destinatarios)
     except Exception as e:
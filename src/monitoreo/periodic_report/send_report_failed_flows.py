@@ -2,53 +2,315 @@
 
 import os
 import datetime
+import functools
+import inspect
+import shutil
+import tempfile
+from collections import Counter
+from html import escape
 import pytz
-from typing import Union
+from typing import Optional, Union
 
+import numpy as np
 import pandas as pd
-from bs4 import BeautifulSoup
-from jinja2 import Template
-from prefect import task, flow
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
+from jinja2.environment import TemplateStream
+from prefect import task, flow, get_run_logger
+from prefect.settings import PREFECT_HOME
 
 # from consulterscommons.log_tools import PrefectLogger
 
 from dev.MONITOREO_PREFECT.get_prefect_info import get_prefect_url
 from dev.MONITOREO_PREFECT.periodic_report.tipo_ejecucion import TipoEjecucion
+from dev.MONITOREO_PREFECT.periodic_report.export_excel import export_failed_flow_runs_xlsx
 from consulterscommons.emails_tools import send_email
 
 GITHUB_REPO_URL = "https://github.com/lucasdepetrisd/prefect-test/blob/main/"
 
-@task
-def generate_summary_table(failed_flow_runs: pd.DataFrame) -> str:
+EMAIL_TEMPLATE_NAME = 'email_template.html'
+ITEM_TEMPLATE_NAME = 'flow_run_item.html'
+
+# Tamaño máximo del cuerpo HTML de cada mail. Muchos servidores SMTP rechazan o truncan cuerpos de varios MB
+DEFAULT_MAX_BODY_BYTES = 1_000_000
+# Cantidad de flujos con más fallas cuyo detalle se incluye en el mail principal cuando el reporte es muy grande
+DEFAULT_TOP_N_FLOWS = 20
+# Qué hacer con el detalle que no entra en el mail principal: mails adicionales o adjunto comprimido
+OVERSIZE_MODES = ('split', 'attachment')
+ATTACHMENT_FORMATS = ('csv', 'xlsx')
+
+# Columnas del detalle completo que se adjunta
+ATTACHMENT_COLUMNS = [
+    'id', 'flow_name', 'flow_run_name', 'deployment_name', 'deployment_entrypoint',
+    'state_type', 'state_message', 'start_time', 'end_time', 'parent_flow_run_id', 'ui_url',
+]
+
+# Cantidad de pasos del template que se agrupan en cada parte al renderizar por partes
+STREAM_BUFFER_SIZE = 64
+
+
+def send_email_accepts_attachments() -> bool:
+    """
+    Indica si la versión instalada de `send_email` recibe el parámetro `attachments`, por nombre o mediante
+    `**kwargs`. Las versiones anteriores de consulterscommons no lo tienen y fallarían con TypeError recién
+    al enviar el mail.
+    """
+    try:
+        parameters = inspect.signature(send_email).parameters
+    except (TypeError, ValueError):
+        return False
+    return 'attachments' in parameters or any(
+        parameter.kind == inspect.Parameter.VAR_KEYWORD for parameter in parameters.values()
+    )
+
+
+@functools.lru_cache(maxsize=None)
+def get_template_environment() -> Environment:
+    """
+    Devuelve el entorno de Jinja compartido: el template se compila una vez por proceso y el bytecode queda en disco
+    para que los procesos siguientes no vuelvan a compilarlo. El directorio de la caché se crea la primera vez
+    que se usa el entorno; si no se puede escribir (por ejemplo PREFECT_HOME de solo lectura) se compila sin caché.
+    """
+    cache_dir = os.path.join(PREFECT_HOME.value(), 'monitoreo', 'jinja_cache')
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    except OSError:
+        bytecode_cache = None
+
+    return Environment(
+        loader=FileSystemLoader(os.path.dirname(__file__)),
+        bytecode_cache=bytecode_cache,
+        auto_reload=False,
+    )
+
+
+def get_email_template() -> Template:
+    """Devuelve el template de email. El entorno lo compila la primera vez y luego lo reutiliza."""
+    return get_template_environment().get_template(EMAIL_TEMPLATE_NAME)
+
+
+def render_email(**context) -> str:
+    """Renderiza el email completo como un string."""
+    return get_email_template().render(**context)
+
+
+def stream_email(buffer_size: int = STREAM_BUFFER_SIZE, **context) -> TemplateStream:
+    """
+    Renderiza el email por partes sin armar el documento completo en memoria.
+    Cada parte agrupa la salida de `buffer_size` pasos del template. Se puede iterar o volcar a un archivo con `dump`.
+    """
+    stream = get_email_template().stream(**context)
+    stream.enable_buffering(buffer_size)
+    return stream
 
-    failed_flow_runs = failed_flow_runs.copy()
 
-    # Renombrar columnas
-    failed_flow_runs = failed_flow_runs.rename(columns={'date': 'Fecha', 'flow_name': 'Nombre del flujo'})
+def render_email_within(max_bytes: int, **context) -> Optional[str]:
+    """
+    Renderiza el email por partes y lo devuelve solo si no supera `max_bytes`.
+    Si lo supera corta el renderizado en ese punto y devuelve None, sin armar el documento completo.
+    """
+    parts = []
+    size = 0
+    for part in stream_email(**context):
+        size += body_size(part)
+        if size > max_bytes:
+            return None
+        parts.append(part)
+    return ''.join(parts)
 
-    # Eliminamos la información de la zona horaria y convertimos a solo fechas
-    failed_flow_runs['start_time'] = pd.to_datetime(failed_flow_runs['start_time'], utc=True).dt.tz_localize(None)
 
-    # Ordenar por fecha
-    failed_flow_runs = failed_flow_runs.sort_values(by='start_time')
+def to_template_records(failed_flow_runs: pd.DataFrame) -> list[dict]:
+    """
+    Convierte el DataFrame de flujos fallidos en diccionarios planos, con None en lugar de NaN y NaT.
+    Los subflujos de `subflow_runs` vienen de otro `to_dict` y también se limpian.
+    """
+    values = failed_flow_runs.astype(object)
+    records = values.where(failed_flow_runs.notna(), None).to_dict('records')
+
+    for record in records:
+        if record.get('subflow_runs'):
+            record['subflow_runs'] = [
+                {key: None if is_missing(value) else value for key, value in subflow_run.items()}
+                for subflow_run in record['subflow_runs']
+            ]
+
+    return records
+
+
+def is_missing(value) -> bool:
+    """Indica si un valor escalar es NaN, NaT o None. Las listas y otros contenedores nunca son faltantes."""
+    return pd.api.types.is_scalar(value) and pd.isna(value)
+
+
+def body_size(body: str) -> int:
+    """Tamaño en bytes del cuerpo del mail codificado en UTF-8."""
+    return len(body.encode('utf-8'))
+
+
+def split_records_by_size(records: list[dict], max_bytes: int, context: dict) -> list[list[dict]]:
+    """
+    Agrupa los registros en partes cuyo mail renderizado con `context` no supera `max_bytes`.
+    Un registro que no entra solo queda en una parte propia.
+    """
+    if not records:
+        return []
+
+    item_template = get_template_environment().get_template(ITEM_TEMPLATE_NAME)
+    base_bytes = body_size(render_email(**context, failed_flow_runs=[]))
+
+    # Bytes que agrega el template alrededor de cada registro (indentación y saltos de línea del bucle)
+    item_overhead = (
+        body_size(render_email(**context, failed_flow_runs=records[:1]))
+        - base_bytes
+        - body_size(item_template.render(flow_run=records[0]))
+    )
+
+    parts = []
+    current = []
+    current_bytes = base_bytes
+    for record in records:
+        record_bytes = body_size(item_template.render(flow_run=record)) + item_overhead
+        if current and current_bytes + record_bytes > max_bytes:
+            parts.append(current)
+            current = []
+            current_bytes = base_bytes
+        current.append(record)
+        current_bytes += record_bytes
+
+    if current:
+        parts.append(current)
+
+    return parts
+
+
+def select_top_flows(records: list[dict], top_n_flows: int) -> tuple[list[dict], list[dict]]:
+    """Separa los registros de los `top_n_flows` flujos con más fallas del resto, conservando el orden."""
+    failures_by_flow = Counter(record['flow_name'] for record in records)
+    top_flows = {flow_name for flow_name, _ in failures_by_flow.most_common(top_n_flows)}
+
+    top_records = [record for record in records if record['flow_name'] in top_flows]
+    other_records = [record for record in records if record['flow_name'] not in top_flows]
+
+    return top_records, other_records
+
+
+def write_details_attachment(failed_flow_runs: pd.DataFrame, directory: str, attachment_format: str = 'csv') -> str:
+    """
+    Escribe el detalle completo de los flujos fallidos para adjuntarlo y devuelve su ruta.
+    En formato 'csv' se comprime con gzip; el formato 'xlsx' ya es un archivo comprimido.
+    """
+    if attachment_format == 'xlsx':
+        return export_failed_flow_runs_xlsx(failed_flow_runs, os.path.join(directory, 'flujos_fallidos.xlsx'))
+
+    path = os.path.join(directory, 'flujos_fallidos.csv.gz')
+    columns = [column for column in ATTACHMENT_COLUMNS if column in failed_flow_runs.columns]
+    failed_flow_runs[columns].to_csv(path, index=False, compression='gzip')
+    return path
+
+
+def build_oversize_messages(
+        records: list[dict],
+        context: dict,
+        subject: str,
+        max_body_bytes: int,
+        top_n_flows: int,
+        include_rest: bool,
+        attachment_format: str = 'csv'
+    ) -> list[tuple[str, str]]:
+    """
+    Arma los mails de un reporte que no entra en un solo cuerpo HTML.
+
+    El mail principal lleva la tabla de resumen y el detalle de los flujos con más fallas hasta el límite de bytes.
+    Si `include_rest` es True el resto del detalle se reparte en mails adicionales que respetan el mismo límite.
+
+    Retorna:
+    - list[tuple[str, str]]: Lista de (asunto, cuerpo), empezando por el mail principal.
+    """
+    top_records, other_records = select_top_flows(records, top_n_flows)
+
+    # El mensaje de detalle definitivo se conoce después de repartir, se mide con uno de igual o mayor largo
+    main_context = {
+        **context,
+        'details_message': (
+            f"Se muestran {len(records)} de {len(records)} ejecuciones, de los flujos con más fallas. "
+            f"El resto del detalle se envía en {len(records)} mails adicionales."
+        )
+    }
+    main_parts = split_records_by_size(top_records, max_body_bytes, main_context)
+    main_records = main_parts[0] if main_parts else []
+    overflow_records = [record for part in main_parts[1:] for record in part] + other_records
+
+    if include_rest:
+        continuation_context = {
+            **context,
+            'style_str': '',
+            'table_str': '',
+            'header_message': f"{context['header_message']} (continuación)",
+            'details_message': None,
+        }
+        continuation_parts = split_records_by_size(overflow_records, max_body_bytes, continuation_context)
+        total_parts = 1 + len(continuation_parts)
+        details_message = (
+            f"Se muestran {len(main_records)} de {len(records)} ejecuciones, de los flujos con más fallas. "
+            f"El resto del detalle se envía en {total_parts - 1} mails adicionales."
+        )
+    else:
+        continuation_parts = []
+        total_parts = 1
+        details_message = (
+            f"Se muestran {len(main_records)} de {len(records)} ejecuciones, de los flujos con más fallas. "
+            f"El detalle completo se adjunta en un archivo {attachment_format.upper()}."
+        )
+
+    messages = [(
+        subject if total_parts == 1 else f"{subject} (parte 1/{total_parts})",
+        render_email(**{**main_context, 'details_message': details_message}, failed_flow_runs=main_records)
+    )]
+    for part_number, part_records in enumerate(continuation_parts, start=2):
+        messages.append((
+            f"{subject} (parte {part_number}/{total_parts})",
+            render_email(**continuation_context, failed_flow_runs=part_records)
+        ))
+
+    return messages
+
+
+# Umbrales de cantidad de fallas y color de fondo de cada celda, de mayor a menor
+ERROR_COLORS = [
+    (3, '#ff9999'),  # Light red
+    (2, '#ffcccc'),  # Light red (pink)
+    (1, '#ffcc99'),  # Light orange
+    (0, '#ffffcc'),  # Light yellow
+]
+NO_ERRORS_COLOR = '#ffffff'  # White
+
+
+@task
+def generate_summary_table(failed_flow_runs: pd.DataFrame) -> tuple[str, str]:
+    """
+    Genera la tabla de resumen de fallas por flujo y fecha.
+    Devuelve por separado el bloque <style> para el header del mail y el HTML de la tabla.
+    """
+
+    # Eliminamos la información de la zona horaria y normalizamos a días
+    start_time = pd.to_datetime(failed_flow_runs['start_time'], utc=True).dt.tz_localize(None)
+    fecha = start_time.dt.normalize().rename('Fecha')
+    nombre_flujo = failed_flow_runs['flow_name'].rename('Nombre del flujo')
+
+    # Contamos las fallas por flujo y fecha. Las columnas quedan ordenadas por los valores de fecha
+    summary_table = failed_flow_runs.groupby([nombre_flujo, fecha]).size().unstack(fill_value=0)
 
     # Verificar si todas las fechas están en el mismo año
-    if failed_flow_runs['start_time'].dt.year.nunique() == 1:
+    if summary_table.columns.year.nunique() == 1:
         # Show only month and day
         date_format = '%d-%m'
     else:
         # Show year, month, and day
         date_format = '%d-%m-%Y'
 
-    # Convertir las fechas a strings y ordenarlas
-    failed_flow_runs['Fecha'] = failed_flow_runs['start_time'].apply(lambda x: x.strftime(date_format))
-
-    # Contamos las fallas por flujo y fecha
-    summary_table = failed_flow_runs.groupby(['Nombre del flujo', 'Fecha']).size().unstack(fill_value=0)
-
-    # Ordenar las columnas por fecha
-    sorted_columns = sorted(summary_table.columns, key=lambda x: pd.to_datetime(x, format='%d-%m-%Y' if x.count('-') == 2 else '%d-%m'))
-    summary_table = summary_table[sorted_columns]
+    # Convertir las fechas de las columnas a strings una sola vez
+    summary_table.columns = summary_table.columns.strftime(date_format)
+    date_columns = summary_table.columns.to_list()
 
     # Agregamos una columna 'Total' para contar las fallas por flujo
     summary_table['Total'] = summary_table.sum(axis=1)
@@ -56,49 +318,68 @@ def generate_summary_table(failed_flow_runs: pd.DataFrame) -> str:
     # Agregamos una fila 'Total' para contar las fallas por fecha
     summary_table.loc['Total'] = summary_table.sum(axis=0)
 
-    # Función para aplicar el formato condicional
-    def highlight_errors(val):
-        if val > 3:
-            color = '#ff9999' # Light red
-        elif val > 2:
-            color = '#ffcccc'  # Light red (pink)
-        elif val > 1:
-            color = '#ffcc99'  # Light orange
-        elif val > 0:
-            color = '#ffffcc'  # Light yellow
-        else:
-            color = '#ffffff'  # White
-        return f'background-color: {color}'
-
-    padding = f"{'2px' if len(summary_table.columns.to_list()) > 6 else '3px'}"
-    ancho_fechas = '50px' if len(summary_table.columns.to_list()) > 6 else '80px'
-
-    # Aplicar formato condicional y estilos a la tabla
-    styled_table = (
-        summary_table
-        .style
-        .map(highlight_errors)
-        .set_table_styles([
-            {'selector': 'th', 'props': [('background-color', '#6dbf6e'), ('color', '#000001'), ('padding', padding), ('border', '1px solid black')]},
-            {'selector': 'td', 'props': [('padding', padding), ('border', '1px solid black')]},
-            {
-                'selector': 'table', 
-                'props': [
-                    ('width', '100%'), ('margin-left', 'auto'), ('margin-right', 'auto'),
-                    ('border-collapse', 'collapse'), ('border-spacing', '2px'), ('border', '1px solid black')
-                    ]
-            }  # Centering the table and collapsing borders
-        ])
-        .set_properties(**{'text-align': 'center'})
-        .set_properties(subset=['Total'], **{'width': '45px'})  # Increase width of Total column
-        .set_properties(subset=[col for col in summary_table.columns.to_list() if isinstance(col, datetime.date)], **{'width': ancho_fechas})  # Set width of date columns
+    # Formato condicional calculado para toda la matriz a la vez
+    values = summary_table.to_numpy()
+    colors = np.select(
+        [values > threshold for threshold, _ in ERROR_COLORS],
+        [color for _, color in ERROR_COLORS],
+        default=NO_ERRORS_COLOR
+    )
+
+    padding = f"{'2px' if len(summary_table.columns) > 6 else '3px'}"
+    ancho_fechas = '50px' if len(summary_table.columns) > 6 else '80px'
+
+    return render_summary_table(summary_table, colors, date_columns, padding, ancho_fechas)
+
+
+def render_summary_table(
+        summary_table: pd.DataFrame,
+        colors: np.ndarray,
+        date_columns: list[str],
+        padding: str,
+        ancho_fechas: str
+    ) -> tuple[str, str]:
+    """
+    Genera el HTML de la tabla de resumen con el color de fondo de cada celda en línea.
+    Se arma sin saltos de línea para la compatibilidad con correos electrónicos.
+
+    Retorna:
+    - tuple[str, str]: Bloque <style> y tabla <table>.
+    """
+    style = (
+        '<style type="text/css">'
+        '.summary-table {width: 100%; margin-left: auto; margin-right: auto; '
+        'border-collapse: collapse; border-spacing: 2px; border: 1px solid black;}'
+        f'.summary-table th {{background-color: #6dbf6e; color: #000001; padding: {padding}; border: 1px solid black;}}'
+        f'.summary-table td {{padding: {padding}; border: 1px solid black; text-align: center;}}'
+        f'.summary-table .fecha {{width: {ancho_fechas};}}'
+        '.summary-table .total {width: 45px;}'
+        '</style>'
+    )
+
+    column_classes = ['fecha' if column in date_columns else 'total' for column in summary_table.columns]
+    header = ''.join(
+        f'<th class="{column_class}">{escape(str(column))}</th>'
+        for column, column_class in zip(summary_table.columns, column_classes)
     )
 
-    # Convertir a HTML y reemplazar saltos de línea para la compatibilidad con correos electrónicos
-    html_table = styled_table.to_html()
-    html_table = html_table.replace('\n', '')
+    rows = []
+    for name, row_values, row_colors in zip(summary_table.index, summary_table.to_numpy(), colors):
+        cells = ''.join(
+            f'<td class="{column_class}" style="background-color: {color}">{value}</td>'
+            for value, color, column_class in zip(row_values, row_colors, column_classes)
+        )
+        rows.append(f'<tr><th>{escape(str(name))}</th>{cells}</tr>')
+
+    table = (
+        '<table class="summary-table">'
+        f'<thead><tr><th>Fecha</th>{header}</tr>'
+        f'<tr><th>Nombre del flujo</th>{"<th></th>" * len(column_classes)}</tr></thead>'
+        f'<tbody>{"".join(rows)}</tbody>'
+        '</table>'
+    )
 
-    return html_table
+    return style, table
 
 
 @task
@@ -108,7 +389,7 @@ def add_subflows_to_parent_flows(failed_flow_runs: pd.DataFrame) -> pd.DataFrame
 
     # Create a dictionary mapping parent IDs to their subflows
     subflows_dict = subflows.groupby('parent_flow_run_id').apply(
-        lambda df: df[['id', 'flow_id', 'flow_name', 'state', 'start_time', 'end_time', 'ui_url']].to_dict('records'),
+        lambda df: df[['id', 'flow_id', 'flow_name', 'state_message', 'start_time', 'end_time', 'ui_url']].to_dict('records'),
         include_groups=False
     ).to_dict()
 
@@ -127,8 +408,27 @@ def send_report_failed_flows(
         destinatarios: Union[str, list[str]],
         fecha_inicial: datetime.datetime,
         fecha_final: datetime.datetime,
-        exec_type: TipoEjecucion
+        exec_type: TipoEjecucion,
+        max_body_bytes: int = DEFAULT_MAX_BODY_BYTES,
+        top_n_flows: int = DEFAULT_TOP_N_FLOWS,
+        oversize_mode: str = 'split',
+        attachment_format: str = 'csv'
     ) -> str:
+    """
+    Envía el reporte de flujos fallidos por mail.
+
+    Si el cuerpo HTML supera `max_body_bytes`, el mail principal lleva la tabla de resumen y el detalle de los
+    `top_n_flows` flujos con más fallas. El resto del detalle se envía según `oversize_mode`:
+    - 'split': en mails adicionales que respetan el mismo límite de bytes.
+    - 'attachment': en un archivo adjunto al mail principal, CSV comprimido o XLSX según `attachment_format`.
+      Si `send_email` no admite adjuntos se usa 'split'.
+
+    Si falla el envío de una parte, el mensaje de error indica cuántas partes se enviaron.
+    """
+    if oversize_mode not in OVERSIZE_MODES:
+        raise ValueError(f"Modo '{oversize_mode}' no reconocido. Valores posibles: {OVERSIZE_MODES}.")
+    if attachment_format not in ATTACHMENT_FORMATS:
+        raise ValueError(f"Formato '{attachment_format}' no reconocido. Valores posibles: {ATTACHMENT_FORMATS}.")
 
     exec_messages = {
             TipoEjecucion.DIARIA: 'el último día',
@@ -165,44 +465,68 @@ def send_report_failed_flows(
         flow_runs_ui_url = f"{ui_url}flow-runs?type=range&hide-subflows=true&endDate={end_date_str}&startDate={start_date_str}&state=Failed"
 
         # Generar la tabla de resumen y agregar los subflujos a los flujos padres
-        summary_table_html = generate_summary_table(failed_flow_runs_df.copy())
+        # El CSS de la tabla de resumen va en el header del mail y la tabla en el cuerpo
+        style_str, table_str = generate_summary_table(failed_flow_runs_df)
         formatted_failed_flow_runs = add_subflows_to_parent_flows(failed_flow_runs_df.copy())
 
-        # Extraer el HTML y el CSS de la tabla de resumen para ponerlo en el header del mail
-        soup = BeautifulSoup(summary_table_html, 'html.parser')
-        style_tag = soup.find('style')
-        style_str = str(style_tag) if style_tag else ''
-        table_tag = soup.find('table')
-        table_str = str(table_tag) if table_tag else ''
-
-        # Leer el template de email
-        template_path = os.path.join(os.path.dirname(__file__), 'email_template.html')
-        with open(template_path, 'r', encoding='utf-8') as file:
-            template_content = file.read()
-
-        # Renderizar el email
-        email_template = Template(template_content)
-        msg = email_template.render(
-            style_str=style_str,
-            header_message=header_message,
-            table_str=table_str,
-            failed_flow_runs=formatted_failed_flow_runs,
-            flow_runs_ui_url=flow_runs_ui_url,
-        )
+        # Renderizar el email con el template precompilado y registros planos.
+        # Se renderiza por partes y se corta al superar el límite, así un reporte enorme no se arma entero
+        context = {
+            'style_str': style_str,
+            'header_message': header_message,
+            'table_str': table_str,
+            'flow_runs_ui_url': flow_runs_ui_url,
+        }
+        records = to_template_records(formatted_failed_flow_runs)
+        msg = render_email_within(max_body_bytes, **context, failed_flow_runs=records)
 
         is_html = True
 
-    try:
-        send_email(
-            mail_to=destinatarios,
-            subject=subject,
-            body=msg,
-            is_html=is_html
+    messages = [(subject, msg)]
+    attachments_dir = None
+    attachments = []
+
+    if is_html and msg is None:
+        if oversize_mode == 'attachment' and not send_email_accepts_attachments():
+            get_run_logger().warning(
+                "send_email no admite adjuntos en esta versión de consulterscommons. El detalle se enviará en mails adicionales."
+            )
+            oversize_mode = 'split'
+        messages = build_oversize_messages(
+            records, context, subject, max_body_bytes, top_n_flows,
+            include_rest=oversize_mode == 'split', attachment_format=attachment_format
         )
+        if oversize_mode == 'attachment':
+            attachments_dir = tempfile.mkdtemp(prefix='reporte_prefect_')
+            attachments.append(write_details_attachment(failed_flow_runs_df, attachments_dir, attachment_format))
+
+    sent = 0
+    try:
+        for message_subject, message_body in messages:
+            # send_email recibe los adjuntos como lista de rutas de archivo
+            email_kwargs = {'attachments': attachments} if attachments else {}
+            send_email(
+                mail_to=destinatarios,
+                subject=message_subject,
+                body=message_body,
+                is_html=is_html,
+                **email_kwargs
+            )
+            sent += 1
+            # El adjunto solo va en el mail principal
+            attachments = []
     except Exception as e:
+        if len(messages) > 1:
+            # Los mails anteriores ya salieron: se informa cuántas partes llegaron para no reenviar el reporte entero
+            return f"Error enviando email (se enviaron {sent} de {len(messages)} partes): {e}"
         error_msg = f"Error enviando email: {e}"
         return error_msg
+    finally:
+        if attachments_dir:
+            shutil.rmtree(attachments_dir, ignore_errors=True)
 
+    if len(messages) > 1:
+        return f"Email enviado en {len(messages)} partes."
     return "Email enviado."
 
 
@@ -216,9 +540,10 @@ if __name__ == '__main__':
         'deployment_entrypoint': ['entry1', 'entry2', 'entry3', 'entry4', 'entry5', 'entry6'],
         'id': ['run1', 'run2', 'run3', 'run4', 'run5', 'run6'],
         'flow_run_name': ['run_name1', 'run_name2', 'parent_run', 'subflow_run', 'run_september', 'run_august'],
-        'state': [{'message': 'Failed due to timeout'}, {'message': 'Failed due to error'}, 
-            {'message': 'Failed due to timeout'}, {'message': 'Failed due to timeout'}, 
-            {'message': 'Failed due to timeout'}, {'message': 'Failed due to timeout'}],
+        'state_type': ['FAILED', 'FAILED', 'FAILED', 'CRASHED', 'FAILED', 'FAILED'],
+        'state_message': ['Failed due to timeout', 'Failed due to error',
+            'Failed due to timeout', 'Failed due to timeout',
+            'Failed due to timeout', 'Failed due to timeout'],
         'start_time': [datetime.datetime(2024, 8, 1, 10, 0), datetime.datetime(2024, 8, 2, 11, 0), datetime.datetime(2024, 10, 3, 12, 0),
             datetime.datetime(2024, 10, 3, 13, 0),
             datetime.datetime(2024, 9, 1, 10, 0),
@@ -0,0 +1,176 @@
+"""
+    Representación compacta de ejecuciones de flujo para reportes grandes.
+
+    Cada ejecución se convertía en un diccionario anidado con `parameters`, un diccionario `state` y objetos
+    UUID y datetime completos, que luego pandas guardaba como columnas de objetos. Este módulo define un registro
+    con `__slots__` y un constructor que arma el DataFrame columna por columna:
+    estados como categoría, fechas y duraciones como int64 (datetime64/timedelta64), UUID opcionalmente como
+    bytes de 16 posiciones y `parameters` solo si se pide.
+
+    - `RunRecord`:
+        Registro compacto de una ejecución. Se crea con `RunRecord.from_flow_run` o `RunRecord.from_dict`.
+        `RECORD_DICT_FIELDS` son las claves que lee `from_dict`, para proyectar `iter_flow_runs` solo a ellas.
+    - `build_runs_frame(records, include_parameters: bool, compact_ids: bool) -> pd.DataFrame`:
+        Construye el DataFrame columnar a partir de registros.
+    - `uuid_from_bytes(value: bytes) -> UUID`:
+        Recupera el UUID de una columna compacta.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+from uuid import UUID
+
+import numpy as np
+import pandas as pd
+
+from prefect.client.schemas.objects import StateType
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - pyarrow es opcional
+    pa = None
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Valor que numpy usa para NaT en arreglos datetime64/timedelta64 de int64
+NAT = np.iinfo(np.int64).min
+
+STATE_TYPE_CATEGORIES = pd.CategoricalDtype([state.value for state in StateType])
+
+# Claves del diccionario de `get_flow_runs_info` que usa `RunRecord.from_dict` sin `parameters`
+RECORD_DICT_FIELDS = (
+    "id", "flow_run_name", "state", "start_time", "end_time", "total_duration", "flow_id", "deployment_id",
+)
+
+
+@dataclass(slots=True)
+class RunRecord:
+    """Ejecución de flujo con las fechas en microsegundos desde epoch (UTC) y la duración en microsegundos."""
+    id: UUID
+    flow_run_name: str
+    state_type: Optional[str]
+    state_message: Optional[str]
+    start_time: Optional[int]
+    end_time: Optional[int]
+    total_duration: Optional[int]
+    flow_id: UUID
+    deployment_id: Optional[UUID]
+    parameters: Optional[dict] = None
+
+    @classmethod
+    def from_flow_run(cls, flow_run, include_parameters: bool = False) -> "RunRecord":
+        """Crea el registro desde un objeto `FlowRun` de la API."""
+        state = flow_run.state
+        return cls(
+            id=flow_run.id,
+            flow_run_name=flow_run.name,
+            state_type=_state_value(state.type) if state else None,
+            state_message=state.message if state else None,
+            start_time=_micros(flow_run.start_time or flow_run.expected_start_time),
+            end_time=_micros(flow_run.end_time),
+            total_duration=_duration_micros(flow_run.total_run_time),
+            flow_id=flow_run.flow_id,
+            deployment_id=flow_run.deployment_id,
+            parameters=flow_run.parameters if include_parameters else None,
+        )
+
+    @classmethod
+    def from_dict(cls, flow_run: dict, include_parameters: bool = False) -> "RunRecord":
+        """Crea el registro desde un diccionario con el formato de `get_flow_runs_info`."""
+        state = flow_run.get("state") or {}
+        return cls(
+            id=flow_run["id"],
+            flow_run_name=flow_run["flow_run_name"],
+            state_type=_state_value(state.get("type")),
+            state_message=state.get("message"),
+            start_time=_micros(flow_run["start_time"]),
+            end_time=_micros(flow_run["end_time"]),
+            total_duration=_duration_micros(flow_run["total_duration"]),
+            flow_id=flow_run["flow_id"],
+            deployment_id=flow_run["deployment_id"],
+            parameters=flow_run.get("parameters") if include_parameters else None,
+        )
+
+
+def build_runs_frame(
+        records: Iterable[RunRecord],
+        include_parameters: bool = False,
+        compact_ids: bool = False
+    ) -> pd.DataFrame:
+    """
+    Construye un DataFrame columnar con una columna por campo de `RunRecord`.
+
+    Parámetros:
+    - records (list[RunRecord]): Registros a convertir. Puede ser un generador.
+    - include_parameters (bool, opcional): Si se agrega la columna `parameters`. Por defecto False.
+    - compact_ids (bool, opcional): Si los UUID se guardan como bytes de 16 posiciones en lugar de objetos UUID.
+      Con pyarrow instalado se usa una columna binaria de ancho fijo. Por defecto False.
+    Retorna:
+    - pd.DataFrame: Columnas id, flow_run_name, state_type (categoría), state_message, start_time, end_time
+      (datetime64 UTC), total_duration (timedelta64), flow_id, deployment_id y opcionalmente parameters.
+    """
+    columns: dict[str, list] = {field: [] for field in RunRecord.__slots__}
+    for record in records:
+        for field, values in columns.items():
+            values.append(getattr(record, field))
+
+    frame = pd.DataFrame({
+        "id": _uuid_column(columns["id"], compact_ids),
+        "flow_run_name": pd.Series(columns["flow_run_name"], dtype=object),
+        "state_type": pd.Series(columns["state_type"], dtype=STATE_TYPE_CATEGORIES),
+        "state_message": pd.Series(columns["state_message"], dtype=object),
+        "start_time": _datetime_column(columns["start_time"]),
+        "end_time": _datetime_column(columns["end_time"]),
+        "total_duration": pd.Series(_int64_array(columns["total_duration"]).view("timedelta64[us]")),
+        "flow_id": _uuid_column(columns["flow_id"], compact_ids),
+        "deployment_id": _uuid_column(columns["deployment_id"], compact_ids),
+    })
+
+    if include_parameters:
+        frame["parameters"] = pd.Series(columns["parameters"], dtype=object)
+
+    return frame
+
+
+def uuid_from_bytes(value: Optional[bytes]) -> Optional[UUID]:
+    """Recupera el UUID de un valor de una columna compacta."""
+    return UUID(bytes=value) if value else None
+
+
+def _uuid_column(values: list[Optional[UUID]], compact: bool) -> pd.Series:
+    if not compact:
+        return pd.Series(values, dtype=object)
+
+    raw = [value.bytes if value is not None else None for value in values]
+    if pa is not None:
+        return pd.Series(pd.arrays.ArrowExtensionArray(pa.array(raw, type=pa.binary(16))))
+    return pd.Series(raw, dtype=object)
+
+
+def _datetime_column(values: list[Optional[int]]) -> pd.Series:
+    return pd.Series(_int64_array(values).view("datetime64[us]")).dt.tz_localize(timezone.utc)
+
+
+def _int64_array(values: list[Optional[int]]) -> np.ndarray:
+    return np.fromiter((NAT if value is None else value for value in values), dtype=np.int64, count=len(values))
+
+
+def _state_value(state_type) -> Optional[str]:
+    if state_type is None:
+        return None
+    return getattr(state_type, "value", state_type)
+
+
+def _micros(value: Optional[datetime]) -> Optional[int]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return _duration_micros(value - EPOCH)
+
+
+def _duration_micros(value: Optional[timedelta]) -> Optional[int]:
+    if value is None:
+        return None
+    return (value.days * 86_400 + value.seconds) * 1_000_000 + value.microseconds
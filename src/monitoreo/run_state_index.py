@@ -0,0 +1,447 @@
+"""
+    Índice en memoria del estado actual de las ejecuciones de flujo.
+
+    Los reportes, el watchdog y los scripts de consulta vuelven a llamar a `read_flow_runs` cada vez que necesitan
+    saber qué ejecuciones están en curso, demoradas o fallidas. Este módulo mantiene una vista materializada:
+    se carga una vez desde la API y luego se actualiza con los eventos de cambio de estado
+    (`flow_run_events.flow_run_event_stream`). Las consultas se responden desde memoria con índices
+    por estado, despliegue, etiqueta y ejecución padre, sin consultas a la API.
+
+    Las ejecuciones en estados no terminales se conservan siempre. Las terminadas se conservan durante
+    `terminal_retention` y luego se descartan. Cada `resync_minutes` se vuelve a leer el estado desde la API
+    para cubrir eventos perdidos y ejecuciones eliminadas.
+
+    - `RunStateIndex(terminal_retention: timedelta)`:
+        Índice con métodos de consulta `get`, `in_state`, `running`, `by_deployment`, `by_tag`, `children` y `counts`,
+        y de actualización `upsert`, `apply_event`, `complete`, `remove` y `prune`.
+    - `IndexedRun`:
+        Estado de una ejecución guardado en el índice.
+    - `seed_run_state_index(index: RunStateIndex, client: PrefectClient = None) -> int`:
+        Carga en el índice las ejecuciones activas y las terminadas dentro del período de retención.
+    - `maintain_run_state_index(index: RunStateIndex, client: PrefectClient = None, resync_minutes: float = 60)`:
+        Mantiene el índice actualizado con los eventos hasta que se cancela.
+    - `live_run_state_index(terminal_retention, resync_minutes) -> RunStateIndex`:
+        Context manager asíncrono que carga el índice y lo mantiene actualizado mientras dura el bloque.
+
+    Ejemplo:
+        async with live_run_state_index() as index:
+            running = index.running()
+            late = index.in_state("Late")
+            failed = index.by_deployment(deployment_id, states=[StateType.FAILED])
+"""
+
+import asyncio
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from operator import attrgetter
+from typing import AsyncIterator, Iterable, Optional, Sequence, Union
+from uuid import UUID
+
+from prefect.client.orchestration import PrefectClient
+from prefect.client.schemas.objects import FlowRun, StateType
+from prefect.server.schemas.filters import FlowRunFilter, TaskRunFilter
+
+from dev.MONITOREO_PREFECT.client_session import use_client
+from dev.MONITOREO_PREFECT.server_settings import get_api_limit
+from dev.MONITOREO_PREFECT.pagination import keyset_pages, offset_paginate, chunked
+from dev.MONITOREO_PREFECT.flow_run_events import flow_run_event_stream, FlowRunStateEvent
+
+DEFAULT_TERMINAL_RETENTION = timedelta(hours=24)
+DEFAULT_RESYNC_MINUTES = 60
+
+# Ejecuciones programadas a futuro que se cargan al iniciar. Las posteriores entran por eventos o en la relectura
+DEFAULT_SCHEDULED_HORIZON = timedelta(days=7)
+
+# Cantidad de IDs por consulta `any_`
+DEFAULT_CHUNK_SIZE = 100
+
+TERMINAL_STATES = (StateType.COMPLETED, StateType.FAILED, StateType.CRASHED, StateType.CANCELLED)
+ACTIVE_STATES = tuple(state for state in StateType if state not in TERMINAL_STATES)
+
+KEYSET_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+StateQuery = Union[StateType, str]
+
+
+@dataclass(slots=True)
+class IndexedRun:
+    """Estado actual de una ejecución de flujo. `state_timestamp` es la fecha del último cambio de estado aplicado."""
+    id: UUID
+    name: Optional[str]
+    state_type: Optional[StateType]
+    state_name: Optional[str]
+    state_timestamp: datetime
+    flow_id: Optional[UUID] = None
+    deployment_id: Optional[UUID] = None
+    parent_flow_run_id: Optional[UUID] = None
+    tags: tuple[str, ...] = ()
+
+    @classmethod
+    def from_flow_run(cls, flow_run: FlowRun, parent_flow_run_id: Optional[UUID] = None) -> "IndexedRun":
+        """Crea la entrada desde un objeto `FlowRun` de la API."""
+        state = flow_run.state
+        return cls(
+            id=flow_run.id,
+            name=flow_run.name,
+            state_type=state.type if state else None,
+            state_name=state.name if state else None,
+            state_timestamp=state.timestamp if state else flow_run.updated,
+            flow_id=flow_run.flow_id,
+            deployment_id=flow_run.deployment_id,
+            parent_flow_run_id=parent_flow_run_id,
+            tags=tuple(flow_run.tags or ()),
+        )
+
+
+class RunStateIndex:
+    """
+    Índice en memoria de ejecuciones de flujo por ID, tipo y nombre de estado, despliegue, etiqueta y padre.
+
+    Un cambio de estado solo se aplica si es igual o más nuevo que el último aplicado a la ejecución,
+    por lo que los eventos que llegan desordenados o una relectura más vieja que un evento no retroceden el estado.
+    Las consultas devuelven listas nuevas y pueden filtrarse por estado con `StateType` o con el nombre
+    del estado (por ejemplo "Late", que es un estado de tipo SCHEDULED).
+    """
+
+    def __init__(self, terminal_retention: timedelta = DEFAULT_TERMINAL_RETENTION):
+        self.terminal_retention = terminal_retention
+        self._runs: dict[UUID, IndexedRun] = {}
+        self._by_state_type: defaultdict[Optional[StateType], set[UUID]] = defaultdict(set)
+        self._by_state_name: defaultdict[Optional[str], set[UUID]] = defaultdict(set)
+        self._by_deployment: defaultdict[UUID, set[UUID]] = defaultdict(set)
+        self._by_tag: defaultdict[str, set[UUID]] = defaultdict(set)
+        self._by_parent: defaultdict[UUID, set[UUID]] = defaultdict(set)
+
+    def __len__(self) -> int:
+        return len(self._runs)
+
+    def __contains__(self, flow_run_id: UUID) -> bool:
+        return flow_run_id in self._runs
+
+    # Consultas
+
+    def get(self, flow_run_id: UUID) -> Optional[IndexedRun]:
+        return self._runs.get(flow_run_id)
+
+    def in_state(self, *states: StateQuery) -> list[IndexedRun]:
+        """Ejecuciones en alguno de los estados indicados (tipo de estado o nombre de estado)."""
+        return self._resolve(self._state_ids(states))
+
+    def running(self) -> list[IndexedRun]:
+        return self.in_state(StateType.RUNNING)
+
+    def by_deployment(self, deployment_id: UUID, states: Optional[Sequence[StateQuery]] = None) -> list[IndexedRun]:
+        return self._resolve(self._filter_states(self._by_deployment.get(deployment_id, ()), states))
+
+    def by_tag(self, tag: str, states: Optional[Sequence[StateQuery]] = None) -> list[IndexedRun]:
+        return self._resolve(self._filter_states(self._by_tag.get(tag, ()), states))
+
+    def children(self, parent_flow_run_id: UUID, states: Optional[Sequence[StateQuery]] = None) -> list[IndexedRun]:
+        """Subflujos directos de una ejecución."""
+        return self._resolve(self._filter_states(self._by_parent.get(parent_flow_run_id, ()), states))
+
+    def counts(self) -> dict[str, int]:
+        """Cantidad de ejecuciones por nombre de estado."""
+        return {name: len(ids) for name, ids in self._by_state_name.items() if name is not None and ids}
+
+    # Actualización
+
+    def upsert(self, run: IndexedRun) -> bool:
+        """
+        Agrega o reemplaza una ejecución. Los campos desconocidos de la nueva versión (padre, despliegue, etiquetas)
+        se completan con los ya guardados.
+
+        Retorna:
+        - bool: False si se descartó porque el índice ya tenía un estado más nuevo.
+        """
+        current = self._runs.get(run.id)
+        if current is not None:
+            if run.state_timestamp < current.state_timestamp:
+                return False
+            run.name = run.name or current.name
+            run.flow_id = run.flow_id or current.flow_id
+            run.deployment_id = run.deployment_id or current.deployment_id
+            run.parent_flow_run_id = run.parent_flow_run_id or current.parent_flow_run_id
+            run.tags = run.tags or current.tags
+            self._unlink(current)
+
+        self._runs[run.id] = run
+        self._link(run)
+        return True
+
+    def apply_event(self, event: FlowRunStateEvent) -> bool:
+        """Aplica un cambio de estado recibido por eventos. Retorna False si el evento es más viejo que el estado guardado."""
+        return self.upsert(IndexedRun(
+            id=event.flow_run_id,
+            name=event.flow_run_name,
+            state_type=event.state_type,
+            state_name=event.state_name,
+            state_timestamp=event.occurred,
+            flow_id=_related_uuid(event.related.get("flow")),
+            deployment_id=_related_uuid(event.related.get("deployment")),
+            parent_flow_run_id=_related_uuid(event.related.get("flow-run")),
+            tags=tuple(event.related.get("tag", ())),
+        ))
+
+    def complete(self, run: IndexedRun) -> None:
+        """
+        Completa los campos desconocidos de la ejecución guardada (padre, despliegue, etiquetas) con los de `run`
+        sin cambiar su estado. Sirve para datos leídos de la API que son más viejos que el último evento aplicado.
+        Si la ejecución no está en el índice se agrega.
+        """
+        current = self._runs.get(run.id)
+        if current is None:
+            self.upsert(run)
+            return
+
+        self._unlink(current)
+        current.name = current.name or run.name
+        current.flow_id = current.flow_id or run.flow_id
+        current.deployment_id = current.deployment_id or run.deployment_id
+        current.parent_flow_run_id = current.parent_flow_run_id or run.parent_flow_run_id
+        current.tags = current.tags or run.tags
+        self._link(current)
+
+    def remove(self, flow_run_id: UUID) -> None:
+        run = self._runs.pop(flow_run_id, None)
+        if run is not None:
+            self._unlink(run)
+
+    def prune(self, now: Optional[datetime] = None) -> int:
+        """Descarta las ejecuciones terminadas antes del período de retención. Retorna la cantidad descartada."""
+        cutoff = (now or datetime.now(timezone.utc)) - self.terminal_retention
+        expired = [
+            flow_run_id for flow_run_id in self._state_ids(TERMINAL_STATES)
+            if self._runs[flow_run_id].state_timestamp < cutoff
+        ]
+        for flow_run_id in expired:
+            self.remove(flow_run_id)
+
+        return len(expired)
+
+    def _link(self, run: IndexedRun) -> None:
+        self._by_state_type[run.state_type].add(run.id)
+        self._by_state_name[run.state_name].add(run.id)
+        if run.deployment_id:
+            self._by_deployment[run.deployment_id].add(run.id)
+        if run.parent_flow_run_id:
+            self._by_parent[run.parent_flow_run_id].add(run.id)
+        for tag in run.tags:
+            self._by_tag[tag].add(run.id)
+
+    def _unlink(self, run: IndexedRun) -> None:
+        _discard(self._by_state_type, run.state_type, run.id)
+        _discard(self._by_state_name, run.state_name, run.id)
+        _discard(self._by_deployment, run.deployment_id, run.id)
+        _discard(self._by_parent, run.parent_flow_run_id, run.id)
+        for tag in run.tags:
+            _discard(self._by_tag, tag, run.id)
+
+    def _state_ids(self, states: Iterable[StateQuery]) -> set[UUID]:
+        ids = set()
+        for state in states:
+            state_type = _as_state_type(state)
+            if state_type is not None:
+                ids |= self._by_state_type.get(state_type, set())
+            else:
+                ids |= self._by_state_name.get(state, set())
+        return ids
+
+    def _filter_states(self, ids: Iterable[UUID], states: Optional[Sequence[StateQuery]]) -> Iterable[UUID]:
+        if not states:
+            return ids
+        return self._state_ids(states).intersection(ids)
+
+    def _resolve(self, ids: Iterable[UUID]) -> list[IndexedRun]:
+        return [self._runs[flow_run_id] for flow_run_id in ids]
+
+
+async def seed_run_state_index(
+        index: RunStateIndex,
+        client: Optional[PrefectClient] = None,
+        scheduled_horizon: timedelta = DEFAULT_SCHEDULED_HORIZON
+    ) -> int:
+    """
+    Carga desde la API las ejecuciones activas (programadas hasta `scheduled_horizon`) y las terminadas dentro
+    del período de retención del índice. Las ejecuciones activas del índice que ya no aparecen en la API
+    (eliminadas o con un cambio de estado perdido que las dejó fuera de la consulta) se descartan.
+
+    Parámetros:
+    - index (RunStateIndex): Índice a cargar.
+    - client (PrefectClient, opcional): Cliente a utilizar. Por defecto el cliente compartido o uno nuevo.
+    - scheduled_horizon (timedelta, opcional): Hasta cuándo se cargan las ejecuciones programadas a futuro.
+    Retorna:
+    - int: Cantidad de ejecuciones leídas de la API.
+    """
+    started_at = datetime.now(timezone.utc)
+    seen: set[UUID] = set()
+
+    async with use_client(client) as client:
+        api_limit = await get_api_limit(client)
+
+        passes = (
+            (ACTIVE_STATES, None, started_at + scheduled_horizon),
+            (TERMINAL_STATES, started_at - index.terminal_retention, started_at),
+        )
+        for states, ended_after, until in passes:
+            read_page = _runs_page_reader(client, states, ended_after)
+            async for page in keyset_pages(
+                    read_page, attrgetter('expected_start_time'), KEYSET_EPOCH, until, api_limit,
+                    sort="EXPECTED_START_TIME_ASC"
+                ):
+                parents = await _read_parent_flow_runs(client, page, api_limit)
+                for flow_run in page:
+                    run = IndexedRun.from_flow_run(flow_run, parents.get(flow_run.parent_task_run_id))
+                    if not index.upsert(run):
+                        index.complete(run)
+                    seen.add(flow_run.id)
+
+    # Una ejecución activa que no volvió en la lectura y no cambió por eventos desde que empezó ya no está activa
+    for run in index.in_state(*ACTIVE_STATES):
+        if run.id not in seen and run.state_timestamp < started_at:
+            index.remove(run.id)
+    index.prune(started_at)
+
+    return len(seen)
+
+
+async def maintain_run_state_index(
+        index: RunStateIndex,
+        client: Optional[PrefectClient] = None,
+        resync_minutes: float = DEFAULT_RESYNC_MINUTES,
+        ready: Optional[asyncio.Event] = None
+    ) -> None:
+    """
+    Carga el índice y lo mantiene actualizado con los eventos de cambio de estado hasta que la tarea se cancela.
+
+    La suscripción empieza antes de la carga, así los cambios ocurridos mientras se lee la API no se pierden.
+    Las ejecuciones nuevas que llegan por eventos sin su ejecución padre se completan con una lectura por lotes.
+
+    Parámetros:
+    - index (RunStateIndex): Índice a mantener.
+    - client (PrefectClient, opcional): Cliente a utilizar. Por defecto el cliente compartido o uno nuevo.
+    - resync_minutes (float, opcional): Minutos entre relecturas completas desde la API.
+    - ready (asyncio.Event, opcional): Se marca al terminar la primera carga.
+    """
+    async with use_client(client) as client, flow_run_event_stream() as events:
+        while True:
+            await seed_run_state_index(index, client)
+            if ready is not None:
+                ready.set()
+
+            resync_at = asyncio.get_running_loop().time() + resync_minutes * 60
+            while (timeout := resync_at - asyncio.get_running_loop().time()) > 0:
+                batch = await events.next_batch(timeout)
+                if not batch:
+                    break
+                await _apply_events(index, client, batch)
+
+
+@asynccontextmanager
+async def live_run_state_index(
+        terminal_retention: timedelta = DEFAULT_TERMINAL_RETENTION,
+        resync_minutes: float = DEFAULT_RESYNC_MINUTES,
+        client: Optional[PrefectClient] = None
+    ) -> AsyncIterator[RunStateIndex]:
+    """
+    Carga un índice y lo mantiene actualizado en segundo plano mientras dura el bloque `async with`.
+    Si la tarea de actualización falla durante la carga inicial, el error se propaga al entrar al bloque.
+    """
+    index = RunStateIndex(terminal_retention)
+    ready = asyncio.Event()
+    maintainer = asyncio.create_task(maintain_run_state_index(index, client, resync_minutes, ready))
+    seeded = asyncio.create_task(ready.wait())
+
+    try:
+        await asyncio.wait({maintainer, seeded}, return_when=asyncio.FIRST_COMPLETED)
+        if maintainer.done():
+            maintainer.result()
+        yield index
+    finally:
+        seeded.cancel()
+        maintainer.cancel()
+
+
+async def _apply_events(index: RunStateIndex, client: PrefectClient, events: list[FlowRunStateEvent]) -> None:
+    new_ids = set()
+    for event in events:
+        if event.flow_run_id not in index and "flow-run" not in event.related:
+            new_ids.add(event.flow_run_id)
+        index.apply_event(event)
+
+    # Los eventos no indican la ejecución padre: se lee una vez por cada ejecución nueva
+    if new_ids:
+        api_limit = await get_api_limit(client)
+        for chunk in chunked(list(new_ids), DEFAULT_CHUNK_SIZE):
+            flow_runs = await client.read_flow_runs(flow_run_filter=FlowRunFilter(id={'any_': chunk}), limit=len(chunk))
+            parents = await _read_parent_flow_runs(client, flow_runs, api_limit)
+            for flow_run in flow_runs:
+                # La lectura suele ser más vieja que el evento: si no reemplaza el estado, solo completa el padre
+                run = IndexedRun.from_flow_run(flow_run, parents.get(flow_run.parent_task_run_id))
+                if not index.upsert(run):
+                    index.complete(run)
+
+
+def _runs_page_reader(client: PrefectClient, states: Sequence[StateType], ended_after: Optional[datetime]):
+    async def read_page(after_: datetime, before_: datetime, sort: str, limit: int, offset: int) -> list:
+        filters = {
+            'state': {'type': {'any_': list(states)}},
+            'expected_start_time': {'after_': after_, 'before_': before_},
+        }
+        if ended_after is not None:
+            filters['end_time'] = {'after_': ended_after}
+
+        return await client.read_flow_runs(
+            flow_run_filter=FlowRunFilter(**filters),
+            sort=sort,
+            limit=limit,
+            offset=offset
+        )
+
+    return read_page
+
+
+async def _read_parent_flow_runs(client: PrefectClient, flow_runs: list[FlowRun], api_limit: int) -> dict[UUID, UUID]:
+    """Los subflujos solo conocen la tarea que los lanzó: devuelve el flujo padre de cada tarea."""
+    parent_task_run_ids = list({flow_run.parent_task_run_id for flow_run in flow_runs if flow_run.parent_task_run_id})
+    parents = {}
+    for chunk in chunked(parent_task_run_ids, DEFAULT_CHUNK_SIZE):
+        task_runs = await offset_paginate(
+            lambda offset, chunk=chunk: client.read_task_runs(
+                task_run_filter=TaskRunFilter(id={'any_': chunk}),
+                sort="ID_DESC",
+                limit=api_limit,
+                offset=offset
+            ),
+            api_limit
+        )
+        parents.update((task_run.id, task_run.flow_run_id) for task_run in task_runs)
+
+    return parents
+
+
+def _as_state_type(state: StateQuery) -> Optional[StateType]:
+    if isinstance(state, StateType):
+        return state
+    try:
+        return StateType(state)
+    except ValueError:
+        return None
+
+
+def _related_uuid(value: Optional[str]) -> Optional[UUID]:
+    try:
+        return UUID(value) if value else None
+    except ValueError:
+        return None
+
+
+def _discard(index: dict, key, flow_run_id: UUID) -> None:
+    ids = index.get(key)
+    if ids is None:
+        return
+    ids.discard(flow_run_id)
+    if not ids:
+        del index[key]
@@ -0,0 +1,326 @@
+"""
+    Almacén local de ejecuciones de flujo para reportes incrementales.
+
+    Cada reporte periódico volvía a consultar a la API todas las ejecuciones de su período, aunque los reportes
+    diarios ya las hubieran obtenido. Este módulo guarda en SQLite las ejecuciones en estados terminales
+    y solo sincroniza la diferencia desde la última sincronización. Los reportes de cualquier período se
+    calculan luego con los datos locales.
+
+    La API no permite filtrar ejecuciones por su campo `updated`, por lo que la marca de sincronización
+    (high-water mark) se toma sobre `end_time`: toda ejecución que entra en un estado terminal recibe un `end_time`,
+    incluso las que se reintentan y terminan más tarde. Cada sincronización vuelve a leer un margen de tiempo
+    (`lookback`) para cubrir ejecuciones que se registran con demora. El campo `updated` se guarda
+    para que una versión vieja de una ejecución nunca reemplace a una más nueva.
+
+    La sincronización no ve las ejecuciones eliminadas del servidor. `db_cleanup` las quita del almacén con `delete`
+    al eliminarlas, para que los reportes no sigan contando ejecuciones que ya no existen.
+
+    - `RunStore(path: str)`:
+        Almacén con métodos `upsert`, `delete`, `query`, `sync_range` y `set_sync_range`.
+    - `sync_run_store(store: RunStore, since: datetime, client: PrefectClient = None) -> int`:
+        Sincroniza las ejecuciones terminadas desde `since` y las nuevas desde la última sincronización.
+    - `TERMINAL_STATES`:
+        Estados que se guardan en el almacén. Los reportes de otros estados deben consultar la API.
+"""
+
+import json
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from functools import partial
+from operator import attrgetter
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Sequence, Union
+from uuid import UUID
+
+from prefect.client.orchestration import PrefectClient
+from prefect.client.schemas.objects import StateType
+from prefect.server.schemas.filters import FlowRunFilter
+from prefect.settings import PREFECT_HOME
+
+from dev.MONITOREO_PREFECT.client_session import use_client
+from dev.MONITOREO_PREFECT.server_settings import get_api_limit
+from dev.MONITOREO_PREFECT.pagination import keyset_pages, concurrent_pages, batched_pages, disjoint_time_windows
+from dev.MONITOREO_PREFECT.get_prefect_info import DEFAULT_WINDOW_HOURS, DEFAULT_MAX_CONCURRENCY
+
+DEFAULT_LOOKBACK = timedelta(minutes=15)
+
+TERMINAL_STATES = ("COMPLETED", "FAILED", "CRASHED", "CANCELLED")
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+_COLUMNS = (
+    "id", "flow_run_name", "state_type", "state_message", "start_time", "end_time",
+    "total_duration", "parameters", "flow_id", "deployment_id", "updated",
+)
+
+
+def default_store_path() -> Path:
+    """Ruta por defecto del almacén. Se resuelve al crearlo, así respeta el PREFECT_HOME vigente en ese momento."""
+    return Path(PREFECT_HOME.value()) / "monitoreo" / "run_store.sqlite"
+
+
+class RunStore:
+    """
+    Almacén en SQLite de ejecuciones de flujo con el mismo formato que devuelve `get_flow_runs_info`.
+    Las fechas se guardan como microsegundos desde epoch (UTC) para poder filtrarlas por rango.
+    """
+
+    def __init__(self, path: Optional[Union[str, Path]] = None):
+        self.path = Path(path) if path is not None else default_store_path()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS flow_runs ("
+                "id TEXT PRIMARY KEY, flow_run_name TEXT, state_type TEXT, state_message TEXT, "
+                "start_time INTEGER, end_time INTEGER, total_duration REAL, parameters TEXT, "
+                "flow_id TEXT, deployment_id TEXT, updated INTEGER)"
+            )
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS flow_runs_start_time ON flow_runs (start_time, state_type)"
+            )
+            connection.execute("CREATE TABLE IF NOT EXISTS sync_state (key TEXT PRIMARY KEY, value INTEGER)")
+
+    def upsert(self, flow_runs: Iterable) -> int:
+        """
+        Guarda o actualiza ejecuciones de flujo (objetos `FlowRun` de la API).
+        Una ejecución solo se reemplaza si la nueva versión tiene un `updated` igual o más nuevo.
+
+        Retorna:
+        - int: Cantidad de ejecuciones recibidas.
+        """
+        rows = [_to_row(flow_run) for flow_run in flow_runs]
+        if not rows:
+            return 0
+
+        with self._connect() as connection:
+            connection.executemany(
+                f"INSERT INTO flow_runs ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))}) "
+                "ON CONFLICT(id) DO UPDATE SET "
+                + ", ".join(f"{column} = excluded.{column}" for column in _COLUMNS[1:])
+                + " WHERE updated IS NULL OR excluded.updated IS NULL OR excluded.updated >= updated",
+                rows
+            )
+
+        return len(rows)
+
+    def delete(self, flow_run_ids: Iterable[Union[str, UUID]]) -> int:
+        """
+        Elimina ejecuciones de flujo del almacén, por ejemplo las eliminadas del servidor.
+
+        Retorna:
+        - int: Cantidad de ejecuciones eliminadas del almacén.
+        """
+        with self._connect() as connection:
+            cursor = connection.executemany(
+                "DELETE FROM flow_runs WHERE id = ?",
+                [(str(flow_run_id),) for flow_run_id in flow_run_ids]
+            )
+            return cursor.rowcount
+
+    def query(
+            self,
+            start_date: datetime,
+            end_date: datetime,
+            states: Optional[Sequence[Union[str, StateType]]] = None
+        ) -> list[dict]:
+        """
+        Obtiene las ejecuciones guardadas con fecha de inicio dentro del rango y los estados indicados.
+
+        Retorna:
+        - list[dict]: Ejecuciones con el formato de `get_flow_runs_info`, ordenadas por fecha de inicio descendente.
+        """
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM flow_runs WHERE start_time BETWEEN ? AND ?"
+        params: list = [_to_micros(start_date), _to_micros(end_date)]
+
+        if states:
+            state_names = [_state_name(state) for state in states]
+            sql += f" AND state_type IN ({', '.join('?' * len(state_names))})"
+            params.extend(state_names)
+
+        sql += " ORDER BY start_time DESC"
+
+        with self._connect() as connection:
+            return [_from_row(row) for row in connection.execute(sql, params)]
+
+    def sync_range(self) -> tuple[Optional[datetime], Optional[datetime]]:
+        """Devuelve el rango de `end_time` ya sincronizado (low-water mark, high-water mark)."""
+        with self._connect() as connection:
+            values = dict(connection.execute("SELECT key, value FROM sync_state"))
+
+        return _from_micros(values.get("low_water_mark")), _from_micros(values.get("high_water_mark"))
+
+    def set_sync_range(self, low_water_mark: datetime, high_water_mark: datetime) -> None:
+        """Guarda el rango de `end_time` sincronizado."""
+        with self._connect() as connection:
+            connection.executemany(
+                "INSERT INTO sync_state (key, value) VALUES (?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+                [
+                    ("low_water_mark", _to_micros(low_water_mark)),
+                    ("high_water_mark", _to_micros(high_water_mark)),
+                ]
+            )
+
+    @contextmanager
+    def _connect(self) -> Iterator[sqlite3.Connection]:
+        connection = sqlite3.connect(self.path, timeout=60)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+
+async def sync_run_store(
+        store: RunStore,
+        since: datetime,
+        client: Optional[PrefectClient] = None,
+        states: Sequence[str] = TERMINAL_STATES,
+        lookback: timedelta = DEFAULT_LOOKBACK,
+        window_hours: float = DEFAULT_WINDOW_HOURS,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY
+    ) -> int:
+    """
+    Sincroniza el almacén con las ejecuciones terminadas que faltan.
+
+    Se leen las ejecuciones con `end_time` entre `since` y el inicio de lo ya sincronizado (si el reporte pide un
+    período anterior) y las ejecuciones con `end_time` posterior a la última sincronización menos `lookback`.
+    Como en `get_prefect_info`, cada rango de `end_time` se divide en ventanas que se leen en paralelo.
+    Las páginas se guardan a medida que llegan, por lo que la memoria usada no depende del tamaño del rango.
+
+    Parámetros:
+    - store (RunStore): Almacén a sincronizar.
+    - since (datetime): Fecha desde la que se necesitan ejecuciones.
+    - client (PrefectClient, opcional): Cliente a utilizar. Por defecto el cliente compartido o uno nuevo.
+    - states (list[str], opcional): Estados a sincronizar. Por defecto los estados terminales.
+    - lookback (timedelta, opcional): Margen que se vuelve a leer en cada sincronización.
+    - window_hours (float, opcional): Horas de cada ventana de `end_time` que se lee en paralelo.
+    - max_concurrency (int, opcional): Cantidad máxima de ventanas leídas a la vez.
+    Retorna:
+    - int: Cantidad de ejecuciones leídas de la API.
+    """
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+
+    sync_started_at = datetime.now(timezone.utc)
+    low_water_mark, high_water_mark = store.sync_range()
+
+    if low_water_mark is None or high_water_mark is None:
+        end_time_ranges = [(since, sync_started_at)]
+        low_water_mark = since
+    else:
+        end_time_ranges = [(high_water_mark - lookback, sync_started_at)]
+        if since < low_water_mark:
+            end_time_ranges.append((since, low_water_mark))
+            low_water_mark = since
+
+    synced = 0
+    async with use_client(client) as client:
+        api_limit = await get_api_limit(client)
+
+        def window_pages(without_start_time: bool, end_after: datetime, end_before: datetime):
+            key_field = 'expected_start_time' if without_start_time else 'start_time'
+            read_page = _ended_runs_page_reader(client, states, end_after, end_before, without_start_time)
+            return keyset_pages(
+                read_page, attrgetter(key_field), EPOCH, end_before, api_limit,
+                sort="EXPECTED_START_TIME_ASC" if without_start_time else "START_TIME_ASC"
+            )
+
+        sources = [
+            partial(window_pages, without_start_time, *window)
+            for end_after, end_before in end_time_ranges
+            for without_start_time in (False, True)
+            for window in disjoint_time_windows(end_after, end_before, timedelta(hours=window_hours))
+        ]
+        # Las páginas de ventanas chicas se guardan juntas, en una transacción por página de la API
+        async for page in batched_pages(concurrent_pages(sources, max_concurrency), api_limit):
+            synced += store.upsert(page)
+
+    store.set_sync_range(low_water_mark, sync_started_at)
+
+    return synced
+
+
+def _ended_runs_page_reader(
+        client: PrefectClient,
+        states: Sequence[str],
+        end_after: datetime,
+        end_before: datetime,
+        without_start_time: bool
+    ):
+    # Ejecuciones terminadas en el rango de end_time, recorridas con cursor sobre su fecha de inicio
+    async def read_page(after_: datetime, before_: datetime, sort: str, limit: int, offset: int) -> list:
+        filters = {
+            'state': {'type': {'any_': list(states)}},
+            'end_time': {'after_': end_after, 'before_': end_before},
+        }
+        if without_start_time:
+            filters['start_time'] = {'is_null_': True}
+            filters['expected_start_time'] = {'after_': after_, 'before_': before_}
+        else:
+            # Prefect 3 compara start_time con coalesce(start_time, expected_start_time)
+            filters['start_time'] = {'after_': after_, 'before_': before_, 'is_null_': False}
+
+        return await client.read_flow_runs(
+            flow_run_filter=FlowRunFilter(**filters),
+            sort=sort,
+            limit=limit,
+            offset=offset
+        )
+
+    return read_page
+
+
+def _state_name(state: Union[str, StateType]) -> str:
+    return state.value if isinstance(state, StateType) else str(state).upper()
+
+
+def _to_micros(value: Optional[datetime]) -> Optional[int]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    delta = value - EPOCH
+    return (delta.days * 86_400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def _from_micros(value: Optional[int]) -> Optional[datetime]:
+    if value is None:
+        return None
+    return EPOCH + timedelta(microseconds=value)
+
+
+def _to_row(flow_run) -> tuple:
+    return (
+        str(flow_run.id),
+        flow_run.name,
+        _state_name(flow_run.state.type) if flow_run.state else None,
+        flow_run.state.message if flow_run.state else None,
+        _to_micros(flow_run.start_time or flow_run.expected_start_time),
+        _to_micros(flow_run.end_time),
+        flow_run.total_run_time.total_seconds() if flow_run.total_run_time is not None else None,
+        json.dumps(flow_run.parameters, default=str),
+        str(flow_run.flow_id),
+        str(flow_run.deployment_id) if flow_run.deployment_id else None,
+        _to_micros(flow_run.updated),
+    )
+
+
+def _from_row(row: tuple) -> dict:
+    values = dict(zip(_COLUMNS, row))
+    return {
+        "id": UUID(values["id"]),
+        "flow_run_name": values["flow_run_name"],
+        "state": {
+            "message": values["state_message"],
+            "type": StateType(values["state_type"]) if values["state_type"] else None
+        },
+        "start_time": _from_micros(values["start_time"]),
+        "end_time": _from_micros(values["end_time"]),
+        "total_duration": timedelta(seconds=values["total_duration"]) if values["total_duration"] is not None else None,
+        "parameters": json.loads(values["parameters"]) if values["parameters"] else {},
+        "flow_id": UUID(values["flow_id"]),
+        "deployment_id": UUID(values["deployment_id"]) if values["deployment_id"] else None,
+    }
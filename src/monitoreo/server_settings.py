@@ -0,0 +1,133 @@
+"""
+    Configuración del servidor de Prefect con caché.
+
+    La configuración del servidor (por ejemplo `PREFECT_API_DEFAULT_LIMIT`, usado como tamaño de página)
+    casi nunca cambia. Se consulta de forma asíncrona con el cliente compartido, se guarda en memoria con un TTL
+    y opcionalmente en disco para que los procesos nuevos arranquen sin consultar la API.
+
+    - `get_server_settings(client: PrefectClient = None, ttl_seconds: float, persist: bool) -> dict`:
+        Devuelve la configuración del servidor, desde la caché si está vigente.
+    - `get_api_limit(client: PrefectClient = None) -> int`:
+        Devuelve el límite de objetos por consulta de la API.
+    - `clear_settings_cache()`:
+        Descarta la configuración guardada en memoria y en disco.
+"""
+
+import asyncio
+import json
+import time
+import weakref
+from pathlib import Path
+from typing import Optional
+
+from prefect.client.orchestration import PrefectClient
+from prefect.settings import PREFECT_HOME
+
+from dev.MONITOREO_PREFECT.client_session import use_client
+
+DEFAULT_API_LIMIT = 200
+DEFAULT_SETTINGS_TTL_SECONDS = 3600
+
+_cached_settings: dict = {"settings": None, "fetched_at": 0.0}
+
+# Un lock por event loop para que consultas simultáneas no repitan la petición
+_locks: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Lock]" = weakref.WeakKeyDictionary()
+
+
+async def get_server_settings(
+        client: Optional[PrefectClient] = None,
+        ttl_seconds: float = DEFAULT_SETTINGS_TTL_SECONDS,
+        persist: bool = True
+    ) -> dict:
+    """
+    Obtiene la configuración del servidor de Prefect desde `/admin/settings`.
+
+    Parámetros:
+    - client (PrefectClient, opcional): Cliente a utilizar. Por defecto el cliente compartido o uno nuevo.
+    - ttl_seconds (float, opcional): Segundos que la configuración guardada se considera vigente.
+    - persist (bool, opcional): Si se lee y guarda la configuración en disco. Por defecto True.
+    Retorna:
+    - dict: Configuración del servidor.
+    """
+    settings = _read_memory(ttl_seconds)
+    if settings is not None:
+        return settings
+
+    loop = asyncio.get_running_loop()
+    lock = _locks.setdefault(loop, asyncio.Lock())
+
+    async with lock:
+        # Otra consulta pudo haber completado la caché mientras se esperaba el lock
+        settings = _read_memory(ttl_seconds)
+        if settings is not None:
+            return settings
+
+        disk_cache = _read_disk() if persist else None
+        if disk_cache and time.time() - disk_cache["fetched_at"] < ttl_seconds:
+            _cached_settings.update(disk_cache)
+            return disk_cache["settings"]
+
+        try:
+            async with use_client(client) as client:
+                response = await client._client.get("/admin/settings")  # pylint: disable=protected-access
+                response.raise_for_status()
+                settings = response.json()
+        except Exception as e:
+            # Si el servidor no responde se usa la última configuración conocida aunque esté vencida
+            if disk_cache:
+                _cached_settings.update(disk_cache)
+                return disk_cache["settings"]
+            raise Exception(f"Error fetching API settings: {str(e)}") from e
+
+        _cached_settings.update(settings=settings, fetched_at=time.time())
+        if persist:
+            _write_disk(_cached_settings)
+
+    return settings
+
+
+async def get_api_limit(client: Optional[PrefectClient] = None) -> int:
+    """Devuelve `PREFECT_API_DEFAULT_LIMIT` del servidor, usado como tamaño de página en las consultas."""
+    settings = await get_server_settings(client)
+    return settings.get('PREFECT_API_DEFAULT_LIMIT', DEFAULT_API_LIMIT)
+
+
+def settings_cache_path() -> Path:
+    """Ruta de la configuración guardada en disco. Se resuelve en cada uso para respetar el PREFECT_HOME vigente."""
+    return Path(PREFECT_HOME.value()) / "monitoreo" / "server_settings.json"
+
+
+def clear_settings_cache() -> None:
+    """Descarta la configuración guardada en memoria y en disco."""
+    _cached_settings.update(settings=None, fetched_at=0.0)
+    settings_cache_path().unlink(missing_ok=True)
+
+
+def _read_memory(ttl_seconds: float) -> Optional[dict]:
+    if _cached_settings["settings"] is None:
+        return None
+    if time.time() - _cached_settings["fetched_at"] >= ttl_seconds:
+        return None
+    return _cached_settings["settings"]
+
+
+def _read_disk() -> Optional[dict]:
+    try:
+        with open(settings_cache_path(), 'r', encoding='utf-8') as file:
+            data = json.load(file)
+        return {"settings": data["settings"], "fetched_at": float(data["fetched_at"])}
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def _write_disk(data: dict) -> None:
+    try:
+        cache_path = settings_cache_path()
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = cache_path.with_suffix(".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            json.dump(data, file)
+        temp_path.replace(cache_path)
+    except OSError:
+        # La caché en disco es una optimización, si no se puede escribir se sigue solo con memoria
+        pass
@@ -1,159 +1,284 @@
 """
 Script de monitoreo para detener ejecuciones congeladas o pausadas.
+
+- `watchdog`: flujo programado que busca y cancela ejecuciones demoradas o de larga duración en cada ejecución.
+- `watchdog_events`: flujo de larga duración que sigue los eventos de cambio de estado y cancela cada ejecución
+  en el momento en que supera su umbral, sin esperar a la próxima ejecución programada.
 """
 
 import os
 import asyncio
+import heapq
+from typing import Awaitable, Callable, Optional
 from datetime import datetime, timedelta, timezone
+from operator import attrgetter
 from uuid import UUID
 
-from prefect import State, runtime, flow, get_client, task
+import httpx
+from prefect import State, runtime, flow, task
 from prefect.server.schemas.filters import (
     FlowRunFilter,
     FlowRunFilterState,
     FlowRunFilterStateType,
-    FlowRunFilterStartTime,
-    FlowRunFilterExpectedStartTime,
 )
 from prefect.server.schemas.states import StateType
 from prefect.client.schemas.actions import LogCreate
 from prefect.client.orchestration import PrefectClient
+from prefect.client.schemas.objects import FlowRun
 from prefect.states import Cancelled
 
 from consulterscommons.log_tools import PrefectLogger
 
+from dev.MONITOREO_PREFECT.client_session import client_session, use_client
+from dev.MONITOREO_PREFECT.server_settings import get_api_limit
+from dev.MONITOREO_PREFECT.pagination import keyset_paginate, unique_by_id, chunked
+from dev.MONITOREO_PREFECT.flow_run_events import flow_run_event_stream, FlowRunStateEvent
+
 logger_prefect = PrefectLogger(__file__)
 
 CURRENT_FLOW_RUN = None
 UI_URL = ""
 
-@task(timeout_seconds=30)
-async def find_long_running_flows(threshold_hours: float) -> list[UUID]:
-    # threshold_hours = 0.0001 # Prueba para probar que no encuentre otro watchdog
+# Inicio del cursor de paginación: se buscan todas las ejecuciones anteriores al umbral
+SCAN_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
 
-    async with get_client() as client:
-        flow_runs = await client.read_flow_runs(
-            flow_run_filter=FlowRunFilter(
-                state=FlowRunFilterState(
-                    type=FlowRunFilterStateType(any_=[StateType.RUNNING]),
-                ),
-                start_time=FlowRunFilterStartTime(
-                    before_=datetime.now(timezone.utc) -
-                    timedelta(hours=threshold_hours),
-                ),
-            )
-        )
+# Cancelaciones simultáneas, reintentos ante errores transitorios y espera base entre reintentos
+DEFAULT_CANCEL_CONCURRENCY = 16
+DEFAULT_CANCEL_RETRIES = 3
+RETRY_BACKOFF_SECONDS = 0.5
+
+# Modo por eventos: cada cuántos minutos se vuelve a leer el estado completo desde la API
+# (cubre eventos perdidos y ejecuciones programadas más allá del horizonte) y cantidad de IDs por consulta
+DEFAULT_RESYNC_MINUTES = 60
+EVENTS_CHUNK_SIZE = 100
+
+STALE = "stale"
+LONG_RUNNING = "long_running"
+
+
+@task
+async def scan_flow_runs(
+        stale_threshold_hours: float,
+        long_running_threshold_hours: float
+    ) -> tuple[list[FlowRun], list[FlowRun]]:
+    """
+    Busca en una sola etapa los flujos programados con alta demora y los flujos en ejecución de larga duración.
+
+    Ambas consultas se hacen en paralelo y se paginan completas, por lo que no quedan limitadas
+    al límite por defecto del servidor aunque haya miles de ejecuciones acumuladas.
+    Los candidatos se clasifican en una sola pasada, excluyendo la ejecución actual del watchdog.
+
+    Args:
+        stale_threshold_hours (float): horas de demora desde la fecha programada para considerar un flujo demorado.
+        long_running_threshold_hours (float): horas en ejecución para considerar un flujo de larga duración.
 
+    Returns:
+        tuple[list[FlowRun], list[FlowRun]]: flujos demorados y flujos de larga duración.
+    """
     logger = logger_prefect.obtener_logger_prefect()
 
-    filtered_flows = flow_runs.copy()
-    for flow_run in flow_runs:
+    now = datetime.now(timezone.utc)
+    stale_cutoff = now - timedelta(hours=stale_threshold_hours)
+    long_running_cutoff = now - timedelta(hours=long_running_threshold_hours)
+
+    async with use_client() as client:
+        limit = await get_api_limit(client)
+
+        candidates = await asyncio.gather(
+            keyset_paginate(
+                flow_runs_page_reader(client, StateType.SCHEDULED, 'expected_start_time'),
+                attrgetter('expected_start_time'), SCAN_EPOCH, stale_cutoff, limit,
+                sort="EXPECTED_START_TIME_ASC"
+            ),
+            keyset_paginate(
+                flow_runs_page_reader(client, StateType.RUNNING, 'start_time'),
+                attrgetter('start_time'), SCAN_EPOCH, long_running_cutoff, limit,
+                sort="START_TIME_ASC"
+            ),
+        )
+
+    stale_flows = []
+    long_running_flows = []
+    for flow_run in unique_by_id(run for runs in candidates for run in runs):
         if CURRENT_FLOW_RUN.id == str(flow_run.id):
-            filtered_flows.remove(flow_run)
             logger.info(
                 # "El ID %s es el del Watchdog actual. No se cancelará.", str(flow_run.flow_id))
                 "El ID %s es el del Watchdog actual. No se cancelara.", str(flow_run.flow_id))
+            continue
+
+        state_type = flow_run.state.type if flow_run.state else None
+        if state_type == StateType.SCHEDULED and flow_run.expected_start_time <= stale_cutoff:
+            stale_flows.append(flow_run)
+        elif state_type == StateType.RUNNING and flow_run.start_time and flow_run.start_time <= long_running_cutoff:
+            long_running_flows.append(flow_run)
 
     logger.info(
-        # f"Se encontraron {len(filtered_flows)} flujos de larga duración (> {threshold_hours} horas) "
-        f"Se encontraron {len(filtered_flows)} flujos de larga duracion (> {threshold_hours} horas) "
-        + "\n ".join([f"{flow_run.name} ({flow_run.id})" for flow_run in filtered_flows])
+        f"Se encontraron {len(stale_flows)} flujos con alta demora (> {stale_threshold_hours} horas) "
+        + "\n ".join([f"{flow_run.name} ({flow_run.id})" for flow_run in stale_flows])
+    )
+    logger.info(
+        # f"Se encontraron {len(long_running_flows)} flujos de larga duración (> {long_running_threshold_hours} horas) "
+        f"Se encontraron {len(long_running_flows)} flujos de larga duracion (> {long_running_threshold_hours} horas) "
+        + "\n ".join([f"{flow_run.name} ({flow_run.id})" for flow_run in long_running_flows])
     )
 
-    return [flow_run.id for flow_run in filtered_flows]
+    return stale_flows, long_running_flows
 
 
-@task#(timeout_seconds=30)
-async def find_stale_flows(threshhold_hours: float) -> list[UUID]:
-    # await asyncio.sleep(20)
-    async with get_client() as client:
-        flow_runs = await client.read_flow_runs(
+def flow_runs_page_reader(client: PrefectClient, state_type: StateType, cursor_field: str):
+    """
+    Construye la función de lectura de páginas de `keyset_paginate` para ejecuciones en un estado,
+    filtradas y ordenadas por el campo de fecha `cursor_field`.
+    """
+    async def read_page(after_: datetime, before_: datetime, sort: str, limit: int, offset: int) -> list[FlowRun]:
+        return await client.read_flow_runs(
             flow_run_filter=FlowRunFilter(
                 state=FlowRunFilterState(
-                    type=FlowRunFilterStateType(any_=[StateType.SCHEDULED]),
+                    type=FlowRunFilterStateType(any_=[state_type]),
                 ),
-                expected_start_time=FlowRunFilterExpectedStartTime(
-                    before_=datetime.now(timezone.utc) -
-                    timedelta(hours=threshhold_hours),
-                ),
-            )
+                **{cursor_field: {'after_': after_, 'before_': before_}},
+            ),
+            sort=sort,
+            limit=limit,
+            offset=offset
         )
 
-    logger = logger_prefect.obtener_logger_prefect()
+    return read_page
 
-    filtered_flows = flow_runs.copy()
-    for flow_run in flow_runs:
-        if CURRENT_FLOW_RUN.id == str(flow_run.id):
-            filtered_flows.remove(flow_run)
-            logger.info(
-                # "El ID %s es el del Watchdog actual. No se cancelará.", str(flow_run.flow_id))
-                "El ID %s es el del Watchdog actual. No se cancelara.", str(flow_run.flow_id))
 
-    logger.info(
-        f"Se encontraron {len(filtered_flows)} flujos con alta demora (> {threshhold_hours} horas) "
-        + "\n ".join([f"{flow_run.name} ({flow_run.id})" for flow_run in filtered_flows])
-    )
+@task#(timeout_seconds=20)
+async def cancel_flow_runs(
+        flow_runs: list[FlowRun],
+        max_concurrency: int = DEFAULT_CANCEL_CONCURRENCY,
+        retries: int = DEFAULT_CANCEL_RETRIES
+    ) -> list[UUID]:
+    """
+    Cancela un lote de ejecuciones de flujo en paralelo con concurrencia limitada.
 
-    return [flow_run.id for flow_run in filtered_flows]
+    Los avisos de cancelación se envían en una sola llamada a `create_logs` y las confirmaciones en otra.
+    Los tags se toman de las ejecuciones obtenidas en la búsqueda, sin volver a leerlas,
+    y el tag del watchdog actual se actualiza una sola vez al final. Los errores transitorios se reintentan.
 
+    Args:
+        flow_runs (list[FlowRun]): ejecuciones a cancelar.
+        max_concurrency (int): cantidad máxima de cancelaciones simultáneas.
+        retries (int): reintentos por llamada ante errores transitorios.
 
-@task#(timeout_seconds=20)
-async def cancel_flow_runs(flow_run_id: UUID):
+    Returns:
+        list[UUID]: IDs de las ejecuciones canceladas.
+    """
     logger = logger_prefect.obtener_logger_prefect()
 
+    if not flow_runs:
+        return []
+
     url_current_flow = CURRENT_FLOW_RUN.ui_url
-    url_cancelled_flow = UI_URL + str(flow_run_id)
     # msg_visita = "Visita el siguiente enlace para más información\n"
     msg_visita = "Visita el siguiente enlace para mas informacion\n"
 
     state = State(type=StateType.CANCELLED,
                   message=f"Cancelado por watchdog debido a alta duracion. {msg_visita}{url_current_flow}")
 
-    async with get_client() as client:
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async with use_client() as client:
+
+        async def cancel(flow_run: FlowRun) -> bool:
+            async with semaphore:
+                logger.info("Cancelando flujo de ID: %s", flow_run.id)
+
+                result_state = await with_retries(
+                    lambda: client.set_flow_run_state(flow_run.id, state, force=True), retries)
+
+                if str(result_state.status) != 'SetStateStatus.ACCEPT':
+                    logger.warning("No se acepto la cancelacion del flujo de ID: %s", flow_run.id)
+                    return False
+
+                logger.info("Flujo cancelado de ID: %s. %s%s", flow_run.id, msg_visita, UI_URL + str(flow_run.id))
+                await with_retries(
+                    lambda: client.update_flow_run(
+                        flow_run_id=flow_run.id, tags=list(flow_run.tags) + ["Cancelado por Watchdog"]),
+                    retries
+                )
+                return True
+
+        # await send_logs(client, flow_run_ids, f"Se cancelará la ejecución por Watchdog con ID: {CURRENT_FLOW_RUN.id}. {msg_visita}{url_current_flow}")
+        await with_retries(lambda: send_logs(
+            client,
+            [flow_run.id for flow_run in flow_runs],
+            f"Se cancelara la ejecucion por Watchdog con ID: {CURRENT_FLOW_RUN.id}. {msg_visita}{url_current_flow}"
+        ), retries)
+
+        results = await asyncio.gather(*(cancel(flow_run) for flow_run in flow_runs), return_exceptions=True)
+
+        cancelled_ids = []
+        for flow_run, result in zip(flow_runs, results):
+            if isinstance(result, Exception):
+                logger.error("Error cancelando el flujo de ID %s: %s", flow_run.id, result)
+            elif result:
+                cancelled_ids.append(flow_run.id)
+
+        if cancelled_ids:
+            await with_retries(lambda: send_logs(
+                client, cancelled_ids, f"Ejecucion cancelada por Watchdog con ID: {CURRENT_FLOW_RUN.id}"
+            ), retries)
 
-        logger.info("Cancelando flujo de ID: %s", flow_run_id)
+            await with_retries(lambda: client.update_flow_run(
+                flow_run_id=CURRENT_FLOW_RUN.id, tags=list(CURRENT_FLOW_RUN.tags) + ["Cancelo un flow"]
+            ), retries)
 
-        flow_run_to_cancel = await client.read_flow_run(flow_run_id)
-        # await send_log(client, flow_run_id, f"Se cancelará la ejecución por Watchdog con ID: {CURRENT_FLOW_RUN.id}. {msg_visita}{url_current_flow}")
-        await send_log(client, flow_run_id, f"Se cancelara la ejecucion por Watchdog con ID: {CURRENT_FLOW_RUN.id}. {msg_visita}{url_current_flow}")
+    logger.info("Se cancelaron %s de %s flujos.", len(cancelled_ids), len(flow_runs))
 
-        result_state = await client.set_flow_run_state(flow_run_id, state, force=True)
+    return cancelled_ids
 
-        if str(result_state.status) == 'SetStateStatus.ACCEPT':
-            logger.info("Flujo cancelado de ID: %s. %s%s", flow_run_id, msg_visita, url_cancelled_flow)
-            await send_log(client, flow_run_id, f"Ejecucion cancelada por Watchdog con ID: {CURRENT_FLOW_RUN.id}")
 
-            await client.update_flow_run(flow_run_id=CURRENT_FLOW_RUN.id, tags=list(CURRENT_FLOW_RUN.tags + ["Cancelo un flow"]))
-            await client.update_flow_run(flow_run_id=flow_run_id, tags=list(flow_run_to_cancel.tags + ["Cancelado por Watchdog"]))
+async def with_retries(call: Callable[[], Awaitable], retries: int = DEFAULT_CANCEL_RETRIES):
+    """
+    Ejecuta `call()` reintentando con espera exponencial ante errores transitorios de red
+    o respuestas 429 y 5xx del servidor.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return await call()
+        except (httpx.TransportError, httpx.HTTPStatusError) as e:
+            transient = (
+                isinstance(e, httpx.TransportError)
+                or e.response.status_code == 429
+                or e.response.status_code >= 500
+            )
+            if not transient or attempt == retries:
+                raise
+            await asyncio.sleep(RETRY_BACKOFF_SECONDS * 2 ** attempt)
 
 
-async def send_log(client: PrefectClient, flow_run_id: UUID, message: str):
+async def send_logs(client: PrefectClient, flow_run_ids: list[UUID], message: str):
     """
-    Función para enviar un log a un flujo externo antes de cancelarlo.
+    Función para enviar un log a varios flujos externos antes de cancelarlos, en una sola llamada.
 
     Args:
         client (PrefectClient): cliente obtenido a partir de 'async with get_cliente() as client'.
-        flow_run_id (UUID): flujo en el que se loggeara el mensaje
-        message (str): mensaje a loggear en el flujo.
+        flow_run_ids (list[UUID]): flujos en los que se loggeara el mensaje
+        message (str): mensaje a loggear en los flujos.
     """
-    log_cancelacion = LogCreate(
+    timestamp = datetime.now(tz=timezone.utc)
+    logs_cancelacion = [
+        LogCreate(
                 name="Watchdog-Logger",
                 level=30, # Warning
                 message=message,
-                timestamp=datetime.now(tz=timezone.utc),
+                timestamp=timestamp,
                 flow_run_id=flow_run_id
         )
-    await client.create_logs(logs=[log_cancelacion])
+        for flow_run_id in flow_run_ids
+    ]
+    await client.create_logs(logs=logs_cancelacion)
 
 
 @flow(name="Watchdog")#, timeout_seconds=60)
 async def watchdog(stale_threshold_hours: float = 12, long_running_threshold_hours: float = 1):
     logger = logger_prefect.obtener_logger_prefect()
 
-    global CURRENT_FLOW_RUN # pylint: disable=global-statement
-    CURRENT_FLOW_RUN = runtime.flow_run # pylint: disable=redefined-outer-name, invalid-name
-    global UI_URL # pylint: disable=global-statement
-    UI_URL = os.path.dirname(CURRENT_FLOW_RUN.ui_url) + "/" if CURRENT_FLOW_RUN.ui_url is not None else 'http://127.0.0.2:5000/flow-runs/flow-run/'  # pylint: disable=redefined-outer-name, invalid-name
+    set_current_flow_run()
 
     # logger.info("----------------------------------")
 
@@ -165,12 +290,13 @@ async def watchdog(stale_threshold_hours: float = 12, long_running_threshold_hou
         # Si empezó más de 30 minutos despues de que se programó entonces no se debe ejecutar
         # debido a que otro run de watchdog se hará cargo
         if time_difference < timedelta(minutes=30):
-            # stale_flows = await asyncio.wait_for(find_stale_flows(stale_threshold_hours), timeout=10) # Alternativa para limitar segundos
-            stale_flows = await find_stale_flows(stale_threshold_hours)
-            await cancel_flow_runs.map(stale_flows)
+            # Una sola sesión con pool de conexiones para todas las consultas del watchdog
+            async with client_session():
+                # Una sola etapa de búsqueda para flujos demorados y de larga duración
+                stale_flows, long_running_flows = await scan_flow_runs(
+                    stale_threshold_hours, long_running_threshold_hours)
 
-            long_running_flows = await find_long_running_flows(long_running_threshold_hours)
-            await cancel_flow_runs.map(long_running_flows)
+                await cancel_flow_runs(stale_flows + long_running_flows)
         else:
             # logger.info("El flujo estaba demorado por lo que se cancelo.")
             logger.info("El flujo estaba demorado por lo que se cancelo.")
@@ -185,5 +311,239 @@ async def watchdog(stale_threshold_hours: float = 12, long_running_threshold_hou
         logger.info("Se produjo un error:\n%s", e)
         return Cancelled(message=f"Se produjo un error: {e}")
 
+class RunTimers:
+    """
+    Vencimientos pendientes por ejecución de flujo, ordenados en un heap por fecha.
+
+    Cada ejecución tiene a lo sumo un vencimiento vigente con su tipo (`STALE` o `LONG_RUNNING`).
+    Al reemplazar o descartar un vencimiento la entrada vieja queda en el heap y se ignora al salir.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[datetime, UUID, str]] = []
+        self._deadlines: dict[UUID, tuple[datetime, str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def set(self, flow_run_id: UUID, deadline: datetime, kind: str) -> None:
+        """Programa el vencimiento de una ejecución. Si ya tenía uno del mismo tipo se conserva el más temprano."""
+        current = self._deadlines.get(flow_run_id)
+        if current is not None and current[1] == kind and current[0] <= deadline:
+            return
+        self._deadlines[flow_run_id] = (deadline, kind)
+        heapq.heappush(self._heap, (deadline, flow_run_id, kind))
+
+    def discard(self, flow_run_id: UUID) -> None:
+        self._deadlines.pop(flow_run_id, None)
+
+    def next_deadline(self) -> Optional[datetime]:
+        self._drop_stale_entries()
+        return self._heap[0][0] if self._heap else None
+
+    def pop_due(self, now: datetime) -> list[tuple[UUID, str]]:
+        """Quita y devuelve las ejecuciones vencidas hasta `now` con el tipo de vencimiento."""
+        due = []
+        while self.next_deadline() is not None and self._heap[0][0] <= now:
+            _, flow_run_id, kind = heapq.heappop(self._heap)
+            del self._deadlines[flow_run_id]
+            due.append((flow_run_id, kind))
+        return due
+
+    def _drop_stale_entries(self) -> None:
+        while self._heap:
+            deadline, flow_run_id, kind = self._heap[0]
+            if self._deadlines.get(flow_run_id) == (deadline, kind):
+                return
+            heapq.heappop(self._heap)
+
+
+def set_current_flow_run() -> None:
+    """Guarda la ejecución actual del watchdog y la URL base de la UI para los mensajes de cancelación."""
+    global CURRENT_FLOW_RUN # pylint: disable=global-statement
+    CURRENT_FLOW_RUN = runtime.flow_run # pylint: disable=redefined-outer-name, invalid-name
+    global UI_URL # pylint: disable=global-statement
+    UI_URL = os.path.dirname(CURRENT_FLOW_RUN.ui_url) + "/" if CURRENT_FLOW_RUN.ui_url is not None else 'http://127.0.0.2:5000/flow-runs/flow-run/'  # pylint: disable=redefined-outer-name, invalid-name
+
+
+def schedule_timer(
+        timers: RunTimers,
+        flow_run: FlowRun,
+        stale_threshold: timedelta,
+        long_running_threshold: timedelta
+    ) -> None:
+    """Programa o descarta el vencimiento de una ejecución según su estado actual."""
+    if CURRENT_FLOW_RUN.id == str(flow_run.id):
+        return
+
+    state_type = flow_run.state.type if flow_run.state else None
+    if state_type == StateType.SCHEDULED and flow_run.expected_start_time:
+        timers.set(flow_run.id, flow_run.expected_start_time + stale_threshold, STALE)
+    elif state_type == StateType.RUNNING and flow_run.start_time:
+        timers.set(flow_run.id, flow_run.start_time + long_running_threshold, LONG_RUNNING)
+    else:
+        timers.discard(flow_run.id)
+
+
+async def seed_timers(
+        client: PrefectClient,
+        timers: RunTimers,
+        stale_threshold: timedelta,
+        long_running_threshold: timedelta,
+        horizon: timedelta
+    ) -> None:
+    """
+    Lee desde la API todas las ejecuciones en curso y las programadas hasta `horizon` y programa sus vencimientos.
+    """
+    now = datetime.now(timezone.utc)
+    limit = await get_api_limit(client)
+
+    scheduled, running = await asyncio.gather(
+        keyset_paginate(
+            flow_runs_page_reader(client, StateType.SCHEDULED, 'expected_start_time'),
+            attrgetter('expected_start_time'), SCAN_EPOCH, now + horizon, limit,
+            sort="EXPECTED_START_TIME_ASC"
+        ),
+        keyset_paginate(
+            flow_runs_page_reader(client, StateType.RUNNING, 'start_time'),
+            attrgetter('start_time'), SCAN_EPOCH, now, limit,
+            sort="START_TIME_ASC"
+        ),
+    )
+
+    for flow_run in scheduled + running:
+        schedule_timer(timers, flow_run, stale_threshold, long_running_threshold)
+
+
+async def read_flow_runs_by_id(client: PrefectClient, flow_run_ids: list[UUID]) -> list[FlowRun]:
+    """Lee el estado actual de muchas ejecuciones con consultas `any_` por lotes."""
+    pages = await asyncio.gather(*(
+        client.read_flow_runs(flow_run_filter=FlowRunFilter(id={'any_': chunk}), limit=len(chunk))
+        for chunk in chunked(flow_run_ids, EVENTS_CHUNK_SIZE)
+    ))
+    return [flow_run for page in pages for flow_run in page]
+
+
+async def apply_events(
+        client: PrefectClient,
+        timers: RunTimers,
+        events: list[FlowRunStateEvent],
+        stale_threshold: timedelta,
+        long_running_threshold: timedelta
+    ) -> None:
+    """
+    Actualiza los vencimientos con un lote de eventos de cambio de estado.
+    Los eventos de ejecuciones que pasan a Running usan la fecha del evento como inicio. La fecha programada
+    no viaja en el evento, por lo que las ejecuciones que pasan a Scheduled se leen por lote desde la API.
+    """
+    scheduled_ids = set()
+    for event in events:
+        if CURRENT_FLOW_RUN.id == str(event.flow_run_id):
+            continue
+        if event.state_type == StateType.RUNNING:
+            scheduled_ids.discard(event.flow_run_id)
+            timers.set(event.flow_run_id, event.occurred + long_running_threshold, LONG_RUNNING)
+        elif event.state_type == StateType.SCHEDULED:
+            scheduled_ids.add(event.flow_run_id)
+        else:
+            scheduled_ids.discard(event.flow_run_id)
+            timers.discard(event.flow_run_id)
+
+    if scheduled_ids:
+        for flow_run in await read_flow_runs_by_id(client, list(scheduled_ids)):
+            schedule_timer(timers, flow_run, stale_threshold, long_running_threshold)
+
+
+async def cancel_due_runs(
+        client: PrefectClient,
+        timers: RunTimers,
+        due: list[tuple[UUID, str]],
+        stale_threshold: timedelta,
+        long_running_threshold: timedelta
+    ) -> None:
+    """
+    Confirma con la API que las ejecuciones vencidas siguen en el mismo estado y las cancela.
+    Las que cambiaron de estado sin que llegara el evento vuelven a programarse con su estado actual.
+    """
+    logger = logger_prefect.obtener_logger_prefect()
+
+    now = datetime.now(timezone.utc)
+    kinds = dict(due)
+    to_cancel = []
+    for flow_run in await read_flow_runs_by_id(client, list(kinds)):
+        state_type = flow_run.state.type if flow_run.state else None
+        if kinds[flow_run.id] == STALE and state_type == StateType.SCHEDULED \
+                and flow_run.expected_start_time + stale_threshold <= now:
+            to_cancel.append(flow_run)
+        elif kinds[flow_run.id] == LONG_RUNNING and state_type == StateType.RUNNING \
+                and flow_run.start_time and flow_run.start_time + long_running_threshold <= now:
+            to_cancel.append(flow_run)
+        else:
+            schedule_timer(timers, flow_run, stale_threshold, long_running_threshold)
+
+    if to_cancel:
+        logger.info(
+            "Se superaron los umbrales de %s flujos: %s",
+            len(to_cancel), ", ".join(f"{flow_run.name} ({flow_run.id})" for flow_run in to_cancel)
+        )
+        await cancel_flow_runs(to_cancel)
+
+
+@flow(name="Watchdog por eventos")
+async def watchdog_events(
+        stale_threshold_hours: float = 12,
+        long_running_threshold_hours: float = 1,
+        resync_minutes: float = DEFAULT_RESYNC_MINUTES,
+        max_runtime_hours: Optional[float] = None
+    ):
+    """
+    Watchdog de larga duración guiado por eventos.
+
+    Al iniciar lee las ejecuciones en curso y programadas y mantiene en memoria el vencimiento de cada una
+    (fecha programada + `stale_threshold_hours` o inicio + `long_running_threshold_hours`). Luego se suscribe
+    a los eventos de cambio de estado para actualizar los vencimientos y cancela cada ejecución en cuanto vence,
+    en lugar de esperar al próximo ciclo de 30 minutos del watchdog programado.
+    Cada `resync_minutes` vuelve a leer el estado desde la API para cubrir eventos perdidos.
+
+    Args:
+        stale_threshold_hours (float): horas de demora desde la fecha programada para cancelar un flujo.
+        long_running_threshold_hours (float): horas en ejecución para cancelar un flujo.
+        resync_minutes (float): minutos entre lecturas completas del estado desde la API.
+        max_runtime_hours (float, opcional): horas tras las cuales el flujo termina. Por defecto corre indefinidamente.
+    """
+    logger = logger_prefect.obtener_logger_prefect()
+
+    set_current_flow_run()
+
+    stale_threshold = timedelta(hours=stale_threshold_hours)
+    long_running_threshold = timedelta(hours=long_running_threshold_hours)
+    resync_interval = timedelta(minutes=resync_minutes)
+    stop_at = datetime.now(timezone.utc) + timedelta(hours=max_runtime_hours) if max_runtime_hours else None
+
+    timers = RunTimers()
+
+    # La suscripción queda conectada antes de la primera lectura para no perder cambios ocurridos mientras se lee.
+    # Si se corta por un error, se propaga para que la ejecución falle y se reinicie
+    async with client_session() as client, flow_run_event_stream() as events:
+        next_resync = datetime.now(timezone.utc)
+
+        while stop_at is None or datetime.now(timezone.utc) < stop_at:
+            now = datetime.now(timezone.utc)
+            if now >= next_resync:
+                await seed_timers(client, timers, stale_threshold, long_running_threshold, 2 * resync_interval)
+                next_resync = now + resync_interval
+                logger.info("Vencimientos programados: %s ejecuciones.", len(timers))
+
+            due = timers.pop_due(now)
+            if due:
+                await cancel_due_runs(client, timers, due, stale_threshold, long_running_threshold)
+
+            # Se espera al próximo evento, vencimiento o relectura, lo que ocurra primero
+            wake_at = min(filter(None, (next_resync, timers.next_deadline(), stop_at)))
+            timeout = max((wake_at - datetime.now(timezone.utc)).total_seconds(), 0)
+            batch = await events.next_batch(timeout)
+            if batch:
+                await apply_events(client, timers, batch, stale_threshold, long_running_threshold)
+
 if __name__ == "__main__":
     asyncio.run(watchdog())
\ No newline at end of file
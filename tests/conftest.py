@@ -0,0 +1,16 @@
+"""
+    Los módulos del monitoreo se importan como `dev.MONITOREO_PREFECT.*`, la ruta con la que se despliegan.
+    Para las pruebas se registra ese paquete apuntando a `src/monitoreo`.
+"""
+
+import sys
+import types
+from pathlib import Path
+
+MONITOREO_PATH = Path(__file__).resolve().parents[1] / "src" / "monitoreo"
+
+for name, path in (("dev", []), ("dev.MONITOREO_PREFECT", [str(MONITOREO_PATH)])):
+    if name not in sys.modules:
+        module = types.ModuleType(name)
+        module.__path__ = path
+        sys.modules[name] = module
@@ -0,0 +1,105 @@
+import asyncio
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+pytest.importorskip("prefect")
+pytest.importorskip("lucasdp")
+
+import pytz
+from prefect.settings import PREFECT_HOME, temporary_settings
+
+from dev.MONITOREO_PREFECT.benchmarks.fake_api import FakePrefectApi, fake_api_session
+from dev.MONITOREO_PREFECT.benchmarks.workload import Workload, WorkloadConfig
+from dev.MONITOREO_PREFECT.db_cleanup import db_cleanup as cleanup
+
+
+@pytest.fixture(autouse=True)
+def prefect_home(tmp_path):
+    with temporary_settings({PREFECT_HOME: tmp_path}):
+        yield tmp_path
+
+
+@pytest.fixture
+def workload():
+    return Workload(WorkloadConfig(flow_runs=300, days=2, collision_ratio=0))
+
+
+def localized(value):
+    return pytz.utc.localize(value.replace(tzinfo=None))
+
+
+def run_cleanup(api, fecha_inicio, fecha_fin):
+    async def run():
+        async with fake_api_session(api):
+            await cleanup.db_cleanup.fn(
+                fecha_inicio.replace(tzinfo=None), fecha_fin.replace(tzinfo=None), timezone_str="UTC"
+            )
+
+    asyncio.run(run())
+
+
+def test_rate_limiter_spaces_concurrent_operations():
+    started_at = time.monotonic()
+    rate_limiter = cleanup.RateLimiter(50)
+    acquired = []
+
+    async def acquire():
+        await rate_limiter.acquire()
+        acquired.append(time.monotonic())
+
+    async def run():
+        await asyncio.gather(*(acquire() for _ in range(6)))
+
+    asyncio.run(run())
+
+    # Cada operación espera su turno: la i-ésima no pasa antes de i intervalos (el retraso del event loop
+    # puede demorarlas pero nunca adelantarlas)
+    tolerance = 0.002
+    assert all(
+        acquired_at - started_at >= index * rate_limiter.interval - tolerance
+        for index, acquired_at in enumerate(sorted(acquired))
+    )
+
+    with pytest.raises(ValueError):
+        cleanup.RateLimiter(0)
+
+
+def test_interrupted_cleanup_resumes_from_the_checkpoint_of_its_range(workload, monkeypatch):
+    api = FakePrefectApi.from_workload(workload, page_limit=25)
+    fecha_inicio, fecha_fin = workload.start_date, workload.start_date + timedelta(days=1)
+    in_range = {
+        flow_run_id for flow_run_id, flow_run in api.flow_runs.items()
+        if fecha_inicio <= (flow_run["start_time"] or flow_run["expected_start_time"]) <= fecha_fin
+    }
+
+    # Checkpoint de otra limpieza interrumpida: no debe tocarse
+    other_range = (localized(datetime(2020, 1, 1)), localized(datetime(2020, 1, 2)))
+    cleanup.save_checkpoint(cleanup.new_checkpoint(*other_range))
+
+    delete_flow_runs = cleanup.delete_flow_runs
+    batches = []
+
+    async def interrupted_delete(client, flow_run_ids, *args):
+        if batches:
+            raise RuntimeError("se cortó la conexión")
+        batches.append(flow_run_ids)
+        return await delete_flow_runs(client, flow_run_ids, *args)
+
+    monkeypatch.setattr(cleanup, "delete_flow_runs", interrupted_delete)
+    with pytest.raises(RuntimeError):
+        run_cleanup(api, fecha_inicio, fecha_fin)
+    monkeypatch.undo()
+
+    checkpoint = cleanup.load_checkpoint(localized(fecha_inicio), localized(fecha_fin))
+    assert checkpoint["deleted"] == len(batches[0]) < len(in_range)
+
+    deletes_before = api.stats.requests["DELETE /flow_runs/{id}"]
+    run_cleanup(api, fecha_inicio, fecha_fin)
+
+    assert not in_range & set(api.flow_runs)
+    # Se retoma después de la primera página: ninguna ejecución se vuelve a eliminar
+    assert api.stats.requests["DELETE /flow_runs/{id}"] - deletes_before == len(in_range) - len(batches[0])
+    assert cleanup.load_checkpoint(localized(fecha_inicio), localized(fecha_fin)) is None
+    assert cleanup.load_checkpoint(*other_range) is not None
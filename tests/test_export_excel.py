@@ -0,0 +1,55 @@
+from datetime import datetime
+from uuid import uuid4
+
+import pandas as pd
+import pytest
+
+openpyxl = pytest.importorskip("openpyxl")
+
+from dev.MONITOREO_PREFECT.periodic_report.export_excel import (
+    DATETIME_STYLE,
+    EXCEL_COLUMNS,
+    HEADER_STYLE,
+    export_failed_flow_runs_xlsx,
+)
+
+
+def failed_flow_runs() -> pd.DataFrame:
+    return pd.DataFrame({
+        'id': [uuid4(), uuid4()],
+        'flow_name': ['carga', 'limpieza'],
+        'flow_run_name': ['run-1', 'run-2'],
+        'state_type': pd.Categorical(['FAILED', 'CRASHED']),
+        'state_message': ['falló', None],
+        # Con zona horaria de Buenos Aires (UTC-3): se exporta en UTC sin zona
+        'start_time': pd.to_datetime(['2024-09-01 10:00', '2024-09-02 08:30']).tz_localize('America/Argentina/Buenos_Aires'),
+        'end_time': pd.to_datetime(['2024-09-01 10:05', None]).tz_localize('America/Argentina/Buenos_Aires'),
+        'ui_url': ['http://ui/1', 'http://ui/2'],
+    })
+
+
+def test_export_writes_styled_header_utc_dates_and_frozen_header(tmp_path):
+    flow_runs = failed_flow_runs()
+    path = export_failed_flow_runs_xlsx(flow_runs, str(tmp_path / "fallidos.xlsx"))
+
+    sheet = openpyxl.load_workbook(path)['Flujos fallidos']
+    rows = list(sheet.iter_rows())
+
+    # Solo las columnas presentes en el DataFrame, en el orden de EXCEL_COLUMNS
+    columns = [(name, title, width) for name, title, width in EXCEL_COLUMNS if name in flow_runs.columns]
+    assert [cell.value for cell in rows[0]] == [title for _, title, _ in columns]
+    assert all(cell.style == HEADER_STYLE and cell.font.bold and cell.fill.fgColor.rgb == '006DBF6E' for cell in rows[0])
+    assert [sheet.column_dimensions[cell.column_letter].width for cell in rows[0]] == [width for _, _, width in columns]
+    assert sheet.freeze_panes == 'A2'
+
+    values = [{name: cell for (name, _, _), cell in zip(columns, row)} for row in rows[1:]]
+    assert [row['start_time'].value for row in values] == [datetime(2024, 9, 1, 13, 0), datetime(2024, 9, 2, 11, 30)]
+    assert values[0]['end_time'].value == datetime(2024, 9, 1, 13, 5)
+    assert all(row['start_time'].style == DATETIME_STYLE for row in values)
+    assert values[0]['start_time'].number_format == 'DD/MM/YYYY HH:MM:SS'
+    # Las fechas faltantes quedan vacías y sin estilo
+    assert values[1]['end_time'].value is None and values[1]['end_time'].style == 'Normal'
+    # Los UUID y las categorías se escriben como texto, los faltantes como celdas vacías
+    assert values[0]['id'].value == str(flow_runs['id'][0])
+    assert [row['state_type'].value for row in values] == ['FAILED', 'CRASHED']
+    assert values[1]['state_message'].value is None
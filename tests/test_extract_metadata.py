@@ -0,0 +1,25 @@
+import pytest
+
+pytest.importorskip("prefect")
+pytest.importorskip("consulterscommons")
+
+from dev.MONITOREO_PREFECT.periodic_report.extract_metadata import parse_metadata, parse_metadata_batch
+
+DOCSTRING = "Descripción\n---\nmetadata:\n  nombre: Proceso\n  area: Producción\n"
+
+
+def test_parse_metadata_returns_a_copy_of_the_cached_dict():
+    metadata = parse_metadata(DOCSTRING)
+    metadata["area"] = "Otra"
+
+    assert parse_metadata(DOCSTRING) == {"nombre": "Proceso", "area": "Producción"}
+
+
+@pytest.mark.parametrize("value, expected", [("foo", "foo"), ("[a, b]", ["a", "b"])])
+def test_parse_metadata_returns_non_dict_values_as_parsed(value, expected):
+    docstring = f"hola\n---\nmetadata: {value}\n"
+
+    # La segunda lectura sale de la caché
+    assert parse_metadata(docstring) == expected
+    assert parse_metadata(docstring) == expected
+    assert parse_metadata_batch([docstring, DOCSTRING])[docstring] == expected
@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("prefect")
+
+from prefect.settings import PREFECT_HOME, temporary_settings
+from prefect.states import Cancelled
+
+from dev.MONITOREO_PREFECT.client_session import client_session
+from dev.MONITOREO_PREFECT.get_prefect_info import get_flow_runs_info, get_task_runs_info, iter_flow_runs, iter_task_runs
+from dev.MONITOREO_PREFECT.benchmarks.fake_api import FakePrefectApi, fake_api_session
+from dev.MONITOREO_PREFECT.flow_run_events import read_deployment_updates
+from dev.MONITOREO_PREFECT.benchmarks.workload import Workload, WorkloadConfig
+
+STATES = ["FAILED", "CRASHED"]
+
+
+@pytest.fixture(autouse=True)
+def prefect_home(tmp_path):
+    # La configuración del servidor que guarda el monitoreo no debe tocar el PREFECT_HOME del usuario
+    with temporary_settings({PREFECT_HOME: tmp_path}):
+        yield tmp_path
+
+
+@pytest.fixture(scope="module")
+def workload():
+    return Workload(WorkloadConfig(flow_runs=500, days=2, subflow_ratio=0.5))
+
+
+def expected_ids(runs, workload, states=STATES):
+    """Ejecuciones en los estados pedidos que iniciaron en el período, o que no iniciaron y estaban programadas en él."""
+    return {
+        run["id"] for run in runs
+        if (states is None or run["state_type"].value in states)
+        and workload.start_date <= (run["start_time"] or run["expected_start_time"]) <= workload.end_date
+    }
+
+
+def expected_flow_run_ids(api, workload):
+    return expected_ids(api.flow_runs.values(), workload)
+
+
+# Sin filtro de estado también se leen las ejecuciones demoradas, que nunca iniciaron
+@pytest.mark.parametrize("states", [STATES, None])
+@pytest.mark.parametrize("reader", ["get", "iter"])
+def test_runs_match_the_workload(workload, reader, states):
+    # Página chica y ventanas de pocas horas para recorrer varios cursores y bordes de ventana
+    api = FakePrefectApi.from_workload(workload, page_limit=25)
+
+    async def run():
+        async with fake_api_session(api):
+            if reader == "get":
+                return (
+                    await get_flow_runs_info.fn(workload.start_date, workload.end_date, states, window_hours=6),
+                    await get_task_runs_info.fn(workload.start_date, workload.end_date, states, window_hours=6),
+                )
+            return (
+                [run async for run in iter_flow_runs(workload.start_date, workload.end_date, states, fields=["id"])],
+                [run async for run in iter_task_runs(workload.start_date, workload.end_date, states, fields=["id"])],
+            )
+
+    flow_runs, task_runs = asyncio.run(run())
+
+    assert not api.stats.unsupported
+    expected_task_run_ids = expected_ids(api.task_runs.values(), workload, states)
+    assert expected_task_run_ids
+    assert sorted(task_run["id"] for task_run in task_runs) == sorted(expected_task_run_ids)
+    assert sorted(flow_run["id"] for flow_run in flow_runs) == sorted(expected_ids(api.flow_runs.values(), workload, states))
+
+
+def test_iter_flow_runs_reads_windows_concurrently(workload):
+    # Con demora por petición se superponen las lecturas de varias ventanas
+    api = FakePrefectApi.from_workload(workload, page_limit=25, latency=0.005)
+
+    async def run():
+        async with fake_api_session(api):
+            return [
+                flow_run async for flow_run in iter_flow_runs(
+                    workload.start_date, workload.end_date, STATES, fields=["id", "start_time"],
+                    window_hours=6, max_concurrency=4)
+            ]
+
+    flow_runs = asyncio.run(run())
+
+    assert sorted(flow_run["id"] for flow_run in flow_runs) == sorted(expected_flow_run_ids(api, workload))
+    # Las páginas llegan en orden de ventana: las ejecuciones iniciadas quedan ordenadas por fecha
+    start_times = [flow_run["start_time"] for flow_run in flow_runs]
+    assert start_times == sorted(start_times)
+    assert 1 < api.stats.max_in_flight <= 4
+
+
+def test_sessions_in_another_loop_inherit_the_fake_transport(workload):
+    api = FakePrefectApi.from_workload(workload)
+
+    def report_in_thread():
+        # Como el reporte periódico: función síncrona que abre su propia sesión con asyncio.run
+        async def read():
+            async with client_session():
+                return await get_flow_runs_info.fn(workload.start_date, workload.end_date, STATES)
+        return asyncio.run(read())
+
+    async def run():
+        async with fake_api_session(api):
+            return await asyncio.to_thread(report_in_thread)
+
+    flow_runs = asyncio.run(run())
+
+    assert {flow_run["id"] for flow_run in flow_runs} == expected_flow_run_ids(api, workload)
+    assert api.stats.requests["POST /flow_runs/filter"] > 0
+
+
+def test_deployment_events_page_fits_the_server_limit(workload):
+    api = FakePrefectApi.from_workload(workload)
+
+    async def run():
+        async with fake_api_session(api) as client:
+            return await read_deployment_updates(workload.start_date, client, workload.end_date)
+
+    # Una página de eventos mayor a la permitida responde 422
+    assert asyncio.run(run()) == {}
+    assert api.stats.requests["POST /events/filter"] == 1
+
+
+def test_set_state_update_and_logs(workload):
+    api = FakePrefectApi.from_workload(workload)
+    flow_run_id = next(iter(api.flow_runs))
+
+    async def run():
+        async with fake_api_session(api) as client:
+            result = await client.set_flow_run_state(flow_run_id, Cancelled(message="watchdog"), force=True)
+            await client.update_flow_run(flow_run_id, tags=["Cancelado por Watchdog"])
+            await client.create_logs([{
+                "name": "Watchdog-Logger", "level": 30, "message": "cancelado",
+                "timestamp": "2024-01-01T00:00:00+00:00", "flow_run_id": str(flow_run_id),
+            }])
+            return result, await client.read_flow_run(flow_run_id)
+
+    result, flow_run = asyncio.run(run())
+
+    assert str(result.status) == "SetStateStatus.ACCEPT"
+    assert flow_run.state.type.value == "CANCELLED"
+    assert flow_run.state.message == "watchdog"
+    assert flow_run.tags == ["Cancelado por Watchdog"]
+    assert len(api.logs) == 1
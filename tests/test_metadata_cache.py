@@ -0,0 +1,131 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+import httpx
+import pytest
+
+pytest.importorskip("prefect")
+
+from prefect.events import Event
+
+from dev.MONITOREO_PREFECT.metadata_cache import (
+    DEPLOYMENTS,
+    EVENTS_CHECKPOINT_KEY,
+    EVENTS_CLOCK_MARGIN,
+    MetadataCache,
+    sync_deployment_events,
+)
+
+NOW = datetime.now(timezone.utc)
+
+
+class EventsClient:
+    """Cliente con el historial de eventos en memoria. Registra el `since` de cada lectura."""
+
+    def __init__(self, events):
+        self.events = events
+        self.reads = []
+
+    async def read_events(self, filter, limit):  # pylint: disable=redefined-builtin
+        self.reads.append(filter.occurred.since)
+        events = [
+            event for event in self.events
+            if filter.occurred.since <= event.occurred <= filter.occurred.until and event.event in filter.event.name
+        ]
+        return SimpleNamespace(events=events, next_page=None)
+
+
+def deployment_event(deployment_id, name, occurred):
+    return Event(
+        event=name,
+        occurred=occurred,
+        resource={"prefect.resource.id": f"prefect.deployment.{deployment_id}"},
+    )
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return MetadataCache(tmp_path / "metadata_cache.sqlite")
+
+
+def test_invalidate_if_updated_drops_only_older_entries(cache):
+    old_id, new_id = uuid4(), uuid4()
+    cache.put_many(DEPLOYMENTS, [
+        ({"id": old_id, "description": "vieja"}, NOW - timedelta(days=2)),
+        ({"id": new_id, "description": "nueva"}, NOW),
+    ])
+
+    cache.invalidate_if_updated(DEPLOYMENTS, {old_id: NOW - timedelta(days=1), new_id: NOW - timedelta(days=1)})
+
+    assert set(cache.get_many(DEPLOYMENTS, [old_id, new_id])) == {new_id}
+
+
+def test_sync_deployment_events_invalidates_updated_deployments_once(cache):
+    updated_id, deleted_id, untouched_id = uuid4(), uuid4(), uuid4()
+    cache.put_many(DEPLOYMENTS, [
+        ({"id": object_id}, NOW - timedelta(hours=3)) for object_id in (updated_id, deleted_id, untouched_id)
+    ])
+    client = EventsClient([
+        deployment_event(updated_id, "prefect.deployment.updated", NOW - timedelta(hours=1)),
+        deployment_event(deleted_id, "prefect.deployment.deleted", NOW - timedelta(minutes=30)),
+        # Los cambios de estado del despliegue no modifican sus metadatos
+        deployment_event(untouched_id, "prefect.deployment.not-ready", NOW - timedelta(minutes=10)),
+    ])
+
+    assert asyncio.run(sync_deployment_events(cache, client)) == 2
+    assert set(cache.get_many(DEPLOYMENTS, [updated_id, deleted_id, untouched_id])) == {untouched_id}
+    checkpoint = cache.get_checkpoint(EVENTS_CHECKPOINT_KEY)
+    assert checkpoint >= NOW - EVENTS_CLOCK_MARGIN
+
+    # La versión nueva se vuelve a guardar y la siguiente sincronización no relee el mismo evento
+    cache.put_many(DEPLOYMENTS, [({"id": updated_id}, NOW - timedelta(hours=1, seconds=1))])
+    assert asyncio.run(sync_deployment_events(cache, client)) == 0
+    assert updated_id in cache.get_many(DEPLOYMENTS, [updated_id])
+    assert client.reads[-1] == checkpoint + timedelta(microseconds=1)
+
+
+def test_sync_deployment_events_advances_checkpoint_without_events(cache):
+    client = EventsClient([])
+
+    asyncio.run(sync_deployment_events(cache, client))
+    first_checkpoint = cache.get_checkpoint(EVENTS_CHECKPOINT_KEY)
+    asyncio.run(sync_deployment_events(cache, client))
+
+    # La primera lectura arranca en el inicio del TTL y la segunda donde terminó la primera
+    assert client.reads[0] <= NOW - timedelta(seconds=cache.ttl_seconds) + timedelta(minutes=1)
+    assert client.reads[1] == first_checkpoint + timedelta(microseconds=1)
+    assert first_checkpoint >= NOW - EVENTS_CLOCK_MARGIN
+
+
+class FailingClient:
+    async def read_events(self, filter, limit):  # pylint: disable=redefined-builtin
+        raise httpx.ConnectError("servidor no disponible")
+
+
+class ClientWithoutEvents:
+    """Cliente de una versión de Prefect sin `read_events`."""
+
+
+@pytest.mark.parametrize("client", [FailingClient(), ClientWithoutEvents()], ids=["http_error", "no_events_api"])
+def test_sync_deployment_events_keeps_cache_when_events_fail(cache, client, caplog):
+    deployment_id = uuid4()
+    cache.put_many(DEPLOYMENTS, [({"id": deployment_id}, NOW)])
+
+    with caplog.at_level(logging.WARNING):
+        assert asyncio.run(sync_deployment_events(cache, client)) == 0
+
+    assert deployment_id in cache.get_many(DEPLOYMENTS, [deployment_id])
+    assert cache.get_checkpoint(EVENTS_CHECKPOINT_KEY) is None
+    assert "historial de eventos" in caplog.text
+
+
+def test_sync_deployment_events_propagates_unexpected_errors(cache):
+    class BrokenClient:
+        async def read_events(self, filter, limit):  # pylint: disable=redefined-builtin
+            raise ValueError("error de programación")
+
+    with pytest.raises(ValueError):
+        asyncio.run(sync_deployment_events(cache, BrokenClient()))
@@ -0,0 +1,177 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from operator import attrgetter
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("prefect")
+
+from dev.MONITOREO_PREFECT.pagination import (
+    CURSOR_RESOLUTION,
+    batched_pages,
+    concurrent_pages,
+    disjoint_time_windows,
+    keyset_pages,
+)
+from dev.MONITOREO_PREFECT.get_prefect_info import SORT_BY_FIELD, runs_page_reader
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def test_disjoint_time_windows_do_not_share_limits():
+    windows = disjoint_time_windows(START, START + timedelta(hours=10), timedelta(hours=4))
+
+    assert windows == [
+        (START, START + timedelta(hours=4) - CURSOR_RESOLUTION),
+        (START + timedelta(hours=4), START + timedelta(hours=8) - CURSOR_RESOLUTION),
+        (START + timedelta(hours=8), START + timedelta(hours=10)),
+    ]
+
+
+def test_concurrent_pages_keeps_source_order_and_limits_concurrency():
+    reading = 0
+    max_reading = 0
+
+    def source(index, pages):
+        async def read():
+            nonlocal reading, max_reading
+            for page in range(pages):
+                reading += 1
+                max_reading = max(max_reading, reading)
+                # Las primeras fuentes tardan más, para que las siguientes terminen antes
+                await asyncio.sleep(0.01 * (5 - index))
+                reading -= 1
+                yield [(index, page)]
+        return read
+
+    async def run():
+        return [page async for page in concurrent_pages([source(index, 3) for index in range(5)], max_concurrency=2)]
+
+    pages = asyncio.run(run())
+
+    assert pages == [[(index, page)] for index in range(5) for page in range(3)]
+    assert max_reading == 2
+
+
+def test_concurrent_pages_propagates_errors_and_cancels_sources():
+    cancelled = []
+
+    def failing():
+        async def read():
+            yield ["ok"]
+            raise RuntimeError("falló la ventana")
+        return read()
+
+    def slow():
+        async def read():
+            try:
+                await asyncio.sleep(10)
+                yield ["nunca"]
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+        return read()
+
+    async def run():
+        pages = []
+        with pytest.raises(RuntimeError, match="falló la ventana"):
+            async for page in concurrent_pages([failing, slow], max_concurrency=2):
+                pages.append(page)
+        await asyncio.sleep(0)
+        return pages
+
+    assert asyncio.run(run()) == [["ok"]]
+    assert cancelled == [True]
+
+
+def test_batched_pages_joins_small_pages_in_order():
+    async def pages():
+        for page in ([1], [2, 3], [], [4], [5, 6, 7], [8]):
+            yield page
+
+    async def run():
+        return [batch async for batch in batched_pages(pages(), 3)]
+
+    assert asyncio.run(run()) == [[1, 2, 3], [4, 5, 6, 7], [8]]
+
+
+def test_concurrent_pages_rejects_unbounded_prefetch():
+    async def run():
+        async for _ in concurrent_pages([], max_concurrency=1, prefetch=0):
+            pass
+
+    with pytest.raises(ValueError):
+        asyncio.run(run())
+
+
+class InMemoryRuns:
+    """
+    Ejecuciones en memoria filtradas como el servidor de Prefect 3: el filtro de rango de `start_time` compara
+    coalesce(start_time, expected_start_time) y el desempate por ID es determinístico.
+    """
+
+    def __init__(self, runs):
+        self.runs = runs
+        self.reads = 0
+
+    async def read_runs(self, flow_run_filter, sort, limit, offset):
+        self.reads += 1
+        start_filter = flow_run_filter['start_time']
+        expected_filter = flow_run_filter.get('expected_start_time') or {}
+
+        def matches(run):
+            started = run.start_time or run.expected_start_time
+            if start_filter.get('is_null_') is not None and (run.start_time is None) != start_filter['is_null_']:
+                return False
+            if not start_filter.get('after_', started) <= started <= start_filter.get('before_', started):
+                return False
+            expected = run.expected_start_time
+            return expected_filter.get('after_', expected) <= expected <= expected_filter.get('before_', expected)
+
+        sort_key = {
+            "START_TIME_ASC": lambda run: (run.start_time or run.expected_start_time, run.id),
+            "EXPECTED_START_TIME_ASC": lambda run: (run.expected_start_time, run.id),
+            "ID_DESC": lambda run: run.id,
+        }[sort]
+        page = sorted(filter(matches, self.runs), key=sort_key, reverse=sort == "ID_DESC")
+        return page[offset:offset + limit]
+
+
+def test_keyset_pages_reads_a_crowded_instant_and_never_started_runs_once():
+    instant = START + timedelta(hours=1)
+    runs = [
+        SimpleNamespace(id=f"run-{index:02d}", start_time=start_time, expected_start_time=start_time)
+        for index, start_time in enumerate(
+            [START, START + timedelta(minutes=30)] + [instant] * 7 + [instant + timedelta(minutes=1)]
+        )
+    ]
+    # Nunca inició y estaba programada en el mismo instante que la ráfaga
+    never_started = SimpleNamespace(id="run-never", start_time=None, expected_start_time=instant)
+    runs.append(never_started)
+    api = InMemoryRuns(runs)
+    limit = 3
+
+    async def read_pass(without_start_time):
+        key_field = 'expected_start_time' if without_start_time else 'start_time'
+        read_page = runs_page_reader(
+            api.read_runs, dict, 'flow_run_filter', None, START, START + timedelta(hours=2),
+            without_start_time, key_field
+        )
+        return [
+            page async for page in keyset_pages(
+                read_page, attrgetter(key_field), START, START + timedelta(hours=2), limit, SORT_BY_FIELD[key_field]
+            )
+        ]
+
+    async def run():
+        return await read_pass(False), await read_pass(True)
+
+    started_pages, never_started_pages = asyncio.run(run())
+
+    read_ids = [run.id for page in started_pages + never_started_pages for run in page]
+    assert sorted(read_ids) == sorted(run.id for run in runs)
+    # El instante con más ejecuciones que el límite se lee entero en la página donde aparece
+    crowded_page = next(page for page in started_pages if any(run.start_time == instant for run in page))
+    assert sum(run.start_time == instant for run in crowded_page) == 7
+    assert never_started_pages == [[never_started]]
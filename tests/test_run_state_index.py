@@ -0,0 +1,133 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+
+pytest.importorskip("prefect")
+
+from prefect.client.schemas.objects import StateType
+from prefect.settings import PREFECT_HOME, temporary_settings
+
+from dev.MONITOREO_PREFECT.benchmarks.fake_api import FakePrefectApi, fake_api_session
+from dev.MONITOREO_PREFECT.benchmarks.workload import Workload, WorkloadConfig
+from dev.MONITOREO_PREFECT.flow_run_events import FlowRunStateEvent
+from dev.MONITOREO_PREFECT.run_state_index import (
+    ACTIVE_STATES,
+    IndexedRun,
+    RunStateIndex,
+    _apply_events,
+    seed_run_state_index,
+)
+
+NOW = datetime.now(timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def prefect_home(tmp_path):
+    with temporary_settings({PREFECT_HOME: tmp_path}):
+        yield tmp_path
+
+
+@pytest.fixture
+def api():
+    return FakePrefectApi.from_workload(Workload(WorkloadConfig(flow_runs=300, days=1, subflow_ratio=0.5)))
+
+
+def indexed_run(state_type, state_timestamp, **kwargs):
+    return IndexedRun(
+        id=kwargs.pop("id", None) or uuid4(),
+        name=kwargs.pop("name", None),
+        state_type=state_type,
+        state_name=state_type.value.title(),
+        state_timestamp=state_timestamp,
+        **kwargs
+    )
+
+
+def test_upsert_ignores_older_states_and_keeps_known_fields():
+    index = RunStateIndex()
+    deployment_id = uuid4()
+    run = indexed_run(StateType.RUNNING, NOW, name="flujo", deployment_id=deployment_id, tags=("a",))
+    index.upsert(run)
+
+    assert not index.upsert(indexed_run(StateType.SCHEDULED, NOW - timedelta(seconds=1), id=run.id))
+    assert index.upsert(indexed_run(StateType.FAILED, NOW + timedelta(seconds=1), id=run.id))
+
+    updated = index.get(run.id)
+    assert updated.state_type == StateType.FAILED
+    assert (updated.name, updated.deployment_id, updated.tags) == ("flujo", deployment_id, ("a",))
+    assert index.running() == []
+    assert index.by_deployment(deployment_id, states=[StateType.FAILED]) == [updated]
+    assert index.by_tag("a", states=["Failed"]) == [updated]
+    assert index.counts() == {"Failed": 1}
+
+
+def test_prune_drops_only_terminal_runs_past_retention():
+    index = RunStateIndex(terminal_retention=timedelta(hours=1))
+    expired = indexed_run(StateType.COMPLETED, NOW - timedelta(hours=2))
+    recent = indexed_run(StateType.FAILED, NOW - timedelta(minutes=30))
+    old_running = indexed_run(StateType.RUNNING, NOW - timedelta(days=3))
+    for run in (expired, recent, old_running):
+        index.upsert(run)
+
+    assert index.prune(NOW) == 1
+    assert expired.id not in index
+    assert recent.id in index and old_running.id in index
+
+
+def test_seed_loads_the_api_and_drops_active_runs_that_left_it(api):
+    index = RunStateIndex()
+    # Activa en el índice pero ya no en la API (eliminada o con un evento perdido)
+    gone = indexed_run(StateType.RUNNING, NOW - timedelta(hours=1))
+    # Cambio recibido por eventos mientras se leía la API: se conserva
+    from_event = indexed_run(StateType.RUNNING, NOW + timedelta(hours=1))
+    index.upsert(gone)
+    index.upsert(from_event)
+
+    async def run():
+        async with fake_api_session(api) as client:
+            return await seed_run_state_index(index, client)
+
+    read = asyncio.run(run())
+
+    expected = {
+        flow_run["id"] for flow_run in api.flow_runs.values()
+        if StateType(flow_run["state_type"]) in ACTIVE_STATES
+        or flow_run["end_time"] and flow_run["end_time"] >= NOW - index.terminal_retention
+    }
+    assert read == len(expected)
+    assert gone.id not in index
+    assert from_event.id in index
+    assert {run.id for run in index.in_state(*StateType)} == expected | {from_event.id}
+    # Los subflujos se cargan con su ejecución padre
+    assert all(index.get(flow_run_id).parent_flow_run_id == api.flow_runs[flow_run_id]["parent_flow_run_id"]
+               for flow_run_id in expected)
+    assert any(index.get(flow_run_id).parent_flow_run_id for flow_run_id in expected)
+
+
+def test_apply_events_reads_the_parent_of_new_runs(api):
+    subflow = next(flow_run for flow_run in api.flow_runs.values() if flow_run["parent_flow_run_id"])
+    known_parent = uuid4()
+    announced = indexed_run(StateType.SCHEDULED, NOW)
+    index = RunStateIndex()
+    index.upsert(announced)
+
+    events = [
+        FlowRunStateEvent(subflow["id"], StateType.RUNNING, "Running", NOW),
+        # Ya está en el índice: no hace falta leerla
+        FlowRunStateEvent(announced.id, StateType.RUNNING, "Running", NOW + timedelta(seconds=1)),
+        # El evento trae la ejecución padre
+        FlowRunStateEvent(uuid4(), StateType.PENDING, "Pending", NOW, related={"flow-run": str(known_parent)}),
+    ]
+
+    async def run():
+        async with fake_api_session(api) as client:
+            await _apply_events(index, client, events)
+
+    asyncio.run(run())
+
+    assert index.get(subflow["id"]).parent_flow_run_id == subflow["parent_flow_run_id"]
+    assert index.get(announced.id).state_type == StateType.RUNNING
+    assert index.children(known_parent, states=[StateType.PENDING])[0].id == events[2].flow_run_id
+    assert api.stats.requests["POST /flow_runs/filter"] == 1
@@ -0,0 +1,126 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+pytest.importorskip("prefect")
+
+from prefect.client.schemas.objects import StateType
+from prefect.settings import PREFECT_HOME, temporary_settings
+
+from dev.MONITOREO_PREFECT.benchmarks.fake_api import FakePrefectApi, fake_api_session
+from dev.MONITOREO_PREFECT.benchmarks.workload import Workload, WorkloadConfig
+from dev.MONITOREO_PREFECT.run_store import DEFAULT_LOOKBACK, TERMINAL_STATES, RunStore, sync_run_store
+
+NOW = datetime.now(timezone.utc)
+
+
+@pytest.fixture(autouse=True)
+def prefect_home(tmp_path):
+    with temporary_settings({PREFECT_HOME: tmp_path}):
+        yield tmp_path
+
+
+@pytest.fixture
+def workload():
+    return Workload(WorkloadConfig(flow_runs=300, days=2))
+
+
+@pytest.fixture
+def api(workload):
+    return FakePrefectApi.from_workload(workload)
+
+
+def sync(store, api, since):
+    async def run():
+        async with fake_api_session(api) as client:
+            return await sync_run_store(store, since, client=client)
+
+    return asyncio.run(run())
+
+
+def stored_states(store, workload):
+    return {flow_run["id"]: flow_run["state"]["type"] for flow_run in store.query(workload.start_date, NOW)}
+
+
+def fail_run(api, flow_run_id, end_time):
+    api.flow_runs[flow_run_id].update(
+        state_type=StateType.FAILED,
+        state_name="Failed",
+        end_time=end_time,
+        state_timestamp=datetime.now(timezone.utc),
+    )
+
+
+def flow_run(state_type, updated, flow_run_id=None):
+    """Ejecución con los campos que guarda el almacén."""
+    return SimpleNamespace(
+        id=flow_run_id or uuid4(), name="flujo", state=SimpleNamespace(type=state_type, message=None),
+        start_time=NOW, expected_start_time=NOW, end_time=NOW, total_run_time=timedelta(seconds=1),
+        parameters={}, flow_id=uuid4(), deployment_id=None, updated=updated,
+    )
+
+
+def test_sync_rereads_only_the_lookback_before_the_high_water_mark(api, workload):
+    store = RunStore()
+    sync(store, api, workload.start_date)
+
+    _, high_water_mark = store.sync_range()
+    states = stored_states(store, workload)
+    assert set(states) == {
+        flow_run_id for flow_run_id, flow_run in api.flow_runs.items()
+        if flow_run["state_type"].value in TERMINAL_STATES
+        and flow_run["end_time"] and flow_run["end_time"] >= workload.start_date
+    }
+
+    inside, outside = [flow_run_id for flow_run_id, state in states.items() if state == StateType.COMPLETED][:2]
+    # Se registró con demora dentro del margen: se vuelve a leer
+    fail_run(api, inside, high_water_mark - DEFAULT_LOOKBACK / 2)
+    # Terminó antes del margen: la sincronización incremental no la vuelve a leer
+    fail_run(api, outside, high_water_mark - DEFAULT_LOOKBACK * 2)
+
+    synced = sync(store, api, workload.start_date)
+
+    states = stored_states(store, workload)
+    assert states[inside] == StateType.FAILED
+    assert states[outside] == StateType.COMPLETED
+    assert synced < len(states)
+    assert store.sync_range()[1] > high_water_mark
+
+
+def test_upsert_keeps_the_newest_version():
+    store = RunStore()
+    newer = flow_run(StateType.FAILED, NOW)
+    store.upsert([newer])
+
+    store.upsert([flow_run(StateType.COMPLETED, NOW - timedelta(seconds=1), flow_run_id=newer.id)])
+    assert store.query(NOW, NOW)[0]["state"]["type"] == StateType.FAILED
+
+    store.upsert([flow_run(StateType.CRASHED, NOW + timedelta(seconds=1), flow_run_id=newer.id)])
+    assert store.query(NOW, NOW)[0]["state"]["type"] == StateType.CRASHED
+
+
+def test_db_cleanup_purges_deleted_runs_from_the_store(api, workload):
+    pytest.importorskip("lucasdp")
+    from dev.MONITOREO_PREFECT.db_cleanup.db_cleanup import db_cleanup
+
+    store = RunStore()
+    sync(store, api, workload.start_date)
+    cleanup_end = workload.start_date + timedelta(days=1)
+    assert any(flow_run["start_time"] <= cleanup_end for flow_run in store.query(workload.start_date, NOW))
+
+    async def run():
+        async with fake_api_session(api):
+            await db_cleanup.fn(
+                workload.start_date.replace(tzinfo=None), cleanup_end.replace(tzinfo=None),
+                timezone_str="UTC", resume=False
+            )
+
+    asyncio.run(run())
+
+    remaining = store.query(workload.start_date, NOW)
+    assert remaining
+    assert {flow_run["id"] for flow_run in remaining} <= set(api.flow_runs)
+    assert all(flow_run["start_time"] > cleanup_end for flow_run in remaining)
@@ -0,0 +1,62 @@
+import asyncio
+from datetime import timedelta, timezone
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+pytest.importorskip("prefect")
+
+import pytz
+from prefect.client.schemas.objects import StateType
+from prefect.settings import PREFECT_HOME, temporary_settings
+
+from dev.MONITOREO_PREFECT.benchmarks.fake_api import FakePrefectApi, fake_api_session
+from dev.MONITOREO_PREFECT.benchmarks.workload import Workload, WorkloadConfig
+from dev.MONITOREO_PREFECT.get_prefect_info import schedule_executions
+
+BUENOS_AIRES = pytz.timezone('America/Argentina/Buenos_Aires')
+
+
+@pytest.fixture(autouse=True)
+def prefect_home(tmp_path):
+    with temporary_settings({PREFECT_HOME: tmp_path}):
+        yield tmp_path
+
+
+@pytest.fixture
+def api():
+    return FakePrefectApi.from_workload(Workload(WorkloadConfig(flow_runs=100, days=3)))
+
+
+def test_schedule_executions_skips_runs_already_scheduled_in_any_timezone(api):
+    scheduled = next(flow_run for flow_run in api.flow_runs.values() if flow_run["state_type"] == StateType.SCHEDULED)
+    deployment_id, scheduled_time = scheduled["deployment_id"], scheduled["expected_start_time"]
+    new_time = scheduled_time + timedelta(hours=1)
+    created = []
+
+    async def create_flow_run_from_deployment(deployment_id, state, tags):
+        created.append((deployment_id, state.state_details.scheduled_time, tags))
+        return SimpleNamespace(id=uuid4())
+
+    async def run():
+        async with fake_api_session(api) as client:
+            client.create_flow_run_from_deployment = create_flow_run_from_deployment
+            return await schedule_executions.fn({
+                deployment_id: [
+                    # La misma fecha ya programada, con otra zona horaria y sin zona horaria (UTC)
+                    scheduled_time.astimezone(BUENOS_AIRES),
+                    scheduled_time.astimezone(timezone.utc).replace(tzinfo=None),
+                    new_time.astimezone(BUENOS_AIRES),
+                ],
+            }, client=client)
+
+    results = asyncio.run(run())
+
+    utc_naive = scheduled_time.astimezone(timezone.utc).replace(tzinfo=None)
+    new_utc_naive = new_time.astimezone(timezone.utc).replace(tzinfo=None)
+    assert results[deployment_id, utc_naive] == {"status": "already_scheduled"}
+    assert results[deployment_id, new_utc_naive]["status"] == "created"
+    assert len(results) == 2
+    # Solo se crea la fecha nueva, una vez, programada en UTC
+    assert created == [(deployment_id, new_time.astimezone(timezone.utc), ["Programado por script"])]
@@ -0,0 +1,219 @@
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("prefect")
+pytest.importorskip("consulterscommons")
+
+from dev.MONITOREO_PREFECT.periodic_report import send_report_failed_flows as report
+
+
+def failed_flow_runs() -> pd.DataFrame:
+    return pd.DataFrame({
+        'id': ['run1', 'run2', 'run3'],
+        'flow_id': ['flow1', 'flow2', 'flow3'],
+        'flow_name': ['padre', 'subflujo', 'suelto'],
+        'flow_run_name': ['run_padre', 'run_subflujo', 'run_suelto'],
+        'state_message': ['falló', None, 'falló'],
+        'start_time': pd.to_datetime(['2024-09-01 10:00', '2024-09-01 10:01', None]),
+        'end_time': pd.to_datetime(['2024-09-01 10:05', None, None]),
+        'ui_url': ['http://ui/run1', 'http://ui/run2', 'http://ui/run3'],
+        'parent_flow_run_id': [None, 'run1', None],
+    })
+
+
+def test_to_template_records_replaces_missing_values_in_subflows():
+    records = report.to_template_records(report.add_subflows_to_parent_flows.fn(failed_flow_runs()))
+
+    parent, single = records
+    assert single['start_time'] is None and single['end_time'] is None
+    assert single['subflow_runs'] == []
+
+    subflow_run, = parent['subflow_runs']
+    assert subflow_run['id'] == 'run2'
+    assert subflow_run['start_time'] == pd.Timestamp('2024-09-01 10:01')
+    assert subflow_run['end_time'] is None
+    assert subflow_run['state_message'] is None
+
+    html = report.render_email(
+        style_str='', header_message='', table_str='', flow_runs_ui_url='', failed_flow_runs=records
+    )
+    assert 'NaT' not in html and 'nan' not in html
+
+
+CONTEXT = {
+    'style_str': '<style>td { color: red; }</style>',
+    'header_message': 'Reporte de flujos fallidos',
+    'table_str': '<table></table>',
+    'flow_runs_ui_url': 'http://ui/flow-runs',
+}
+
+
+def records_of(flows: dict) -> list[dict]:
+    """Registros planos con `flows[flow_name]` ejecuciones de cada flujo y mensajes de distinto largo."""
+    records = []
+    for flow_name, runs in flows.items():
+        for _ in range(runs):
+            index = len(records)
+            records.append({
+                'id': f'id-{index:04d}', 'flow_id': f'flow-{flow_name}', 'flow_name': flow_name,
+                'flow_run_name': f'run-{index:04d}', 'state_message': 'x' * (20 * (index % 7)),
+                'start_time': None, 'end_time': None, 'ui_url': f'http://ui/{index}', 'subflow_runs': [],
+            })
+    return records
+
+
+def ids_in(body: str, records: list[dict]) -> list[str]:
+    return [record['id'] for record in records if f"{record['id']}<br>" in body]
+
+
+def test_split_records_by_size_fills_each_part_up_to_the_limit():
+    records = records_of({'a': 40})
+    max_bytes = 6_000
+
+    parts = report.split_records_by_size(records, max_bytes, CONTEXT)
+
+    assert len(parts) > 1
+    assert [record for part in parts for record in part] == records
+    for part, next_part in zip(parts, parts[1:] + [None]):
+        assert report.body_size(report.render_email(**CONTEXT, failed_flow_runs=part)) <= max_bytes
+        if next_part:
+            assert report.body_size(report.render_email(**CONTEXT, failed_flow_runs=part + next_part[:1])) > max_bytes
+
+    # Un registro que no entra solo queda en una parte propia
+    huge = {**records[0], 'id': 'id-huge', 'state_message': 'x' * max_bytes}
+    assert report.split_records_by_size([records[1], huge, records[2]], max_bytes, CONTEXT) \
+        == [[records[1]], [huge], [records[2]]]
+    assert report.split_records_by_size([], max_bytes, CONTEXT) == []
+
+
+def test_build_oversize_messages_splits_the_rest_into_numbered_parts():
+    records = records_of({'muchas': 25, 'varias': 15, 'pocas': 3})
+    max_bytes = 8_000
+
+    messages = report.build_oversize_messages(
+        records, CONTEXT, 'Reporte', max_body_bytes=max_bytes, top_n_flows=1, include_rest=True
+    )
+
+    total = len(messages)
+    assert total > 2
+    assert [subject for subject, _ in messages] == [f"Reporte (parte {part}/{total})" for part in range(1, total + 1)]
+    assert all(report.body_size(body) <= max_bytes for _, body in messages)
+
+    main_body = messages[0][1]
+    main_ids = ids_in(main_body, records)
+    # El mail principal lleva la tabla y solo el flujo con más fallas
+    assert CONTEXT['table_str'] in main_body
+    assert main_ids and all(record['flow_name'] == 'muchas' for record in records if record['id'] in main_ids)
+    assert f"Se muestran {len(main_ids)} de {len(records)}" in main_body
+    assert f"se envía en {total - 1} mails adicionales" in main_body
+    # Cada ejecución aparece una sola vez entre todos los mails
+    sent_ids = [record_id for _, body in messages for record_id in ids_in(body, records)]
+    assert sorted(sent_ids) == [record['id'] for record in records]
+    assert all(CONTEXT['table_str'] not in body for _, body in messages[1:])
+
+
+def test_build_oversize_messages_mentions_the_attachment_without_extra_mails():
+    records = records_of({'muchas': 25, 'pocas': 3})
+
+    messages = report.build_oversize_messages(
+        records, CONTEXT, 'Reporte', max_body_bytes=8_000, top_n_flows=1, include_rest=False,
+        attachment_format='xlsx'
+    )
+
+    (subject, body), = messages
+    assert subject == 'Reporte'
+    assert "se adjunta en un archivo XLSX" in body
+    assert not ids_in(body, [record for record in records if record['flow_name'] == 'pocas'])
+
+
+def send_email_with_attachments(mail_to, subject, body, is_html=False, attachments=None):
+    pass
+
+
+def send_email_with_kwargs(mail_to, subject, body, **kwargs):
+    pass
+
+
+def send_email_without_attachments(mail_to, subject, body, is_html=False):
+    pass
+
+
+@pytest.mark.parametrize("send_email, accepts", [
+    (send_email_with_attachments, True),
+    (send_email_with_kwargs, True),
+    (send_email_without_attachments, False),
+])
+def test_send_email_accepts_attachments(monkeypatch, send_email, accepts):
+    monkeypatch.setattr(report, 'send_email', send_email)
+
+    assert report.send_email_accepts_attachments() is accepts
+
+
+def baseline_summary_table(failed_flow_runs: pd.DataFrame) -> pd.DataFrame:
+    """Tabla de resumen y formato condicional como los armaba la versión con Styler."""
+    failed_flow_runs = failed_flow_runs.rename(columns={'flow_name': 'Nombre del flujo'})
+    failed_flow_runs['start_time'] = pd.to_datetime(failed_flow_runs['start_time'], utc=True).dt.tz_localize(None)
+    failed_flow_runs['Fecha'] = failed_flow_runs['start_time'].dt.strftime('%d-%m')
+    summary_table = failed_flow_runs.groupby(['Nombre del flujo', 'Fecha']).size().unstack(fill_value=0)
+    summary_table = summary_table[sorted(summary_table.columns, key=lambda x: pd.to_datetime(x, format='%d-%m'))]
+    summary_table['Total'] = summary_table.sum(axis=1)
+    summary_table.loc['Total'] = summary_table.sum(axis=0)
+    return summary_table
+
+
+def baseline_highlight_errors(val):
+    if val > 3:
+        color = '#ff9999'
+    elif val > 2:
+        color = '#ffcccc'
+    elif val > 1:
+        color = '#ffcc99'
+    elif val > 0:
+        color = '#ffffcc'
+    else:
+        color = '#ffffff'
+    return f'background-color: {color}'
+
+
+def styler_cells(summary_table: pd.DataFrame) -> dict:
+    """Valor y color de cada celda según el HTML que genera Styler."""
+    html = summary_table.style.map(baseline_highlight_errors).to_html()
+    colors = {}
+    for selectors, color in re.findall(r'((?:#T_\w+_row\d+_col\d+(?:, )?)+) \{\s*background-color: (#\w+);', html):
+        for row, col in re.findall(r'_row(\d+)_col(\d+)', selectors):
+            colors[int(row), int(col)] = color
+    return {
+        (str(summary_table.index[row]), str(summary_table.columns[col])): (str(summary_table.iat[row, col]), color)
+        for (row, col), color in colors.items()
+    }
+
+
+def summary_cells(table: str) -> dict:
+    columns = re.findall(r'<th class="\w+">([^<]*)</th>', table)
+    cells = {}
+    for name, row in re.findall(r'<tr><th>([^<]*)</th>(.*?)</tr>', table):
+        values = re.findall(r'style="background-color: (#\w+)">([^<]*)</td>', row)
+        for column, (color, value) in zip(columns, values):
+            cells[name, column] = (value, color)
+    return cells
+
+
+def test_summary_table_colors_match_the_styler_version():
+    rng = np.random.default_rng(7)
+    rows = [
+        {'flow_name': flow_name, 'start_time': pd.Timestamp('2024-08-28', tz='UTC') + pd.Timedelta(days=day, hours=3)}
+        for flow_name in ('carga', 'conexion', 'exportacion', 'limpieza')
+        for day in range(8)
+        for _ in range(rng.integers(0, 6))
+    ]
+    failed = pd.DataFrame(rows)
+
+    _, table = report.generate_summary_table.fn(failed)
+
+    expected = styler_cells(baseline_summary_table(failed))
+    assert summary_cells(table) == expected
+    # Están todos los umbrales, incluidas celdas sin fallas
+    assert {color for _, color in expected.values()} == {'#ff9999', '#ffcccc', '#ffcc99', '#ffffcc', '#ffffff'}
@@ -0,0 +1,135 @@
+import asyncio
+import importlib.util
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+
+pytest.importorskip("prefect")
+pytest.importorskip("consulterscommons")
+
+from prefect.client.schemas.objects import StateType
+from prefect.settings import PREFECT_HOME, temporary_settings
+
+from dev.MONITOREO_PREFECT.benchmarks.fake_api import FakePrefectApi, fake_api_session
+from dev.MONITOREO_PREFECT.benchmarks.workload import Workload, WorkloadConfig
+from dev.MONITOREO_PREFECT.flow_run_events import FlowRunStateEvent
+
+# El watchdog se despliega como script suelto: se carga desde su archivo con otro nombre
+# para no chocar con el paquete `watchdog` de PyPI
+WATCHDOG_PATH = Path(__file__).resolve().parents[1] / "src" / "watchdog" / "watchdog.py"
+_spec = importlib.util.spec_from_file_location("watchdog_flows", WATCHDOG_PATH)
+wd = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(wd)
+
+NOW = datetime.now(timezone.utc)
+STALE_THRESHOLD = timedelta(hours=12)
+LONG_RUNNING_THRESHOLD = timedelta(hours=1)
+
+
+@pytest.fixture(autouse=True)
+def watchdog_run(tmp_path, monkeypatch):
+    # La ejecución del watchdog que cancela, y la cancelación sin pasar por el motor de tareas de Prefect
+    monkeypatch.setattr(wd, "CURRENT_FLOW_RUN", SimpleNamespace(id=str(uuid4()), tags=[], ui_url="http://ui/flow-run/x"))
+    monkeypatch.setattr(wd, "cancel_flow_runs", wd.cancel_flow_runs.fn)
+    with temporary_settings({PREFECT_HOME: tmp_path}):
+        yield wd.CURRENT_FLOW_RUN
+
+
+@pytest.fixture
+def api():
+    return FakePrefectApi.from_workload(Workload(WorkloadConfig(flow_runs=50, days=1)))
+
+
+def set_run(api, flow_run_id, state_type, expected_start_time=None, start_time=None):
+    api.flow_runs[flow_run_id].update(
+        state_type=state_type,
+        state_name=state_type.value.title(),
+        expected_start_time=expected_start_time or NOW,
+        start_time=start_time,
+    )
+
+
+def event(flow_run_id, state_type, occurred=NOW):
+    return FlowRunStateEvent(flow_run_id, state_type, state_type.value.title(), occurred)
+
+
+def test_run_timers_keep_the_earliest_deadline_per_kind():
+    timers = wd.RunTimers()
+    first, second, third = uuid4(), uuid4(), uuid4()
+
+    timers.set(first, NOW + timedelta(hours=2), wd.STALE)
+    timers.set(first, NOW + timedelta(hours=3), wd.STALE)
+    # Un vencimiento de otro tipo reemplaza al anterior aunque sea más tarde
+    timers.set(second, NOW + timedelta(minutes=10), wd.STALE)
+    timers.set(second, NOW + timedelta(hours=4), wd.LONG_RUNNING)
+    timers.set(third, NOW + timedelta(hours=1), wd.LONG_RUNNING)
+    timers.discard(third)
+
+    assert len(timers) == 2
+    assert timers.next_deadline() == NOW + timedelta(hours=2)
+    assert timers.pop_due(NOW + timedelta(hours=1)) == []
+    assert timers.pop_due(NOW + timedelta(hours=5)) == [(first, wd.STALE), (second, wd.LONG_RUNNING)]
+    assert len(timers) == 0
+    assert timers.next_deadline() is None
+
+
+def test_apply_events_schedules_and_discards_timers(api, watchdog_run):
+    scheduled_id, running_id, completed_id, restarted_id = list(api.flow_runs)[:4]
+    set_run(api, scheduled_id, StateType.SCHEDULED, expected_start_time=NOW - timedelta(hours=1))
+    set_run(api, restarted_id, StateType.SCHEDULED, expected_start_time=NOW + timedelta(hours=1))
+
+    timers = wd.RunTimers()
+    timers.set(completed_id, NOW, wd.LONG_RUNNING)
+    events = [
+        event(scheduled_id, StateType.SCHEDULED),
+        event(running_id, StateType.RUNNING, occurred=NOW - timedelta(minutes=30)),
+        event(completed_id, StateType.COMPLETED),
+        # La ejecución vuelve a programarse después de iniciar: vale el último evento
+        event(restarted_id, StateType.RUNNING),
+        event(restarted_id, StateType.SCHEDULED),
+        # Los eventos de la ejecución del propio watchdog se ignoran
+        event(watchdog_run.id, StateType.RUNNING),
+    ]
+
+    async def run():
+        async with fake_api_session(api) as client:
+            await wd.apply_events(client, timers, events, STALE_THRESHOLD, LONG_RUNNING_THRESHOLD)
+
+    asyncio.run(run())
+
+    assert len(timers) == 3
+    assert timers.pop_due(NOW + timedelta(days=1)) == [
+        (running_id, wd.LONG_RUNNING),
+        (scheduled_id, wd.STALE),
+        (restarted_id, wd.STALE),
+    ]
+    # Solo las ejecuciones programadas se leen desde la API, en una consulta por lote
+    assert api.stats.requests["POST /flow_runs/filter"] == 1
+
+
+def test_cancel_due_runs_cancels_only_runs_still_over_threshold(api, watchdog_run):
+    stale_id, late_running_id, started_id, watchdog_run_id = list(api.flow_runs)[:4]
+    watchdog_run.id = str(watchdog_run_id)
+    set_run(api, stale_id, StateType.SCHEDULED, expected_start_time=NOW - STALE_THRESHOLD - timedelta(minutes=5))
+    set_run(api, late_running_id, StateType.RUNNING, start_time=NOW - LONG_RUNNING_THRESHOLD - timedelta(minutes=5))
+    # Vencida como demorada, pero ya inició sin que llegara el evento: se reprograma como larga duración
+    set_run(api, started_id, StateType.RUNNING, expected_start_time=NOW - STALE_THRESHOLD - timedelta(hours=1),
+            start_time=NOW - timedelta(minutes=10))
+
+    timers = wd.RunTimers()
+    due = [(stale_id, wd.STALE), (late_running_id, wd.LONG_RUNNING), (started_id, wd.STALE)]
+
+    async def run():
+        async with fake_api_session(api) as client:
+            await wd.cancel_due_runs(client, timers, due, STALE_THRESHOLD, LONG_RUNNING_THRESHOLD)
+
+    asyncio.run(run())
+
+    assert {flow_run_id for flow_run_id, flow_run in api.flow_runs.items() if flow_run["state_type"] == "CANCELLED"} \
+        == {stale_id, late_running_id}
+    assert "Cancelado por Watchdog" in api.flow_runs[stale_id]["tags"]
+    assert "Cancelo un flow" in api.flow_runs[watchdog_run_id]["tags"]
+    assert timers.pop_due(NOW + timedelta(days=1)) == [(started_id, wd.LONG_RUNNING)]